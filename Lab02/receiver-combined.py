@@ -1,9 +1,21 @@
+import os
 import random
+import sys
 import time
-import pyaudio
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.signal import butter, lfilter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common import audio
+from common.archive import CaptureArchive
+from common.bch import CODEC_BITS, CODEC_CRC, LENGTH_FIELD_BITS, MAX_CODEWORD_BITS, codec_decode, codec_max_errors
+from common.capture import RingBuffer
+from common.chase import bit_reliabilities, chase_decode
+from common.crc import get_engine
+from common.filterbank import FilterBank
+from common.frame import BitVector
+from common.mfsk import MFSK
+from common.polysearch import pick_generator
+from common.preamble import find_preambles, step_onset
 
 # Parameters
 sample_rate = 16000
@@ -19,56 +31,56 @@ lowcut2 = freq2 - gap  # Lower bound of the frequency range
 highcut2 = freq2 + gap # Upper bound of the frequency range
 lowcut3 = 4000 - gap # Upper bound of the frequency range
 highcut3 = 4000 + gap # Upper bound of the frequency range
+lead_freq = 4000 # Lead-in tone sent before the bits
+lead_duration = 2 # Lead-in tone duration (seconds)
+demodulator = 'goertzel' # 'goertzel' (DFT-bin filter bank) or 'butter' (bandpass filters)
+bits_per_symbol = 1 # Bits per tone, as set in the sender ('butter' handles the 1-bit pair only)
+modem = MFSK.for_lab('lab02', bits_per_symbol, bit_duration)
+timing_recovery = True # 'goertzel': re-align each symbol window instead of fixed steps from the start
+soft_decision = False # Chase decoding: also correct errors beyond the code's radius when they fall on weak bits
+soft_decision_cost = 0.5 # Chase: the flipped bits' reliabilities may add up to this fraction of the median bit's
+mode = 'single' # 'single' (record `duration` seconds, decode one frame), 'continuous' (decode frames as they arrive) or 'replay' (decode an archived capture)
+stream_duration = None # 'continuous': stop after this many seconds of audio (None: run until Ctrl+C)
+scan_interval = 0.5 # 'continuous': seconds of new audio between scans for lead-in tones
+archive_path = None # Append every capture to archive_path.f32 / .idx (see common.archive), e.g. 'captures'; 'replay' needs one
+replay_segment = -1 # 'replay': archived segment to decode again (-1: the last one)
+archive = CaptureArchive(archive_path) if archive_path else None
+filter_bank = FilterBank([(lowcut, highcut), (lowcut2, highcut2)], sample_rate) # Bands of the 'butter' path
 
 
 def CRC(dataword, generator):
-    dword = int(dataword, 2)
-    l_gen = len(generator)
-    
-    dividend = dword << (l_gen - 1)
-    generator = int(generator, 2)
-    
-    while dividend.bit_length() >= l_gen:
-        shift = dividend.bit_length() - l_gen
-        dividend ^= (generator << shift)
-
-    return dividend
+    return get_engine(generator).remainder(dataword)
 
 def encode(dataword, generator):
-    remainder = CRC(dataword, generator)
-    l_gen = len(generator) - 1
-    codeword = (int(dataword, 2) << l_gen) | remainder
-    return bin(codeword)[2:].zfill(len(dataword) + l_gen)
+    return get_engine(generator).encode(dataword)
 
 def checkError(codeword, generator):
-    remainder = CRC(codeword, generator)
-    return remainder == 0
+    return get_engine(generator).check(codeword)
 
 def flipBitsAt(codeword, error_positions):
     error_positions = list(set(error_positions))
-    codeword = list(codeword)
+    codeword = BitVector.of(codeword)
     for pos in error_positions:
         if 0 <= pos < len(codeword):
-            codeword[pos] = '1' if codeword[pos] == '0' else '0'
-    return ''.join(codeword)
+            codeword.flip(pos)
+    return codeword
 
-def evaluate(dataword, generator):
+def evaluate(dataword, generator, codec=CODEC_CRC, reliability=None):
     corrupted_data = dataword
     start = time.time()
 
-    detected_error_positions = None
-    # Attempt to detect the original error positions
-    for i in range(len(corrupted_data)):
-        for j in range(i, len(corrupted_data)):
-            temp_error_pos = [i, j]
-            flipped_codeword = flipBitsAt(corrupted_data, temp_error_pos)
-            
-            if checkError(flipped_codeword, generator):
-                detected_error_positions = list(set(temp_error_pos))
-                break
-
-        if detected_error_positions:
-            break
+    # CRC: one syndrome computation and one table lookup instead of trying every pair.
+    # BCH: Berlekamp-Massey + Chien search.
+    # With soft_decision, try flipping the weakest bits first (Chase decoding); a
+    # correction beyond the code's radius must only flip clearly unreliable bits.
+    if soft_decision and reliability is not None and len(reliability):
+        correction = chase_decode(corrupted_data, reliability,
+                                  lambda codeword: codec_decode(codeword, codec, generator),
+                                  codec_max_errors(codec),
+                                  max_cost=soft_decision_cost * float(np.median(reliability)))
+    else:
+        correction = codec_decode(corrupted_data, codec, generator)
+    detected_error_positions = correction['positions'] or None
 
     end = time.time()
 
@@ -76,6 +88,9 @@ def evaluate(dataword, generator):
         'length': len(dataword),
         'corrupted': corrupted_data,
         'detected_errors': detected_error_positions,
+        'status': correction['status'],
+        'candidates': correction['candidates'],
+        'codeword': correction['codeword'],
         'time_taken': end - start,
         # 'corrected': sorted(detected_error_positions) == sorted(de) if detected_error_positions else False
     }
@@ -83,14 +98,17 @@ def evaluate(dataword, generator):
     return result
 
 
-def decode(datastring):
-    generator = "1011101011101"
-    results = evaluate(datastring, generator)
+def decode(datastring, codec=CODEC_CRC, reliability=None):
+    # Same choice as the sender, made from the codeword length in the header
+    generator = pick_generator(len(datastring))
+    results = evaluate(datastring, generator, codec, reliability)
 
     # if results['corrected']:
     print(f"Data Length: \t\t{results['length']}")
     print(f"Corrupted data: \t{results['corrupted']}")
     print(f"Detected errors: \t{results['detected_errors']}")
+    if results['status'] == 'ambiguous':
+        print(f"Ambiguous syndrome: \t{results['candidates']}")
     print(f"Time taken: \t\t{results['time_taken']:.5f} seconds")
     # print(f"Error positions: \t{results['error_positions']}")
     # print(f"Corrected: \t\t{results['corrected']}")
@@ -101,27 +119,15 @@ def decode(datastring):
     return results
 
 
-def receive_data():
-
-    p = pyaudio.PyAudio()
-
-    def butter_bandpass(lowcut, highcut, sample_rate, order=5):
-        nyquist = 0.5 * sample_rate  # Nyquist frequency is half the sampling rate
-        low = lowcut / nyquist
-        high = highcut / nyquist
-        b, a = butter(order, [low, high], btype='band')
-        return b, a
-
-    def bandpass_filter(data, lowcut, highcut, sample_rate, order=5):
-        b, a = butter_bandpass(lowcut, highcut, sample_rate, order=order)
-        y = lfilter(b, a, data)
-        return y
-
-    def avg(arr):
-        return sum(arr)/(len(arr)+1)
+def receive_data(p=None):
+    """
+    Record `duration` seconds from the audio backend `p` (default: the one
+    $AUDIO_BACKEND selects) and demodulate them.
+    """
+    p = p or audio.open_backend()
 
     # Open a stream to record audio
-    stream = p.open(format=pyaudio.paFloat32,
+    stream = p.open(format=audio.paFloat32,
                     channels=1,
                     rate=sample_rate,
                     input=True,
@@ -129,14 +135,13 @@ def receive_data():
 
     print("Recording audio signal...")
 
-    # List to hold the audio data
-    audio_data = []
+    # Preallocated float32 buffer for the whole recording
+    n_chunks = int(sample_rate * duration / chunk_size)
+    capture = RingBuffer(n_chunks * chunk_size)
 
     try:
-        for _ in range(int(sample_rate * duration / chunk_size)):
-            data = stream.read(chunk_size, exception_on_overflow=False)
-            chunk = np.frombuffer(data, dtype=np.float32)
-            audio_data.extend(chunk)
+        for _ in range(n_chunks):
+            capture.read_from(stream, chunk_size)
 
     except KeyboardInterrupt:
         print("Stopped recording.")
@@ -146,18 +151,36 @@ def receive_data():
         stream.close()
         p.terminate()
 
-    # Convert the list to a numpy array
-    audio_data = np.array(audio_data)
-    audio_data *= 100
+    # Raw samples straight from the capture buffer, for replay_capture()
+    if archive is not None:
+        print(f"Archived as segment {archive.append(capture.window(0), sample_rate)} of {archive_path}")
+
+    return demodulate_capture(capture.window(0))
 
-    np.savetxt('audio.txt', audio_data)
 
-    # Apply bandpass filters to extract the desired frequency ranges
-    filtered_data = bandpass_filter(audio_data, lowcut, highcut, sample_rate)
-    filtered_data = np.abs(filtered_data)
+def demodulate_capture(samples):
+    """Demodulate a recording (raw samples) into the received bits and their reliabilities."""
+    def avg(arr):
+        return sum(arr)/(len(arr)+1)
+
+    # Scaled copy of the recording (`samples` is a read-only view of the buffer or archive)
+    audio_data = samples * 100
+
+    if demodulator == 'goertzel':
+        # The bits start right after the matched lead-in tone; without one, at the first tone onset
+        leads = find_preambles(audio_data, [(lead_freq, lead_duration)], sample_rate, others=modem.freqs)
+        starting_idx = leads[0] + int(sample_rate * lead_duration) if leads else None
+
+        # Tone amplitudes of every symbol window from one matrix product
+        bitstring, energies, starting_idx = modem.demodulate(audio_data, sample_rate, starting_idx, track=timing_recovery)
+        print("Starting index: ", starting_idx)
+        reliability = modem.reliabilities(energies)
+        print("Received bitstring:", bitstring)
+        return bitstring, reliability
+
+    # Apply bandpass filters to extract the desired frequency ranges (rectified, float32)
+    filtered_data, filtered_data2 = filter_bank.envelopes(audio_data)
     # filtered_data = np.convolve(filtered_data, np.ones((10,)), mode='valid')
-    filtered_data2 = bandpass_filter(audio_data, lowcut2, highcut2, sample_rate)
-    filtered_data2 = np.abs(filtered_data2)
 
     # Find the starting index of the transmission
     starting_idx1 = 0
@@ -173,31 +196,33 @@ def receive_data():
     # Compute the threshold using mean and standard deviation
     threshold = compute_threshold(filtered_data, factor=1.0)
 
-    for i in range(1000, len(filtered_data)-100):
-        if abs(avg(filtered_data[i:i+100]) - avg(filtered_data[i-100:i])) > threshold:
-            starting_idx1 = i
-            break
-    for i in range(1000, len(filtered_data2)-100):
-        if abs(avg(filtered_data2[i-100:i]) - avg(filtered_data2[i:i+100]))  > threshold:
-            starting_idx2 = i
-            break
+    # First i >= 1000 where the 100-sample averages around i differ by more than threshold
+    starting_idx1 = step_onset(filtered_data, threshold, window=100, begin=1000, norm=101)
+    starting_idx2 = step_onset(filtered_data2, threshold, window=100, begin=1000, norm=101)
 
     print("Starting index of low freq range: ", starting_idx1)
     print("Starting index of high freq range: ", starting_idx2)
         
-    bitstring = ''
+    bits = []
+    energies = []
 
     starting_idx = min(starting_idx1, starting_idx2)
     # Extract the bits from the filtered data
     for i in range(starting_idx, len(filtered_data)-sample_rate, int(sample_rate*bit_duration)):
-        if avg(filtered_data[i:i+sample_rate]) > avg(filtered_data2[i:i+sample_rate]):
-            bitstring += '0'
+        energy = [avg(filtered_data[i:i+sample_rate]), avg(filtered_data2[i:i+sample_rate])]
+        energies.append(energy)
+        if energy[0] > energy[1]:
+            bits.append(0)
         else:
-            bitstring += '1'
+            bits.append(1)
+    bitstring = BitVector.from_bits(bits)
+    # How far apart the two band energies were for each bit, for soft-decision decoding
+    reliability = bit_reliabilities(np.array(energies).reshape(-1, 2), 1)
 
     print("Received bitstring:", bitstring)
 
-    # # Plotting
+    # # Plotting (needs matplotlib)
+    # import matplotlib.pyplot as plt
     # plt.figure(figsize=(10, 4))
 
     # # Plot the first filtered data with a solid line and transparency
@@ -232,15 +257,157 @@ def receive_data():
     # plt.savefig('waveform.png')
     # plt.show()
 
-    return bitstring
+    return bitstring, reliability
 
-if __name__ == "__main__":
-    received_data = receive_data()
-    # first 5 bits represent the size of the dataword
+def decode_frame(received_data, reliability):
+    """Split a received frame into its header fields and codeword, and correct the codeword."""
+    # first LENGTH_FIELD_BITS bits represent the size of the codeword
     # received_data = "10000010101010100000101111101011010010"
-    data_length = int(received_data[:6], 2)
+    data_length = received_data[:LENGTH_FIELD_BITS].to_int()
+    # next CODEC_BITS bits select the error-correcting code
+    codec = received_data[LENGTH_FIELD_BITS:LENGTH_FIELD_BITS+CODEC_BITS].to_int()
+    header_length = LENGTH_FIELD_BITS + CODEC_BITS
     print(f"Received Length: {len(received_data)}")
     print(f"Data Length: {data_length}")
-    print(f"Data passed to decode: {received_data[6:6+data_length]}")
-    datastring = received_data[6:6+data_length]
-    decode(datastring)
\ No newline at end of file
+    print(f"Codec: {codec}")
+    print(f"Data passed to decode: {received_data[header_length:header_length+data_length]}")
+    datastring = received_data[header_length:header_length+data_length]
+    return decode(datastring, codec, reliability[header_length:header_length+data_length])
+
+
+def receive_stream(p=None):
+    """
+    Keep recording and decode every frame (lead-in tone, length/codec header,
+    codeword) as soon as all of its bits have arrived.
+
+    The capture ring buffer holds the longest possible frame twice over.
+    Every `scan_interval` seconds the audio after the last decoded frame is
+    searched for the lead-in tone. Once a lead-in is found, searching stops
+    until its frame is decoded: when the header after it has been received,
+    its length says where the frame ends, and when that much audio is in, the
+    frame is demodulated and corrected. Scanning then resumes one lead-in
+    length before the frame's end, ignoring lead-ins that start before it,
+    so a lead-in straight after the frame is found even if clock drift moves
+    it early. Back-to-back frames therefore need no gap and no restart.
+
+    Parameters:
+    p: Audio backend to record from (default: the one $AUDIO_BACKEND selects).
+
+    Returns:
+    list: decode() results of the frames received, in order.
+    """
+    header_length = LENGTH_FIELD_BITS + CODEC_BITS
+    symbol_len = int(sample_rate * bit_duration)
+    lead_len = int(sample_rate * lead_duration)
+    bits_per_symbol = modem.bits_per_symbol
+
+    def symbols(n_bits):
+        return -(-n_bits // bits_per_symbol)
+
+    # Longest frame: lead-in plus a header announcing the longest codeword
+    longest = lead_len + symbols(header_length + MAX_CODEWORD_BITS) * symbol_len
+    capture = RingBuffer(2 * longest + sample_rate)
+
+    p = p or audio.open_backend()
+    stream = p.open(format=audio.paFloat32,
+                    channels=1,
+                    rate=sample_rate,
+                    input=True,
+                    frames_per_buffer=chunk_size)
+
+    print("Listening for frames (Ctrl+C to stop)...")
+    scan_from = 0
+    next_scan = int(sample_rate * scan_interval)
+    pending = None  # (bits start, frame end, codeword length) of a frame still arriving
+    last_end = 0  # end of the last decoded frame
+    results = []
+    try:
+        while stream_duration is None or capture.written < sample_rate * stream_duration:
+            capture.read_from(stream, chunk_size)
+            if capture.written < next_scan:
+                continue
+            next_scan = capture.written + int(sample_rate * scan_interval)
+
+            while True:
+                if pending is None:
+                    scan_from = max(scan_from, capture.oldest)
+                    window = capture.window(scan_from) * 100
+                    leads = find_preambles(window, [(lead_freq, lead_duration)], sample_rate, others=modem.freqs)
+                    # Drop anything before the end of the last frame (less half a lead-in of clock drift)
+                    leads = [lead for lead in leads if scan_from + lead >= last_end - lead_len // 2]
+                    if not leads:
+                        # Keep one lead-in's worth of audio: a lead-in may be arriving
+                        scan_from = max(scan_from, capture.written - lead_len - chunk_size)
+                        break
+                    # A frame is arriving: no more searching until it is decoded
+                    pending = (scan_from + leads[0] + lead_len, None, None)
+
+                bits_start, frame_end, data_length = pending
+                if frame_end is None:
+                    header_end = bits_start + symbols(header_length) * symbol_len
+                    if header_end > capture.written:
+                        break
+                    header, _, _ = modem.demodulate(capture.window(bits_start, header_end) * 100, sample_rate, 0)
+                    data_length = header[:LENGTH_FIELD_BITS].to_int()
+                    if data_length == 0:
+                        # Not a frame after all: look again after this lead-in
+                        scan_from = bits_start
+                        pending = None
+                        continue
+                    frame_end = bits_start + symbols(header_length + data_length) * symbol_len
+                    pending = (bits_start, frame_end, data_length)
+
+                # Wait for the whole frame plus half a symbol for timing drift
+                if frame_end + symbol_len // 2 > capture.written:
+                    break
+                frame_audio = capture.window(bits_start, frame_end + symbol_len // 2) * 100
+                bitstring, energies, _ = modem.demodulate(frame_audio, sample_rate, 0, track=timing_recovery)
+                bitstring = bitstring[:header_length + data_length]
+                reliability = modem.reliabilities(energies)[:header_length + data_length]
+
+                frames = len(results) + 1
+                print(f"Frame {frames} at {bits_start / sample_rate:.2f} s: {bitstring}")
+                if archive is not None:
+                    # The frame's audio from its lead-in on, numbered by frame
+                    frame_start = max(bits_start - lead_len, capture.oldest)
+                    recorded = time.time() - (capture.written - frame_start) / sample_rate
+                    archive.append(capture.window(frame_start, frame_end), sample_rate, slot=frames, timestamp=recorded)
+                results.append(decode_frame(bitstring, reliability))
+                # Search again from a lead-in before the frame's end, so that a lead-in
+                # straight after it (or early, from clock drift) is not at the window's edge
+                last_end = frame_end
+                scan_from = frame_end - lead_len
+                pending = None
+
+    except KeyboardInterrupt:
+        print("Stopped listening.")
+
+    finally:
+        stream.stop_stream()
+        stream.close()
+        p.terminate()
+
+    print(f"Frames received: {len(results)}")
+    return results
+
+
+def replay_capture(number):
+    """Decode an archived capture again, reading its samples from the archive file without loading the rest."""
+    if archive is None:
+        raise ValueError("Set archive_path to the archive to replay from.")
+    record = archive.index[number]
+    if record['sample_rate'] != sample_rate:
+        raise ValueError(f"Segment {number} was recorded at {record['sample_rate']} Hz, not {sample_rate} Hz.")
+    print(f"Replaying segment {number} of {archive_path} ({record['length'] / sample_rate:.2f} s)")
+    return demodulate_capture(archive.segment(number))
+
+
+if __name__ == "__main__":
+    if mode == 'continuous':
+        receive_stream()
+    elif mode == 'replay':
+        received_data, reliability = replay_capture(replay_segment)
+        decode_frame(received_data, reliability)
+    else:
+        received_data, reliability = receive_data()
+        decode_frame(received_data, reliability)
\ No newline at end of file
@@ -1,51 +1,39 @@
+import os
+import sys
 import time
-import pyaudio
-import numpy as np
-
-
-def xor(a, b):
-    """Performs XOR operation between two binary strings."""
-    result = []
-    for i in range(1, len(b)):
-        if a[i] == b[i]:
-            result.append('0')
-        else:
-            result.append('1')
-    return ''.join(result)
-
-def mod2div(dividend, divisor):
-    """Performs modulo-2 division (bitwise XOR division)."""
-    pick = len(divisor)
-    tmp = dividend[0:pick]
-
-    while pick < len(dividend):
-        if tmp[0] == '1':
-            tmp = xor(divisor, tmp) + dividend[pick]
-        else:
-            tmp = xor('0'*pick, tmp) + dividend[pick]
-        pick += 1
-
-    if tmp[0] == '1':
-        tmp = xor(divisor, tmp)
-    else:
-        tmp = xor('0'*pick, tmp)
-    
-    return tmp
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common import audio
+from common.bch import CODEC_BITS, CODEC_CRC, LENGTH_FIELD_BITS, codec_encode, codec_max_errors
+from common.crc import get_engine
+from common.frame import BitVector
+from common.mfsk import MFSK
+from common.polysearch import pick_generator_for_data
+
+# Error-correcting code announced in the frame header after the length field.
+# CODEC_CRC corrects up to 2 bit errors; 1, 2 and 3 select BCH correcting 2, 3 and 4.
+CODEC = CODEC_CRC
+
+# 'fsk' restarts every tone at phase 0; 'cpfsk' keeps the phase continuous
+# across bits, with RAMP seconds of raised-cosine frequency transition
+MODULATION = 'cpfsk'
+RAMP = 0.01
+
+# Bits per tone: 1 keeps the 5000/7000 Hz pair; more spreads 2 ** n tones over 4500-7500 Hz
+# (the receiver's Goertzel path must use the same value)
+BITS_PER_SYMBOL = 1
+
 
 def encode_data(data, key):
     """Encodes the data using the CRC key."""
-    l_key = len(key)
-    appended_data = data + '0'*(l_key-1)
-    remainder = mod2div(appended_data, key)
-    codeword = data + remainder
-    return codeword
+    return get_engine(key).encode(data)
 
 def flip_bits(data, positions):
     """Flips bits at the specified positions in the data."""
-    data = list(data)
+    data = BitVector.of(data)
     for pos in positions:
-        data[pos] = '1' if data[pos] == '0' else '0'
-    return ''.join(data)
+        data.flip(pos)
+    return data
 
 
 def transmit(bitstring): 
@@ -53,32 +41,22 @@ def transmit(bitstring):
     duration = 1
     sample_rate = 44100
 
-    freq0 = 5000 # bit 0
-    freq1 = 7000 # bit 1
+    modem = MFSK.for_lab('lab02', BITS_PER_SYMBOL, duration)
 
-    p = pyaudio.PyAudio()
+    # Build the whole frame (2 s lead-in tone at 4000 Hz, then one tone per symbol)
+    # before opening the stream, and play it in one write
+    frame = modem.modulate(bitstring, sample_rate, preamble=((4000,), 2),
+                           modulation=MODULATION, ramp=RAMP)
 
-    def generate_tone(frequency, duration, sample_rate):
-        t = np.linspace(0, duration, int(sample_rate * duration), False)
-        tone = np.sin(2 * np.pi * frequency * t)
-        return tone
+    p = audio.open_backend()
 
-    stream = p.open(format=pyaudio.paFloat32,
+    stream = p.open(format=audio.paFloat32,
                     channels=1,
                     rate=sample_rate,
                     output=True)
 
     print("Transmitting data...")
-    tone = generate_tone(4000, 2, sample_rate)
-    stream.write(tone.astype(np.float32).tobytes())
-
-    for bit in bitstring:
-        if bit == '0':
-            tone = generate_tone(freq0, duration, sample_rate)
-        else:
-            tone = generate_tone(freq1, duration, sample_rate)
-        
-        stream.write(tone.astype(np.float32).tobytes())
+    stream.write(frame.tobytes())
     
     print("Transmission complete.")
 
@@ -95,29 +73,31 @@ if __name__ == "__main__":
 
     # data = '10101010100000101101'
     data = inputData()
-    key = '1011101011101' 
+    # Lowest-overhead generator that still corrects every 1/2-bit error at this length
+    key = pick_generator_for_data(len(data))
 
     # Start the timer
     start_time = time.time()
 
-    # Encode data
-    encoded_data = encode_data(data, key)
-    print(f"Original Data: \t\t\t{data}")
-    print(f"Encoded Data: \t\t\t{encoded_data}")
-
-    # Take up to 2 indices as input to flip
     try:
-        indices = input("Enter up to 2 indices to flip (space-separated): ").strip()
+        # Encode data (raises ValueError if the codeword is too long for the length field)
+        encoded_data = codec_encode(data, CODEC, key)
+        max_errors = codec_max_errors(CODEC)
+        print(f"Original Data: \t\t\t{data}")
+        print(f"Encoded Data: \t\t\t{encoded_data}")
+
+        # Take up to max_errors indices as input to flip
+        indices = input(f"Enter up to {max_errors} indices to flip (space-separated): ").strip()
         if indices:
             indices = [int(i) for i in indices.split(' ')]
-            if len(indices) > 2:
-                raise ValueError("Only up to 2 indices are allowed.")
+            if len(indices) > max_errors:
+                raise ValueError(f"Only up to {max_errors} indices are allowed.")
             # Flip bits at specified indices
             corrupted_data = flip_bits(encoded_data, indices)
 
-            length = len(corrupted_data)
-            length = bin(length)[2:].zfill(6)
-            corrupted_data = length + corrupted_data
+            length = BitVector.from_int(len(corrupted_data), LENGTH_FIELD_BITS)
+            codec = BitVector.from_int(CODEC, CODEC_BITS)
+            corrupted_data = length + codec + corrupted_data
             print(f"Corrupted Data: \t\t{corrupted_data}")
             transmit(corrupted_data)
 
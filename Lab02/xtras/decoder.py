@@ -1,6 +1,12 @@
+import os
+import sys
 import pyaudio
 import numpy as np
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.crc import get_engine
+from common.syndrome import correct
+
 # Parameters
 
 
@@ -17,39 +23,9 @@ import numpy as np
 
 # decoder.py
 
-def xor(a, b):
-    """Performs XOR operation between two binary strings."""
-    result = []
-    for i in range(1, len(b)):
-        if a[i] == b[i]:
-            result.append('0')
-        else:
-            result.append('1')
-    return ''.join(result)
-
-def mod2div(dividend, divisor):
-    """Performs modulo-2 division (bitwise XOR division)."""
-    pick = len(divisor)
-    tmp = dividend[0:pick]
-
-    while pick < len(dividend):
-        if tmp[0] == '1':
-            tmp = xor(divisor, tmp) + dividend[pick]
-        else:
-            tmp = xor('0'*pick, tmp) + dividend[pick]
-        pick += 1
-
-    if tmp[0] == '1':
-        tmp = xor(divisor, tmp)
-    else:
-        tmp = xor('0'*pick, tmp)
-    
-    return tmp
-
 def check_data(received_data, key):
     """Checks received data for errors using the CRC key."""
-    remainder = mod2div(received_data, key)
-    return remainder == '0' * (len(key) - 1)
+    return get_engine(key).check(received_data)
 
 def flip_bits(data, positions):
     """Flips bits at the specified positions in the data."""
@@ -59,23 +35,15 @@ def flip_bits(data, positions):
     return ''.join(data)
 
 def brute_force_correct(data, key):
-    """Performs brute-force correction by trying all 1-bit and 2-bit flips with optimizations."""
-    n = len(data)
-    
-    # Check all 1-bit flips
-    for i in range(n):
-        flipped_data = data[:i] + ('1' if data[i] == '0' else '0') + data[i+1:]
-        if check_data(flipped_data, key):
-            return flipped_data, [i]
-
-    # Check all 2-bit flips
-    for i in range(n):
-        for j in range(i + 1, n):
-            flipped_data = data[:i] + ('1' if data[i] == '0' else '0') + data[i + 1:j] + ('1' if data[j] == '0' else '0') + data[j + 1:]
-            if check_data(flipped_data, key):
-                return flipped_data, [i, j]
-
-    return None, []
+    """Corrects 1-bit and 2-bit errors with a single syndrome table lookup."""
+    result = correct(data, key)
+
+    if result['status'] == 'ambiguous':
+        print(f"Ambiguous syndrome, candidate bit positions: {result['candidates']}")
+    if result['status'] != 'corrected':
+        return None, []
+
+    return result['codeword'], result['positions']
 
 if __name__ == "__main__":
     import time
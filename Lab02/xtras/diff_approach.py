@@ -1,28 +1,20 @@
+import os
 import random
+import sys
 import time
 
-def CRC(dataword, generator):
-    dword = int(dataword, 2)
-    l_gen = len(generator)
-    
-    dividend = dword << (l_gen - 1)
-    generator = int(generator, 2)
-    
-    while dividend.bit_length() >= l_gen:
-        shift = dividend.bit_length() - l_gen
-        dividend ^= (generator << shift)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.crc import get_engine
+from common.syndrome import correct
 
-    return dividend
+def CRC(dataword, generator):
+    return get_engine(generator).remainder(dataword)
 
 def encode(dataword, generator):
-    remainder = CRC(dataword, generator)
-    l_gen = len(generator) - 1
-    codeword = (int(dataword, 2) << l_gen) | remainder
-    return bin(codeword)[2:].zfill(len(dataword) + l_gen)
+    return get_engine(generator).encode(dataword)
 
 def checkError(codeword, generator):
-    remainder = CRC(codeword, generator)
-    return remainder == 0
+    return get_engine(generator).check(codeword)
 
 def flipBitsAt(codeword, error_positions):
     error_positions = list(set(error_positions))
@@ -37,19 +29,9 @@ def evaluate(dataword, generator, error_positions):
     corrupted_data = flipBitsAt(encoded_data, error_positions)
     start = time.time()
 
-    detected_error_positions = None
-    # Attempt to detect the original error positions
-    for i in range(len(encoded_data)):
-        for j in range(i, len(encoded_data)):
-            temp_error_pos = [i, j]
-            flipped_codeword = flipBitsAt(corrupted_data, temp_error_pos)
-            
-            if checkError(flipped_codeword, generator):
-                detected_error_positions = list(set(temp_error_pos))
-                break
-
-        if detected_error_positions:
-            break
+    # One syndrome computation and one table lookup instead of trying every pair
+    correction = correct(corrupted_data, generator)
+    detected_error_positions = correction['positions'] or None
 
     end = time.time()
 
@@ -58,6 +40,8 @@ def evaluate(dataword, generator, error_positions):
         'encoded': encoded_data,
         'corrupted': corrupted_data,
         'detected_errors': detected_error_positions,
+        'status': correction['status'],
+        'candidates': correction['candidates'],
         'time_taken': end - start,
         'error_positions': error_positions,
         'corrected': sorted(detected_error_positions) == sorted(error_positions) if detected_error_positions else False
@@ -89,6 +73,8 @@ def main():
         print(f"Error positions: \t{results['error_positions']}")
         print(f"Corrected: \t\t{results['corrected']}")
         print("------------------------------------------------------\n")
+    elif results['status'] == 'ambiguous':
+        print(f"Ambiguous syndrome, candidates: {results['candidates']}")
     else:
         print("Failed to or No errors detected.")
 
@@ -1,7 +1,12 @@
 
+import os
+import sys
 import pyaudio
 import numpy as np
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.crc import get_engine
+
 # Parameters
 bitstring = "10100111"
 duration = 0.5
@@ -42,42 +47,9 @@ p.terminate()
 
 
 
-def xor(a, b):
-    """Performs XOR operation between two binary strings."""
-    result = []
-    for i in range(1, len(b)):
-        if a[i] == b[i]:
-            result.append('0')
-        else:
-            result.append('1')
-    return ''.join(result)
-
-def mod2div(dividend, divisor):
-    """Performs modulo-2 division (bitwise XOR division)."""
-    pick = len(divisor)
-    tmp = dividend[0:pick]
-
-    while pick < len(dividend):
-        if tmp[0] == '1':
-            tmp = xor(divisor, tmp) + dividend[pick]
-        else:
-            tmp = xor('0'*pick, tmp) + dividend[pick]
-        pick += 1
-
-    if tmp[0] == '1':
-        tmp = xor(divisor, tmp)
-    else:
-        tmp = xor('0'*pick, tmp)
-    
-    return tmp
-
 def encode_data(data, key):
     """Encodes the data using the CRC key."""
-    l_key = len(key)
-    appended_data = data + '0'*(l_key-1)
-    remainder = mod2div(appended_data, key)
-    codeword = data + remainder
-    return codeword
+    return get_engine(key).encode(data)
 
 def flip_bits(data, positions):
     """Flips bits at the specified positions in the data."""
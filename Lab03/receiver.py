@@ -1,50 +1,110 @@
-import pyaudio
 import numpy as np
 import time
-from datetime import datetime
-import matplotlib.pyplot as plt
-from scipy.signal import butter, lfilter
 import threading
+from datetime import datetime
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common import audio
+from common.archive import CaptureArchive
+from common.baseband import BasebandFrontEnd
+from common.capture import CallbackCapture, RingBuffer, WorkerPool
+from common.demod import StreamingDemodulator
+from common.filterbank import FilterBank
+from common.frame import Frame
+from common.mfsk import MFSK
+from common.multitone import MultiTone
+from common.preamble import find_preambles, preamble_segments, step_onset
 
 # Parameters
 SAMPLE_RATE = 20000         # Sample rate for audio recording (in Hz)
 CHUNK = 1024                # Buffer size for reading audio data
-BIT_DURATION = 1            # Duration allocated for each bit in the bitstream (seconds)
+BIT_DURATION = 1            # Duration allocated for each symbol in the bitstream (seconds)
+SYMBOL_MODE = 'mfsk'        # 'mfsk' (one tone per symbol) or 'multitone' (one on/off tone per bit, plus a pilot)
+BITS_PER_SYMBOL = 2         # Bits per symbol ('mfsk' 2: 4 tones, 3: 8, 4: 16; 'multitone' N: N + 1 tones); must match the sender
 DURATION = 20                # Duration for which audio will be recorded during each slot (seconds)
 GAP_DURATION = 20            # Gap between transmission slots (seconds)
 TOLERANCE = 100             # Frequency detection tolerance (to account for minor variations)
 DEVICE_ID = 1               # Device ID for identifying which device is receiving
 TOTAL_DEVICES = 3           # Total number of devices communicating in the network
+DEMODULATOR = 'goertzel'    # 'goertzel' (DFT-bin filter bank), 'baseband' (mix + decimate) or 'butter' (bandpass filters + envelope)
+STREAMING = True            # Demodulate each chunk while recording to find where the frame ends, and decode the slot then ('goertzel', 'baseband')
+TIMING_RECOVERY = True      # 'goertzel' (streamed or not): re-align each symbol window (early-late gate) instead of fixed steps
+CAPTURE_SLOTS = 5           # Slots of audio kept in the capture ring buffer (> DECODE_WORKERS + DECODE_QUEUE)
+CAPTURE_MODE = 'blocking'   # 'blocking' (stream.read loop) or 'callback' (PyAudio callback + queue)
+DECODE_WORKERS = 2          # Threads decoding finished slots
+DECODE_QUEUE = 2            # Finished slots allowed to wait for a decoder before being dropped
+ARCHIVE_PATH = None         # Append every slot's raw audio to ARCHIVE_PATH.f32 / .idx (see common.archive), e.g. 'captures'
+
+def configure(symbol_mode=SYMBOL_MODE, bits_per_symbol=BITS_PER_SYMBOL, bit_duration=BIT_DURATION, duration=DURATION):
+    """
+    Set the symbol format and slot length and derive the detectors and the
+    capture buffer from them. Runs once at import with the parameters above;
+    call it again (e.g. from common.loopback) to receive a different format.
+    """
+    global SYMBOL_MODE, BITS_PER_SYMBOL, BIT_DURATION, DURATION
+    global MODEM, freqs, PREAMBLE_SEGMENTS, lowcuts, highcuts, FILTER_BANK, capture
+    SYMBOL_MODE, BITS_PER_SYMBOL, BIT_DURATION, DURATION = symbol_mode, bits_per_symbol, bit_duration, duration
+
+    # List to hold frequency bands for filtering
+    lowcuts = []
+    highcuts = []
+    # Detector matching the sender's tone plan (3300, 4100, 4700, 5900 Hz for 2-bit M-FSK symbols)
+    if SYMBOL_MODE == 'multitone':
+        MODEM = MultiTone.for_lab('lab03', BITS_PER_SYMBOL, BIT_DURATION)
+    else:
+        MODEM = MFSK.for_lab('lab03', BITS_PER_SYMBOL, BIT_DURATION)
+    freqs = list(MODEM.freqs)  # Frequencies used for transmitting symbols
+
+    # Tones of the '001011' frame preamble, used to find where a frame starts. Multi-tone
+    # frames have no single tone per symbol and are aligned on the pilot's onset instead
+    PREAMBLE_SEGMENTS = []
+    if SYMBOL_MODE == 'mfsk':
+        PREAMBLE_SEGMENTS = preamble_segments(Frame.PREAMBLE, freqs, BIT_DURATION, BITS_PER_SYMBOL)
+
+    # Compute the lower and upper bounds for bandpass filtering based on the given tolerance
+    for freq in freqs:
+        lowcuts.append(freq - TOLERANCE)
+        highcuts.append(freq + TOLERANCE)
+
+    # Butterworth bandpass filters for those bands, designed once as second-order sections
+    FILTER_BANK = FilterBank(zip(lowcuts, highcuts), SAMPLE_RATE)
+
+    # Fixed-size float32 capture buffer: a slot's samples stay valid for decoding
+    # while the next CAPTURE_SLOTS - 1 slots are recorded. Decoders get views, not
+    # copies, so every slot being decoded or waiting in the queue must still be
+    # buffered alongside the slot being recorded
+    assert CAPTURE_SLOTS >= DECODE_WORKERS + DECODE_QUEUE + 1, \
+        f"CAPTURE_SLOTS must be at least DECODE_WORKERS + DECODE_QUEUE + 1 = {DECODE_WORKERS + DECODE_QUEUE + 1}"
+    capture = RingBuffer(int(SAMPLE_RATE * DURATION) * CAPTURE_SLOTS)
 
-# List to hold frequency bands for filtering
-lowcuts = []
-highcuts = []
-freqs = [3300, 4100, 4700, 5900]  # Frequencies used for transmitting bits
+configure()
 
 # Timestamps for each recorded session
 timestamps = []
 
-# Compute the lower and upper bounds for bandpass filtering based on the given tolerance
-for freq in freqs:
-    lowcuts.append(freq - TOLERANCE)
-    highcuts.append(freq + TOLERANCE)
-
-# Map each frequency to a 2-bit string for demodulating the bitstream
-mapping = {
-    0: '00',
-    1: '01',
-    2: '10',
-    3: '11'
-}
-
-# Initialize PyAudio to handle audio recording
-p = pyaudio.PyAudio()
-# Open a stream for recording audio
-stream = p.open(format=pyaudio.paFloat32,
-                channels=1,
-                rate=SAMPLE_RATE,
-                input=True,
-                frames_per_buffer=CHUNK)
+# (timestamp, source, message) of every frame received for this device
+received = []
+
+# Archive of every recorded slot, for replaying or plotting it later
+archive = CaptureArchive(ARCHIVE_PATH) if ARCHIVE_PATH else None
+slots_recorded = 0
+
+# Fixed pool of decoder threads; finished slots queue here instead of each
+# getting a new thread
+decode_pool = WorkerPool(DECODE_WORKERS, DECODE_QUEUE)
+
+# Initialize the audio backend (PyAudio unless $AUDIO_BACKEND selects a file or memory)
+p = audio.open_backend()
+# Open a stream for recording audio (callback mode opens its own per recording)
+stream = None
+if CAPTURE_MODE == 'blocking':
+    stream = p.open(format=audio.paFloat32,
+                    channels=1,
+                    rate=SAMPLE_RATE,
+                    input=True,
+                    frames_per_buffer=CHUNK)
 
 
 def detect_frequency(data, sample_rate):
@@ -78,54 +138,58 @@ def get_timestamp():
     curr_time = datetime.now()
     return curr_time.strftime("%H:%M:%S.%f")[:-3]
 
-def process_audio_data(audio_data):
-    def butter_bandpass(lowcut, highcut, sample_rate, order=5):
-        """
-        Design a bandpass Butterworth filter.
-        """
-        nyquist = 0.5 * sample_rate
-        low = lowcut / nyquist
-        high = highcut / nyquist
-        b, a = butter(order, [low, high], btype='band')
-        return b, a
+def process_audio_goertzel(audio_data):
+    """
+    Same result as process_audio_data(), with the tone energies of each symbol
+    window measured by a DFT-bin (Goertzel) filter bank in one matrix product.
+    """
+    audio_data = np.asarray(audio_data, dtype=np.float32)[10000:] * 100
 
-    def bandpass_filter(data, lowcut, highcut, sample_rate, order=5):
-        """
-        Apply a bandpass filter to the data.
-        """
-        b, a = butter_bandpass(lowcut, highcut, sample_rate, order=order)
-        y = lfilter(b, a, data)
-        return y
+    # Align to the matched '001011' preamble if there is one, else to the first tone onset
+    starts = find_preambles(audio_data, PREAMBLE_SEGMENTS, SAMPLE_RATE, others=freqs) if PREAMBLE_SEGMENTS else []
+    start = starts[0] if starts else None
 
-    def avg(arr):
-        """
-        Calculate the average of an array.
-        """
-        return sum(arr) / len(arr) 
-    
+    frame, energies, _ = MODEM.demodulate(audio_data, SAMPLE_RATE, start, vector=Frame, track=TIMING_RECOVERY)
+    reliability = MODEM.reliabilities(energies)
+
+    return frame, reliability
+
+def process_audio_baseband(audio_data):
+    """
+    Like process_audio_goertzel(), with each tone mixed down to complex
+    baseband and decimated (25x, to 800 Hz) before the symbol energies are
+    measured. The frame is aligned on the matched preamble, or on the
+    baseband onset if there is none, and symbols are then read in fixed
+    steps: TIMING_RECOVERY does not apply to this path.
+    """
+    audio_data = np.asarray(audio_data, dtype=np.float32)[10000:] * 100
+
+    starts = find_preambles(audio_data, PREAMBLE_SEGMENTS, SAMPLE_RATE, others=freqs) if PREAMBLE_SEGMENTS else []
+    start = starts[0] if starts else None
 
-    audio_data = np.array(audio_data)
-    audio_data *= 100
+    # One front-end per slot: decoder threads must not share its stream state
+    front_end = BasebandFrontEnd(freqs, SAMPLE_RATE)
+    energies, _ = front_end.demodulate(audio_data, BIT_DURATION, start)
+    frame = Frame.from_symbols(MODEM.decide(energies).tolist(), BITS_PER_SYMBOL)
+    reliability = MODEM.reliabilities(energies)
+
+    return frame, reliability
+
+def process_audio_data(audio_data):
+    # The bandpass path finds the start from steps in the M-FSK bands only;
+    # multi-tone frames are always aligned on their pilot by the Goertzel path
+    if DEMODULATOR == 'baseband':
+        return process_audio_baseband(audio_data)
+    if DEMODULATOR == 'goertzel' or SYMBOL_MODE == 'multitone':
+        return process_audio_goertzel(audio_data)
+
+    audio_data = np.asarray(audio_data) * 100
     audio_data = audio_data[10000:]
 
     noise = 0.009
 
-    def filter_data(audio_data, lowcuts, highcuts, SAMPLE_RATE, i):
-        """
-        Apply bandpass filters to extract the desired frequency ranges.
-        """
-        filtered_data = bandpass_filter(audio_data, lowcuts[i], highcuts[i], SAMPLE_RATE)
-        filtered_data = np.abs(filtered_data)
-        for j in range(len(filtered_data)):
-            # if filtered_data[j] > 0.5:
-            #     filtered_data[j] = 0.5
-            if filtered_data[j] > noise:
-                filtered_data[j] -= noise
-        return filtered_data
-
-    f_datas = []
-    for i in range(len(freqs)):
-        f_datas.append(filter_data(audio_data, lowcuts, highcuts, SAMPLE_RATE, i))    
+    # Rectified output of every band, noise floor removed: (bands x samples) float32
+    f_datas = FILTER_BANK.envelopes(audio_data, noise)
 
     # Find the starting index of the transmission in each filtered signal
     starting_idxs = []
@@ -146,66 +210,72 @@ def process_audio_data(audio_data):
         Compute the starting index of the transmission in the filtered data.
         """
         # threshold = compute_threshold(filtered_data, threshold)
-        for i in range(1000, len(filtered_data) - 100):
-            if abs(avg(filtered_data[i:i + 100]) - avg(filtered_data[i - 100:i])) > threshold:
-                starting_idx = i
-                return starting_idx
-        return 0
+        # First i >= 1000 where the 100-sample averages before and after i differ by more than threshold
+        return step_onset(filtered_data, threshold, window=100, begin=1000)
         
     # Compute the starting index of the transmission
     for i in range(len(f_datas)):
         starting_idxs.append(compute_starting_idx(f_datas[i]))
 
-    for i in range(len(f_datas)):
-        f_datas[i] = abs(f_datas[i])
-
-    bitstring = ''
+    energies = []
     s_idx = min(starting_idxs)
 
     for i in range(s_idx, len(f_datas[0]), int(SAMPLE_RATE * BIT_DURATION)):
-        avgs = []
-        for j in range(len(f_datas)):
-            avgs.append(avg(f_datas[j][i:i + int(SAMPLE_RATE * BIT_DURATION)]))
-        max_avg = max(avgs)
-        added_bs = mapping[avgs.index(max_avg)]
-        bitstring += added_bs
+        # Average envelope of every band over the symbol
+        energies.append(f_datas[:, i:i + int(SAMPLE_RATE * BIT_DURATION)].mean(axis=1))
 
     plot_data(f_datas)
 
-    return bitstring
+    # Strongest band per symbol, with the band energies kept as per-bit
+    # reliabilities for soft-decision decoding
+    energies = np.array(energies).reshape(-1, len(freqs))
+    symbols = MODEM.decide(energies).tolist()
+    reliability = MODEM.reliabilities(energies)
+
+    return Frame.from_symbols(symbols, BITS_PER_SYMBOL), reliability
 
 def decode_bitstring(bitstring):
     """
     Decode the received bitstream to extract the actual message and source.
     """
     global DEVICE_ID
-    preambles = ["001011"]  # Preamble to indicate the start of a valid message
-    for preamble in preambles:
-        if preamble == bitstring[:len(preamble)]:
-            without_pr = bitstring[len(preamble):]
-            # First 5 bits represent the length of the message
-            length = int(without_pr[:5], 2)
-            message = without_pr[5:5 + length]
-            # Next 2 bits represent the destination device
-            dest = int(message[:2], 2)
-
-            # Check if the message is meant for this device or is broadcast (0)
-            if dest == DEVICE_ID or dest == 0: 
-                source = int(message[2:4], 2)  # Extract the source device ID
-                return source, message[4:]
-            
+    # The frame must start with the preamble to be a valid message
+    if bitstring.has_preamble():
+        # Check if the message is meant for this device or is broadcast (0)
+        if bitstring.dest == DEVICE_ID or bitstring.dest == 0:
+            return bitstring.src, str(bitstring.payload)
+
     return None, None
 
+def archive_slot(slot_start):
+    """
+    Append the slot that started at absolute sample `slot_start` to the
+    capture archive (raw samples written straight from the capture buffer).
+    """
+    global slots_recorded
+    if archive is not None:
+        archive.append(capture.window(slot_start), SAMPLE_RATE, slot=slots_recorded, node=DEVICE_ID)
+    slots_recorded += 1
+
 def decode_and_print(audio_data, timestamp, count):
     """
     Decoding in a separate thread.
     """
+    bis, reliability = process_audio_data(audio_data)
+    print_frame(bis, reliability, timestamp, count)
+
+def print_frame(bis, reliability, timestamp, count):
+    """
+    Print the decoded frame for the slot, or that the slot held no valid frame.
+    """
     global DEVICE_ID
-    bis = process_audio_data(audio_data)
     print(bis)
+    if len(reliability):
+        print(f"Least reliable bits: {sorted(np.argsort(reliability)[:4].tolist())}")
     source, message = decode_bitstring(bis)
     print("\n--------------------------------------------------")
     if source is not None:
+        received.append((timestamp, source, message))
         print(f"[RECVD]: {message} {source} {timestamp}")
     else:
         print(f"{get_timestamp()} :: Invalid bitstream for {timestamp} slot")
@@ -213,6 +283,37 @@ def decode_and_print(audio_data, timestamp, count):
         print(f"Waiting till next slot...")
     print("--------------------------------------------------\n")
 
+def stream_frame_end(demod):
+    """
+    Called whenever the streaming demodulator completes symbols. Returns the
+    position (samples since the slot started) at which all the bits the
+    frame's header announces will have arrived, plus half a symbol so that
+    timing recovery can still follow a sender whose clock runs slow, or None
+    while the header is incomplete or the preamble does not match (the slot
+    is then decoded when it ends).
+    """
+    bis = Frame.from_symbols(MODEM.decide(demod.energy_matrix()).tolist(), BITS_PER_SYMBOL)
+    frame_bits = bis.frame_bits(BITS_PER_SYMBOL)
+    if frame_bits is None or not bis.has_preamble():
+        return None
+    return demod.start + frame_bits // BITS_PER_SYMBOL * demod.symbol_len + demod.symbol_len // 2
+
+def decode_at_frame_end():
+    """
+    Whether a slot is handed to the decoder as soon as the streamed symbols
+    show its frame is complete. The 'butter' path derives its onset threshold
+    from the statistics of the whole slot, so it always gets the full slot.
+    """
+    return STREAMING and (DEMODULATOR != 'butter' or SYMBOL_MODE == 'multitone')
+
+def submit_slot(slot_start, count):
+    """
+    Hand the slot's samples so far to the decoder pool while recording
+    continues; it gets a view of the capture buffer, not a copy.
+    """
+    audio_data = capture.window(slot_start)
+    if not decode_pool.submit(decode_and_print, audio_data, get_timestamp(), count):
+        print(f"{get_timestamp()} :: Decoders busy, dropped slot")
 
 
 def record_bitstream(count):
@@ -221,29 +322,43 @@ def record_bitstream(count):
     """
     global timestamps, TOTAL_DEVICES
     
-    st = time.time()
     print("==================================================")
     print(f"{get_timestamp()} :: Starting recording...\n")
     
-    # List to hold the audio data
-    audio_data = []
-
-    t = st
+    # Absolute index in the capture buffer where the current slot starts
+    slot_start = capture.written
+
+    # Streaming mode: symbols are demodulated chunk by chunk as they arrive, so
+    # the slot is decoded as soon as its frame is complete. The streamed
+    # symbols only locate the frame's end; the slot itself is decoded by
+    # process_audio_data() like a whole slot
+    streaming = decode_at_frame_end()
+    demod = StreamingDemodulator(freqs, SAMPLE_RATE, BIT_DURATION, skip=10000)
+    frame_end = None
+    frame_done = False
 
     try:
         while count > 0:
             data = stream.read(CHUNK, exception_on_overflow=False)
             chunk = np.frombuffer(data, dtype=np.float32)
-            audio_data.extend(chunk)
-            # print(abs(time.time() - t))
-            if abs(time.time() - t) > DURATION:
-
-                # Start a new thread for decoding while recording continues
-                decoding_thread = threading.Thread(target=decode_and_print, args=(audio_data, get_timestamp(), count))
-                decoding_thread.start()
-
-                t = time.time()            
-                audio_data = []
+            capture.write(chunk)
+            if streaming and frame_end is None and demod.feed(chunk * 100):
+                frame_end = stream_frame_end(demod)
+            if frame_end is not None and not frame_done and capture.written - slot_start >= frame_end:
+                submit_slot(slot_start, count)
+                frame_done = True
+            # Slots are timed by samples captured (DURATION seconds of audio), so
+            # offline audio backends can run faster than real time
+            if capture.written - slot_start >= SAMPLE_RATE * DURATION:
+                archive_slot(slot_start)
+                # Whole slot, unless its frame was already decoded
+                if not frame_done:
+                    submit_slot(slot_start, count)
+                demod.reset()
+                frame_end = None
+                frame_done = False
+
+                slot_start = capture.written
                 count -= 1
 
 
@@ -255,7 +370,68 @@ def record_bitstream(count):
         print("==================================================\n")
 
 
+def record_bitstream_callback(count):
+    """
+    Same as record_bitstream(), with capture driven by PyAudio's callback API.
+
+    The callback only queues the raw buffers; an ingest thread writes them to
+    the capture buffer and ends a slot after DURATION seconds of samples.
+    Finished slots go to the fixed decoder pool, so decoding can never block
+    capture or start new threads. Queue and overflow counts are printed when
+    the recording stops.
+    """
+    print("==================================================")
+    print(f"{get_timestamp()} :: Starting recording...\n")
+
+    slot_len = int(SAMPLE_RATE * DURATION)
+    # Streamed symbols only locate the frame's end (see record_bitstream())
+    streaming = decode_at_frame_end()
+    demod = StreamingDemodulator(freqs, SAMPLE_RATE, BIT_DURATION, skip=10000)
+    state = {'slot_start': capture.written, 'count': count, 'frame_end': None, 'frame_done': False}
+    finished = threading.Event()
+
+    def on_chunk(chunk):
+        if state['count'] <= 0:
+            return
+        if streaming and state['frame_end'] is None and demod.feed(chunk * 100):
+            state['frame_end'] = stream_frame_end(demod)
+        elapsed = capture.written - state['slot_start']
+        if state['frame_end'] is not None and not state['frame_done'] and elapsed >= state['frame_end']:
+            submit_slot(state['slot_start'], state['count'])
+            state['frame_done'] = True
+
+        if elapsed >= slot_len:
+            archive_slot(state['slot_start'])
+            if not state['frame_done']:
+                submit_slot(state['slot_start'], state['count'])
+            demod.reset()
+            state['frame_end'] = None
+            state['frame_done'] = False
+
+            state['slot_start'] = capture.written
+            state['count'] -= 1
+            if state['count'] == 0:
+                finished.set()
+
+    recorder = CallbackCapture(p, SAMPLE_RATE, CHUNK, capture, on_chunk)
+    recorder.start()
+    try:
+        while not finished.wait(0.5):
+            pass
+    except KeyboardInterrupt:
+        print("Stopped recording.")
+    finally:
+        recorder.stop()
+        print(f"\n{get_timestamp()} :: Recording stopped.")
+        print(f"Capture: {recorder.stats()}")
+        print(f"Decoders: {decode_pool.stats()}")
+        print("==================================================\n")
+
+
 def plot_data(f_datas):
+    # matplotlib is only needed for plotting
+    import matplotlib.pyplot as plt
+
         # Plot the filtered data1 and filtered data2
     plt.figure(figsize=(10, 6))
     time_axis = np.linspace(0, len(f_datas[0]) / SAMPLE_RATE, num=len(f_datas[0]))
@@ -353,19 +529,24 @@ def engine():
     # Start the countdown until the recording begins
     countdown_to_start(rem_time)
 
+    record = record_bitstream_callback if CAPTURE_MODE == 'callback' else record_bitstream
+
     while True:
         if tempctr:
-            record_bitstream(1)
+            record(1)
             tempctr -= 1
         else:
             if is_valid_time(start_time):
-                record_bitstream(TOTAL_DEVICES - 1)
+                record(TOTAL_DEVICES - 1)
 
 # Start the program
 if __name__ == "__main__":
-    engine()
-
-# Clean up the audio stream once the program ends
-stream.stop_stream()
-stream.close()
-p.terminate()
+    try:
+        engine()
+    finally:
+        # Clean up the audio stream once the program ends
+        if stream is not None:
+            stream.stop_stream()
+            stream.close()
+        decode_pool.close()
+        p.terminate()
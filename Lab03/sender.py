@@ -1,29 +1,36 @@
-import pyaudio
-import numpy as np
 import time
+import os
+import sys
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common import audio
+from common.frame import Frame
+from common.mfsk import MFSK
+from common.multitone import MultiTone
+
 # Parameters
 SAMPLE_RATE = 44100         # Audio sample rate in Hz (samples per second)
-DURATION = 1                # Duration (seconds) for transmitting each bit pair
+DURATION = 1                # Duration (seconds) for transmitting each symbol
 GAP_DURATION = 20           # Gap duration (seconds) between transmissions of different devices
 FILE_NAME = "input.txt"     # Input file containing messages
 TOTAL_DEVICES = 3           # Total number of devices in the network (Default = 3)
 DEVICE_ID = 1               # Device ID of the current device (Default = 1)
+MODULATION = 'cpfsk'        # 'fsk' (tones restart at phase 0) or 'cpfsk' (continuous phase)
+RAMP = 0.01                 # Raised-cosine frequency transition (seconds) for 'cpfsk'
 
-# Frequencies mapped to each 2-bit pair
-FREQS = [3300, 4100, 4700, 5900]  # Frequencies for '00', '01', '10', '11'
+SYMBOL_MODE = 'mfsk'        # 'mfsk' (one tone per symbol) or 'multitone' (one on/off tone per bit, plus a pilot)
+BITS_PER_SYMBOL = 2         # Bits per symbol ('mfsk' 2: 4 tones, 3: 8, 4: 16; 'multitone' N: N + 1 tones); must match the receiver
 
-# Bit pair to frequency mapping
-mapping = {
-    '00': [FREQS[0]],
-    '01': [FREQS[1]],
-    '10': [FREQS[2]],
-    '11': [FREQS[3]]
-}
+# 'mfsk': tone per symbol value; with 2 bits per symbol 3300, 4100, 4700, 5900 Hz for '00', '01', '10', '11'
+# 'multitone': pilot and data tones spread evenly over 3300-5900 Hz, sounding together
+if SYMBOL_MODE == 'multitone':
+    MODEM = MultiTone.for_lab('lab03', BITS_PER_SYMBOL, DURATION)
+else:
+    MODEM = MFSK.for_lab('lab03', BITS_PER_SYMBOL, DURATION)
 
-# Initialize PyAudio for audio transmission
-p = pyaudio.PyAudio()
+# Initialize the audio backend (PyAudio unless $AUDIO_BACKEND selects a file or memory)
+p = audio.open_backend()
 
 def get_timestamp():
     """Get the current timestamp in the format 'HH:MM:SS.ms'."""
@@ -39,72 +46,36 @@ def encode_message(bitstring, dest):
     dest (int): Destination device ID.
 
     Returns:
-    str: Encoded message with the frame header and bitstring.
+    Frame: Encoded message with the frame header and bitstring, padded to whole symbols
+    (ValueError if the message or an address does not fit the header).
     """
     global DEVICE_ID
-    new_bitstring = bitstring
-    
-    # Ensure the bitstring length is even for 2-bit transmission
-    if len(bitstring) % 2 == 0:
-        new_bitstring += '0'
-    
-    # Add frame header with destination and source device ID
-    return "001011" + format(len(bitstring) + 4, '05b') + format(dest, '02b') + format(DEVICE_ID, '02b') + new_bitstring
-
-def generate_combined_tone(frequencies, duration, sample_rate):
-    """
-    Generates an audio signal by combining sine waves of multiple frequencies.
-
-    Parameters:
-    frequencies (list): List of frequencies to be combined.
-    duration (float): Duration of the tone in seconds.
-    sample_rate (int): Number of audio samples per second.
-
-    Returns:
-    numpy.ndarray: The combined tone generated.
-    """
-    # Time array for the given duration
-    t = np.linspace(0, duration, int(sample_rate * duration), False)
-    combined_tone = np.zeros_like(t)
-    
-    # Sum sine waves of each frequency
-    for freq in frequencies:
-        tone = np.sin(2 * np.pi * freq * t)
-        combined_tone += tone
-
-    # Normalize the tone to prevent clipping
-    combined_tone /= len(frequencies)
-
-    return combined_tone
+    return Frame.build(bitstring, dest, DEVICE_ID, bits_per_symbol=MODEM.bits_per_symbol)
 
 def transmit(bitstring):
     """
     Transmits the bitstring as audio signals using the pre-defined frequencies.
     
     Parameters:
-    bitstring (str): The encoded bitstring to transmit.
+    bitstring (Frame): The encoded frame to transmit.
     """
     print(f"{get_timestamp()} :: Started transmission.")
+
+    # Assemble the whole frame up front, one symbol per BITS_PER_SYMBOL bits,
+    # so playback is a single write with no per-symbol synthesis
+    frame = MODEM.modulate(bitstring, SAMPLE_RATE, modulation=MODULATION, ramp=RAMP)
     
     # Delay for 2 seconds before actual transmission (simulation purpose)
     time.sleep(2)
     
     # Open PyAudio stream for audio output
-    stream = p.open(format=pyaudio.paFloat32,
+    stream = p.open(format=audio.paFloat32,
                     channels=1,
                     rate=SAMPLE_RATE,
                     output=True)
 
     print("Transmitting data...")
-
-    # Loop through the bitstring, process 2 bits at a time
-    for i in range(0, len(bitstring), 2):
-        block = bitstring[i:i+2]
-        frequencies = mapping.get(block, [FREQS[0]])
-        combined_tone = generate_combined_tone(frequencies, DURATION, SAMPLE_RATE)
-
-        # Play the tone
-        stream.write(combined_tone.astype(np.float32).tobytes())
+    stream.write(frame.tobytes())
 
     print(f"{get_timestamp()} :: Transmission Completed.")
     print("--------------------------------------------------\n")
@@ -225,15 +196,19 @@ def engine():
         # Read messages from the file
         bitstring, dest = read_file()
         if bitstring is not None:
-            encoded_bitstring = encode_message(bitstring, dest)
             print("\n--------------------------------------------------")
             print(f"{get_timestamp()} :: Detected Message: \t\t{bitstring}")
             print(f"{get_timestamp()} :: Destination Node ID: \t\t{dest}")
             
             # Validate the destination and message length before adding to the queue
             if (dest <= TOTAL_DEVICES and dest >= 0) and len(bitstring) <= 15:
-                msg_queue.append(encoded_bitstring)
-                print(f"{get_timestamp()} :: One msg added to queue: \t{encoded_bitstring}")
+                try:
+                    encoded_bitstring = encode_message(bitstring, dest)
+                except ValueError as e:
+                    print(f"{get_timestamp()} :: {e} Discarding message....")
+                else:
+                    msg_queue.append(encoded_bitstring)
+                    print(f"{get_timestamp()} :: One msg added to queue: \t{encoded_bitstring}")
             else:
                 if not (dest <= TOTAL_DEVICES and dest >= 0):
                     print(f"{get_timestamp()} :: Destination ID is invalid. Discarding message....")
@@ -1,11 +1,20 @@
 import pyaudio
-import numpy as np
 import time
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.frame import BitVector
+from common.mfsk import MFSK
 
 # Parameters
 SAMPLE_RATE = 44100  # Sample rate (Hz)
 DURATION = 1       # Duration for each bit (seconds)
-FREQS = [5000, 5500, 6000, 6500, 7000, 7500, 8000, 8500]  # Frequencies for bits '000', '001', '010', '011', '100', '101', '110', '111'
+BITS_PER_SYMBOL = 3  # Bits carried by each tone
+MODEM = MFSK.for_lab('lab03', BITS_PER_SYMBOL, DURATION)
+FREQS = list(MODEM.freqs)  # Frequencies for bits '000', '001', '010', '011', '100', '101', '110', '111'
+MODULATION = 'cpfsk'  # 'fsk' (tones restart at phase 0) or 'cpfsk' (continuous phase)
+RAMP = 0.01          # Raised-cosine frequency transition (seconds) for 'cpfsk'
 
 # Initialize PyAudio
 p = pyaudio.PyAudio()
@@ -21,62 +30,23 @@ def encode_message(bitstring):
     encoded_message = f"{bitstring}{destination}"  # Append destination
     return encoded_message
 
-def generate_combined_tone(frequencies, duration, sample_rate):
-    """
-    Generate a combined tone for multiple frequencies.
-    """
-    t = np.linspace(0, duration, int(sample_rate * duration), False)
-    combined_tone = np.zeros_like(t)
-    
-    for freq in frequencies:
-        tone = np.sin(2 * np.pi * freq * t)
-        combined_tone += tone
-
-    # Normalize the combined tone to prevent clipping
-    combined_tone /= len(frequencies)
-
-    return combined_tone
-
 def transmit(bitstring):
     """
     Transmit the bitstring as audio signals using specific frequencies.
     """
-    mapping = {
-        '000' : [FREQS[0]],
-        '001' : [FREQS[1]],
-        '010' : [FREQS[2]],
-        '011' : [FREQS[3]],
-        '100' : [FREQS[4]],
-        '101' : [FREQS[5]],
-        '110' : [FREQS[6]],
-        '111' : [FREQS[7]]
-    }
-
     stream = p.open(format=pyaudio.paFloat32,
                     channels=1,
                     rate=SAMPLE_RATE,
                     output=True)
 
     print("Transmitting data...")
-    # combined_tone = generate_combined_tone(FREQS, 1, SAMPLE_RATE)  # Duration is 2 seconds
-
-    # Play the combined tone
-    # stream.write(combined_tone.astype(np.float32).tobytes())
-
-    # Split the bitstring into blocks of size 2
-    for i in range(0, len(bitstring), 3):
-        # Extract 2 bits
-        block = bitstring[i:i+3]
-        print(f"Transmitting block: {block}")
-
-        # Get the corresponding frequencies for the current 2-bit block
-        frequencies = mapping.get(block, [FREQS[0]])  # Default to '00' if unknown block
-
-        # Generate the combined tone for the block's frequencies
-        combined_tone = generate_combined_tone(frequencies, DURATION, SAMPLE_RATE)
 
-        # Play the combined tone
-        stream.write(combined_tone.astype(np.float32).tobytes())
+    # One symbol per 3-bit block (a short last block is padded with zeros),
+    # synthesized as a single frame and played in one write
+    symbols = MODEM.pack(BitVector.from_string(bitstring))
+    print(f"Transmitting blocks: {' '.join(format(symbol, f'0{BITS_PER_SYMBOL}b') for symbol in symbols)}")
+    frame = MODEM.modulate(bitstring, SAMPLE_RATE, modulation=MODULATION, ramp=RAMP)
+    stream.write(frame.tobytes())
 
     print("Transmission complete.")
 
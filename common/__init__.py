@@ -0,0 +1,6 @@
+"""
+Shared helpers for the CS378 acoustic modem labs (Lab02, Lab03).
+
+The lab scripts add the repository root to ``sys.path`` and import the
+modules from here, e.g. ``from common.crc import get_engine``.
+"""
@@ -0,0 +1,185 @@
+"""
+Append-only archive of raw capture segments.
+
+The receivers used to dump each recording with np.savetxt('audio.txt'),
+which formats every sample as text while the next recording waits, and
+overwrites the previous capture. An archive instead keeps two files:
+
+    PATH.f32 - the raw float32 samples of every segment, back to back
+    PATH.idx - one fixed-size record per segment (INDEX_DTYPE): where its
+               samples start and how many there are, the slot number, the
+               capture timestamp, the node (device id) and the sample rate
+
+append() writes a segment's samples straight from the capture buffer with
+ndarray.tofile() (no text, no intermediate copy), then its index record. A
+crash between the two leaves unindexed samples at the end of PATH.f32,
+which are ignored; the next append() starts after them. Nothing is ever
+rewritten, so every capture of every run is kept.
+
+Readers map PATH.f32 with np.memmap, so segment() and window() return
+read-only views of the file without reading the rest of it. The decoder can
+replay any recorded slot, and a plot can show any stretch of one, however
+large the archive grows.
+
+Usage:
+    archive = CaptureArchive('captures')
+    archive.append(capture.window(slot_start), 20000, slot=3, node=1)
+    samples = archive.segment(-1)                  # last segment, zero-copy
+    python -m common.archive captures              # list the segments
+    python -m common.archive captures --plot 0 --start 2 --stop 6
+"""
+
+import argparse
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+# One index record per segment
+INDEX_DTYPE = np.dtype([
+    ('offset', '<i8'),       # first sample of the segment in PATH.f32
+    ('length', '<i8'),       # number of samples
+    ('slot', '<i4'),         # slot number given by the recorder
+    ('node', '<i4'),         # device id of the recording node
+    ('sample_rate', '<i4'),  # sample rate (Hz)
+    ('timestamp', '<f8'),    # time.time() of the first sample
+])
+
+SAMPLE_DTYPE = np.dtype('<f4')
+
+
+class CaptureArchive:
+    """
+    Raw float32 capture segments plus their index (see the module docstring).
+
+    Attributes:
+    path (str): Archive path without extension.
+    data_path (str): PATH.f32, the samples.
+    index_path (str): PATH.idx, the segment records.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.data_path = path + '.f32'
+        self.index_path = path + '.idx'
+        self._lock = threading.Lock()
+        self._map = None
+
+    def append(self, samples, sample_rate, slot=0, node=0, timestamp=None):
+        """
+        Append one segment.
+
+        Parameters:
+        samples (array-like): Samples to store as float32 (a view of the
+            capture buffer is written without copying).
+        sample_rate (int): Sample rate of `samples`.
+        slot (int): Slot number of the recording.
+        node (int): Device id of the recording node.
+        timestamp (float): time.time() of the first sample; by default the
+            segment is taken to have just finished recording.
+
+        Returns:
+        int: Number of the new segment.
+        """
+        samples = np.ascontiguousarray(samples, dtype=SAMPLE_DTYPE)
+        if timestamp is None:
+            timestamp = time.time() - len(samples) / sample_rate
+        with self._lock:
+            with open(self.data_path, 'ab') as data:
+                offset = data.tell() // SAMPLE_DTYPE.itemsize
+                samples.tofile(data)
+            record = np.array([(offset, len(samples), slot, node, sample_rate, timestamp)], dtype=INDEX_DTYPE)
+            with open(self.index_path, 'ab') as index:
+                record.tofile(index)
+            return os.path.getsize(self.index_path) // INDEX_DTYPE.itemsize - 1
+
+    @property
+    def index(self):
+        """All segment records as a structured INDEX_DTYPE array."""
+        if not os.path.exists(self.index_path):
+            return np.zeros(0, dtype=INDEX_DTYPE)
+        return np.fromfile(self.index_path, dtype=INDEX_DTYPE)
+
+    def __len__(self):
+        if not os.path.exists(self.index_path):
+            return 0
+        return os.path.getsize(self.index_path) // INDEX_DTYPE.itemsize
+
+    def find(self, slot=None, node=None):
+        """Numbers of the segments recorded in `slot` and/or by `node`."""
+        index = self.index
+        match = np.ones(len(index), dtype=bool)
+        if slot is not None:
+            match &= index['slot'] == slot
+        if node is not None:
+            match &= index['node'] == node
+        return np.flatnonzero(match).tolist()
+
+    def _samples(self, end):
+        """Read-only memory map of PATH.f32 covering at least `end` samples."""
+        if self._map is None or len(self._map) < end:
+            self._map = np.memmap(self.data_path, dtype=SAMPLE_DTYPE, mode='r')
+        return self._map
+
+    def segment(self, number):
+        """
+        Samples of segment `number` (negative counts from the end).
+
+        Returns:
+        numpy.ndarray: Read-only float32 view of the archive file.
+        """
+        record = self.index[number]
+        offset, length = int(record['offset']), int(record['length'])
+        return self._samples(offset + length)[offset:offset + length]
+
+    def window(self, number, start=0.0, stop=None):
+        """
+        Samples of segment `number` from `start` to `stop` seconds into it
+        (to its end if `stop` is None), as a read-only view.
+        """
+        rate = int(self.index[number]['sample_rate'])
+        samples = self.segment(number)
+        stop = len(samples) if stop is None else int(stop * rate)
+        return samples[int(start * rate):stop]
+
+
+def plot_window(archive, number, start=0.0, stop=None, path=None):
+    """Plot part of a segment against time and save it to `path` (default: PATH-<number>.png)."""
+    import matplotlib.pyplot as plt
+
+    record = archive.index[number]
+    rate = int(record['sample_rate'])
+    samples = archive.window(number, start, stop)
+    time_axis = start + np.arange(len(samples)) / rate
+
+    plt.figure(figsize=(10, 4))
+    plt.plot(time_axis, samples, linewidth=0.5)
+    plt.title(f"Segment {number}: slot {record['slot']}, node {record['node']}")
+    plt.xlabel("Time (seconds)")
+    plt.ylabel("Amplitude")
+    plt.grid(True, which='both', linestyle='--', linewidth=0.5)
+    plt.tight_layout()
+    path = path or f"{archive.path}-{number}.png"
+    plt.savefig(path)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List or plot the segments of a capture archive")
+    parser.add_argument("path", help="Archive path without extension (PATH.f32 / PATH.idx)")
+    parser.add_argument("--plot", type=int, default=None, help="Plot this segment")
+    parser.add_argument("--start", type=float, default=0.0, help="Plot from this many seconds into the segment")
+    parser.add_argument("--stop", type=float, default=None, help="Plot up to this many seconds into the segment")
+    args = parser.parse_args()
+
+    archive = CaptureArchive(args.path)
+    if args.plot is not None:
+        print(f"Saved {plot_window(archive, args.plot, args.start, args.stop)}")
+    else:
+        print("Segment\tSlot\tNode\tRate\tSeconds\tRecorded")
+        for number, record in enumerate(archive.index):
+            recorded = datetime.fromtimestamp(record['timestamp']).strftime("%Y-%m-%d %H:%M:%S")
+            seconds = record['length'] / record['sample_rate']
+            print(f"{number}\t{record['slot']}\t{record['node']}\t{record['sample_rate']}\t{seconds:.2f}\t{recorded}")
@@ -0,0 +1,312 @@
+"""
+Pluggable audio backends with the part of the PyAudio API the labs use.
+
+Every backend has open(format=, channels=, rate=, input=/output=,
+frames_per_buffer=, stream_callback=) and terminate(), and its streams have
+read(), write(), start_stream(), stop_stream() and close(). The scripts can
+therefore switch from sound hardware to files or memory without other
+changes:
+
+    pyaudio  - the real sound card (PyAudio is only imported here)
+    memory   - an in-process Air: output streams append to it, input streams
+               read it back through an optional common.channel.Channel
+    wav:PATH - write/read a 16-bit PCM WAV file
+    raw:PATH - write/read raw float32 samples (their rate in PATH.rate)
+
+open_backend() picks one from a spec string, by default from the
+AUDIO_BACKEND environment variable, e.g.
+
+    AUDIO_BACKEND=wav:frame.wav python Lab03/sender.py
+    AUDIO_BACKEND=wav:frame.wav python Lab03/receiver.py
+
+Blocking reads from an offline backend run as fast as the reader consumes
+samples unless `speed` is set (1.0 = real time; also $AUDIO_SPEED).
+Callback streams have no reader to wait for, so like a sound card they
+deliver chunks in real time unless `speed` says otherwise; pushing them
+as fast as possible would only overflow the consumer's queue. Input past
+the end of the recorded audio is silence (plus channel noise).
+"""
+
+import os
+import threading
+import time
+import wave
+from fractions import Fraction
+
+import numpy as np
+from scipy.signal import resample_poly
+
+# PyAudio's sample format and callback constants, so callers need not import pyaudio
+paFloat32 = 1
+paContinue = 0
+paInputOverflow = 2
+
+DEFAULT_BACKEND = 'pyaudio'
+
+
+def resample(samples, rate_in, rate_out):
+    """Resample float samples from `rate_in` to `rate_out` (polyphase)."""
+    samples = np.asarray(samples, dtype=np.float32)
+    if rate_in == rate_out or not len(samples):
+        return samples
+    ratio = Fraction(int(rate_out), int(rate_in)).limit_denominator(1000)
+    return resample_poly(samples, ratio.numerator, ratio.denominator).astype(np.float32)
+
+
+class Air:
+    """
+    In-memory medium shared by the memory backend's streams.
+
+    Transmissions are appended one after another at `sample_rate`, after
+    `lead_in` seconds of silence.
+    """
+
+    def __init__(self, sample_rate=48000, lead_in=1.0):
+        self.sample_rate = sample_rate
+        self._parts = [np.zeros(int(sample_rate * lead_in), dtype=np.float32)]
+        self._samples = None
+        self.version = 0
+
+    def transmit(self, samples, sample_rate):
+        self._parts.append(resample(samples, sample_rate, self.sample_rate))
+        self._samples = None
+        self.version += 1
+
+    def samples(self):
+        if self._samples is None:
+            self._samples = np.concatenate(self._parts)
+        return self._samples
+
+
+class _OutputStream:
+    def __init__(self, sink, rate):
+        self.sink = sink
+        self.rate = rate
+
+    def write(self, data, num_frames=None, exception_on_underflow=False):
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            data = np.frombuffer(data, dtype=np.float32)
+        self.sink(np.asarray(data, dtype=np.float32), self.rate)
+
+    def start_stream(self):
+        pass
+
+    def stop_stream(self):
+        pass
+
+    def is_active(self):
+        return True
+
+    def close(self):
+        pass
+
+
+class _InputStream:
+    """
+    Reads a source timeline (via `source()` -> (samples, rate, version)),
+    resampled to `rate` and passed through `channel`.
+    """
+
+    def __init__(self, source, rate, chunk, channel=None, callback=None, speed=None):
+        self.source = source
+        self.rate = rate
+        self.chunk = chunk
+        self.channel = channel
+        self.callback = callback
+        # A callback consumer cannot push back, so pace it like a sound card
+        self.speed = speed or (1.0 if callback is not None else None)
+        self.position = 0
+        self._rendered = np.zeros(0, dtype=np.float32)
+        self._version = None
+        self._running = False
+        self._thread = None
+        self._started = time.time()
+
+    def _render(self):
+        samples, rate, version = self.source()
+        if version == self._version:
+            return
+        self._version = version
+        rendered = resample(samples, rate, self.rate)
+        if self.channel is not None:
+            rendered = self.channel.apply(rendered, self.rate)
+        self._rendered = rendered
+
+    def read(self, num_frames, exception_on_overflow=False):
+        self._render()
+        if self.speed:
+            # Do not run ahead of real time (scaled by speed)
+            due = self._started + (self.position + num_frames) / (self.rate * self.speed)
+            delay = due - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+        out = self._rendered[self.position:self.position + num_frames]
+        if len(out) < num_frames:
+            fill = np.zeros(num_frames - len(out), dtype=np.float32)
+            if self.channel is not None:
+                fill += self.channel.noise(len(fill), self.rate).astype(np.float32)
+            out = np.concatenate([out, fill])
+        self.position += num_frames
+        return out.astype(np.float32).tobytes()
+
+    def _pump(self):
+        while self._running:
+            data = self.read(self.chunk)
+            self.callback(data, self.chunk, {}, 0)
+
+    def start_stream(self):
+        self._started = time.time() - self.position / (self.rate * (self.speed or 1))
+        if self.callback is not None and not self._running:
+            self._running = True
+            self._thread = threading.Thread(target=self._pump, daemon=True)
+            self._thread.start()
+
+    def stop_stream(self):
+        self._running = False
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def is_active(self):
+        return self._running or self.callback is None
+
+    def close(self):
+        self.stop_stream()
+
+
+class _Backend:
+    """Common open()/terminate() for the offline backends."""
+
+    def __init__(self, channel=None, speed=None):
+        self.channel = channel
+        self.speed = speed
+
+    def open(self, format=paFloat32, channels=1, rate=44100, input=False, output=False,
+             frames_per_buffer=1024, stream_callback=None, start=True, **kwargs):
+        if format != paFloat32 or channels != 1:
+            raise ValueError("Offline audio backends support mono float32 only.")
+        if output:
+            return _OutputStream(self._sink, rate)
+        stream = _InputStream(self._source, rate, frames_per_buffer, self.channel,
+                              stream_callback, self.speed)
+        if start:
+            stream.start_stream()
+        return stream
+
+    def terminate(self):
+        pass
+
+
+class MemoryBackend(_Backend):
+    """Streams write to and read from a shared Air."""
+
+    def __init__(self, air=None, channel=None, speed=None):
+        super().__init__(channel, speed)
+        self.air = air if air is not None else Air()
+
+    def _sink(self, samples, rate):
+        self.air.transmit(samples, rate)
+
+    def _source(self):
+        return self.air.samples(), self.air.sample_rate, self.air.version
+
+
+class FileBackend(_Backend):
+    """
+    Output streams write `path`; input streams read it. WAV files are 16-bit
+    PCM at the stream's rate. Raw files are float32 at the rate of the stream
+    that wrote them, which is kept in a PATH.rate sidecar file; a raw file
+    without one is taken to be at `raw_rate` (default: the rate of the stream
+    that reads it).
+    """
+
+    def __init__(self, path, raw=None, raw_rate=None, channel=None, speed=None):
+        super().__init__(channel, speed)
+        self.path = path
+        self.raw = raw if raw is not None else not path.lower().endswith('.wav')
+        self.raw_rate = raw_rate
+        self._stream_rate = None
+        self._written = None
+        self._loaded = None
+
+    def _sink(self, samples, rate):
+        if self._written is None:
+            self._written = rate
+            if self.raw:
+                open(self.path, 'wb').close()
+                with open(self.path + '.rate', 'w') as file:
+                    file.write(f"{rate}\n")
+            else:
+                self._wav = wave.open(self.path, 'wb')
+                self._wav.setnchannels(1)
+                self._wav.setsampwidth(2)
+                self._wav.setframerate(rate)
+        if rate != self._written:
+            samples = resample(samples, rate, self._written)
+
+        if self.raw:
+            with open(self.path, 'ab') as file:
+                samples.astype(np.float32).tofile(file)
+        else:
+            pcm = np.clip(samples, -1.0, 1.0) * 32767
+            self._wav.writeframes(pcm.astype('<i2').tobytes())
+
+    def _source(self):
+        if self._loaded is None:
+            if self.raw:
+                samples = np.fromfile(self.path, dtype=np.float32)
+                rate = self._raw_file_rate() or self.raw_rate or self._stream_rate
+            else:
+                with wave.open(self.path, 'rb') as wav:
+                    rate = wav.getframerate()
+                    pcm = np.frombuffer(wav.readframes(wav.getnframes()), dtype='<i2')
+                    samples = pcm.reshape(-1, wav.getnchannels())[:, 0].astype(np.float32) / 32767
+            self._loaded = (samples, rate)
+        samples, rate = self._loaded
+        return samples, rate, 0
+
+    def _raw_file_rate(self):
+        """Sample rate recorded next to a raw file by its writer, or None."""
+        if not os.path.exists(self.path + '.rate'):
+            return None
+        with open(self.path + '.rate') as file:
+            rate = int(file.read())
+        if self.raw_rate is not None and self.raw_rate != rate:
+            raise ValueError(f"{self.path} holds {rate} Hz samples, not {self.raw_rate} Hz.")
+        return rate
+
+    def open(self, rate=44100, **kwargs):
+        if self._stream_rate is None:
+            self._stream_rate = rate
+        return super().open(rate=rate, **kwargs)
+
+    def terminate(self):
+        if self._written is not None and not self.raw:
+            self._wav.close()
+        self._written = None
+
+
+# Air shared by every 'memory' backend opened in this process
+_shared_air = Air()
+
+
+def open_backend(spec=None, channel=None, speed=None):
+    """
+    Return an audio backend for `spec` ('pyaudio', 'memory', 'wav:PATH' or
+    'raw:PATH'); defaults to $AUDIO_BACKEND, else 'pyaudio'. `speed`
+    defaults to $AUDIO_SPEED (offline backends only).
+    """
+    spec = spec or os.environ.get('AUDIO_BACKEND', DEFAULT_BACKEND)
+    speed = speed or float(os.environ.get('AUDIO_SPEED', 0)) or None
+    kind, _, path = spec.partition(':')
+    if kind == 'pyaudio':
+        import pyaudio
+        return pyaudio.PyAudio()
+    if kind == 'memory':
+        return MemoryBackend(_shared_air, channel, speed)
+    if kind in ('wav', 'raw'):
+        if not path:
+            raise ValueError(f"Audio backend {kind!r} needs a file path, e.g. '{kind}:capture.{kind}'.")
+        return FileBackend(path, raw=(kind == 'raw'), channel=channel, speed=speed)
+    raise ValueError(f"Unknown audio backend {spec!r}.")
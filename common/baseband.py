@@ -0,0 +1,209 @@
+"""
+Complex-baseband front-end: mix each FSK channel down to 0 Hz and decimate.
+
+All the information in an FSK channel sits within a few hundred Hz of its
+tone, yet the receivers filter and detect at the full capture rate. The
+front-end multiplies the input by a precomputed complex oscillator per
+channel, which moves the tone to 0 Hz, and then low-passes and decimates
+every channel with one FIR filter. Only every `decimation`-th output is
+computed (scipy's polyphase upfirdn()), so each channel costs one
+complex multiply plus taps / decimation multiply-adds per input sample.
+Everything after that, such as onset search, symbol energies and timing,
+runs at the decimated rate.
+
+The oscillator tables are exact: a tone of f Hz at sample_rate repeats
+after sample_rate / gcd(f, sample_rate) samples, so one period is stored
+and indexed modulo its length. The front-end keeps its oscillator phase and
+filter history between process() calls, so chunks from a live stream give
+the same output as one call on the whole recording. Tables and filter taps
+are cached, so a front-end per stream or per decoder thread costs nothing
+to set up.
+
+Usage:
+    front = BasebandFrontEnd([3300, 4100, 4700, 5900], 20000)   # 25x -> 800 Hz
+    energies, start = front.demodulate(audio_data, symbol_duration=1)
+"""
+
+from functools import lru_cache
+from math import gcd
+
+import numpy as np
+from scipy.signal import firwin, upfirdn
+
+from common.demod import ONSET_BLOCK, RESOLUTION, sub_blocks
+
+# Low-pass cutoff of each channel (Hz)
+BANDWIDTH = 200.0
+
+# FIR taps per polyphase branch (taps = TAPS_PER_PHASE * decimation + 1)
+TAPS_PER_PHASE = 8
+
+
+@lru_cache(maxsize=64)
+def oscillator_table(freq, sample_rate):
+    """
+    Return one period of exp(-2j*pi*freq*n/sample_rate) as complex64. The
+    returned array is read-only since it is shared.
+    """
+    period = int(sample_rate) // gcd(int(round(freq)), int(sample_rate))
+    n = np.arange(period)
+    table = np.exp(-2j * np.pi * freq * n / sample_rate).astype(np.complex64)
+    table.setflags(write=False)
+    return table
+
+
+@lru_cache(maxsize=16)
+def lowpass_taps(n_taps, bandwidth, sample_rate):
+    """Return the cached, read-only float32 low-pass FIR (Hamming window, unit DC gain)."""
+    taps = firwin(n_taps, bandwidth, fs=sample_rate).astype(np.float32)
+    taps.setflags(write=False)
+    return taps
+
+
+def max_decimation(sample_rate, bandwidth=BANDWIDTH):
+    """Largest decimation whose output rate is still 4x the channel bandwidth."""
+    return max(int(sample_rate // (4 * bandwidth)), 1)
+
+
+class BasebandFrontEnd:
+    """
+    Mixer, low-pass filter and decimator for a set of FSK channels.
+
+    Attributes:
+    freqs (tuple): Tone frequency of each channel.
+    sample_rate (int): Input sample rate.
+    decimation (int): Input samples per output sample.
+    output_rate (float): Sample rate of the baseband output.
+    taps (numpy.ndarray): Low-pass FIR coefficients (unit DC gain).
+    delay (float): Group delay of the filter in input samples.
+    """
+
+    def __init__(self, freqs, sample_rate, decimation=None, bandwidth=BANDWIDTH, taps_per_phase=TAPS_PER_PHASE):
+        self.freqs = tuple(freqs)
+        self.sample_rate = sample_rate
+        self.decimation = decimation or max_decimation(sample_rate, bandwidth)
+        self.output_rate = sample_rate / self.decimation
+        if bandwidth >= self.output_rate / 2:
+            raise ValueError(f"A {bandwidth:.0f} Hz channel does not fit in a {self.output_rate:.0f} Hz output; "
+                             f"use a decimation of at most {max_decimation(sample_rate, bandwidth)}.")
+        n_taps = taps_per_phase * self.decimation + 1
+        self.taps = lowpass_taps(n_taps, bandwidth, sample_rate)
+        self.delay = (n_taps - 1) / 2
+        self._tables = [oscillator_table(freq, sample_rate) for freq in self.freqs]
+        self.reset()
+
+    def reset(self):
+        """Start again from sample 0 (oscillator phase 0, empty filter history)."""
+        self.position = 0
+        self._history = np.zeros((len(self.freqs), len(self.taps) - 1), dtype=np.complex64)
+        self._next = 0  # index (in the next chunk) of the next input sample that ends an output
+
+    def mix(self, chunk):
+        """
+        Multiply a chunk by every channel's oscillator (continuing its phase).
+
+        Returns:
+        numpy.ndarray: (n_channels x len(chunk)) complex64 mixed samples.
+        """
+        chunk = np.asarray(chunk, dtype=np.float32)
+        mixed = np.empty((len(self.freqs), len(chunk)), dtype=np.complex64)
+        for channel, table in enumerate(self._tables):
+            index = (self.position + np.arange(len(chunk))) % len(table)
+            np.multiply(chunk, table[index], out=mixed[channel])
+        return mixed
+
+    def process(self, chunk):
+        """
+        Mix, filter and decimate the next chunk of input samples.
+
+        Output sample k is the filter output ending at input sample
+        k * decimation (counted from the last reset()).
+
+        Returns:
+        numpy.ndarray: (n_channels x n_out) complex64 baseband samples.
+        """
+        mixed = self.mix(chunk)
+        self.position += mixed.shape[1]
+
+        buffer = np.concatenate([self._history, mixed], axis=1)
+        ends = np.arange(self._next, mixed.shape[1], self.decimation)
+        out = np.zeros((len(self.freqs), 0), dtype=np.complex64)
+        if len(ends):
+            # The history is exactly taps - 1 = TAPS_PER_PHASE * decimation
+            # samples, so upfirdn() output k + taps_per_phase, counted from
+            # buffer[ends[0]], is the full filter window ending at chunk
+            # sample ends[k]. upfirdn() computes only the kept outputs.
+            skip = self._history.shape[1] // self.decimation
+            filtered = upfirdn(self.taps, buffer[:, ends[0]:], down=self.decimation, axis=1)
+            out = filtered[:, skip:skip + len(ends)]
+
+        self._next = (ends[-1] + self.decimation if len(ends) else self._next) - mixed.shape[1]
+        self._history = buffer[:, buffer.shape[1] - self._history.shape[1]:]
+        return out.astype(np.complex64)
+
+    def to_input_index(self, k):
+        """Input sample index at the centre of baseband sample k."""
+        return k * self.decimation - self.delay
+
+    def to_output_index(self, index):
+        """First baseband sample centred at or after input sample `index`."""
+        return max(int(np.ceil((index + self.delay) / self.decimation)), 0)
+
+    def energies(self, baseband, window, start=0, resolution=RESOLUTION):
+        """
+        Tone amplitudes of consecutive windows of baseband samples, on the
+        same scale as common.demod.window_energies().
+
+        Parameters:
+        baseband (numpy.ndarray): Output of process().
+        window (int): Window length in baseband samples.
+        start (int): Baseband index of the first window.
+        resolution (float): Detector bandwidth in Hz (see common.demod.sub_blocks()).
+
+        Returns:
+        numpy.ndarray: (n_windows x n_channels) float32 amplitudes.
+        """
+        n_windows = max(baseband.shape[1] - start, 0) // window
+        n_sub, sub_len = sub_blocks(window, self.output_rate, resolution)
+        blocks = baseband[:, start:start + n_windows * window].reshape(len(self.freqs), n_windows, window)
+        blocks = blocks[:, :, :n_sub * sub_len].reshape(len(self.freqs), n_windows, n_sub, sub_len)
+        # A real tone of amplitude A mixes down to A / 2 at 0 Hz
+        amplitudes = np.abs(blocks.mean(axis=3)).mean(axis=2) * 2.0
+        return amplitudes.T.astype(np.float32)
+
+    def onset(self, baseband):
+        """
+        Baseband index where the tones first rise above the noise floor, as
+        in common.demod.find_onset(). Returns 0 if nothing stands out.
+        """
+        block = max(int(round(self.output_rate * ONSET_BLOCK)), 1)
+        levels = self.energies(baseband, block).max(axis=1)
+        if not len(levels):
+            return 0
+        floor, peak = np.percentile(levels, [5, 95])
+        above = np.flatnonzero(levels > (floor + peak) / 2)
+        return int(above[0]) * block if len(above) else 0
+
+    def demodulate(self, samples, symbol_duration, start=None):
+        """
+        Per-symbol tone amplitudes of a whole recording.
+
+        Parameters:
+        samples (array-like): Audio samples at `sample_rate`.
+        symbol_duration (float): Seconds per symbol.
+        start (int): Input sample index of the first symbol; found from the
+            baseband onset if None.
+
+        Returns:
+        tuple: (energies, start): the (n_symbols x n_channels) amplitudes
+        (for an MFSK or MultiTone modem's decide()) and the first symbol's
+        input sample index.
+        """
+        self.reset()
+        baseband = self.process(samples)
+        if start is None:
+            first = self.onset(baseband)
+        else:
+            first = self.to_output_index(start)
+        window = max(int(round(self.output_rate * symbol_duration)), 1)
+        return self.energies(baseband, window, first), int(round(self.to_input_index(first)))
@@ -0,0 +1,322 @@
+"""
+Binary BCH codec for correcting several bit errors without search.
+
+A BCH(m, t) code lives in GF(2^m), has length up to n = 2^m - 1 and corrects
+any t bit errors. Encoding is systematic and identical to a CRC with the BCH
+generator polynomial, so it reuses common.crc. Decoding computes 2t syndromes,
+finds the error-locator polynomial with Berlekamp-Massey and its roots with a
+Chien search, which is O(n * t) per frame instead of the O(n^t) flip search.
+
+Codewords shorter than n (shortened codes) are handled by treating the missing
+leading bits as zeros.
+
+The Lab02 frame header carries a codec id (CODEC_BITS wide) after the length
+field so the receiver knows whether to use the CRC syndrome table or BCH. The
+length field is LENGTH_FIELD_BITS wide, so codec_encode() refuses datawords
+whose codeword would be longer than MAX_CODEWORD_BITS.
+"""
+
+from functools import lru_cache
+
+from common.crc import get_engine
+from common.frame import BitVector
+from common.syndrome import correct as crc_correct
+
+# Primitive polynomials for GF(2^m)
+PRIMITIVE_POLYS = {
+    3: 0b1011,
+    4: 0b10011,
+    5: 0b100101,
+    6: 0b1000011,
+    7: 0b10001001,
+    8: 0b100011101,
+    9: 0b1000010001,
+    10: 0b10000001001,
+    11: 0b100000000101,
+    12: 0b1000001010011,
+}
+
+# Codec ids sent in the frame header. CODEC_CRC uses the CRC syndrome table
+# (up to 2 errors); the others select BCH with the given t.
+CODEC_BITS = 2
+CODEC_CRC = 0
+CODEC_BCH_T = {1: 2, 2: 3, 3: 4}
+
+# Codeword length field in front of the codec id
+LENGTH_FIELD_BITS = 6
+MAX_CODEWORD_BITS = (1 << LENGTH_FIELD_BITS) - 1
+
+
+class GaloisField:
+    """
+    GF(2^m) with exp/log tables. Elements are ints in [0, 2^m).
+    """
+
+    def __init__(self, m):
+        if m not in PRIMITIVE_POLYS:
+            raise ValueError(f"No primitive polynomial for GF(2^{m}).")
+        self.m = m
+        self.n = (1 << m) - 1
+        self.exp = [0] * (2 * self.n)
+        self.log = [0] * (self.n + 1)
+
+        value = 1
+        for i in range(self.n):
+            self.exp[i] = value
+            self.log[value] = i
+            value <<= 1
+            if value >> m:
+                value ^= PRIMITIVE_POLYS[m]
+        for i in range(self.n, 2 * self.n):
+            self.exp[i] = self.exp[i - self.n]
+
+    def mul(self, a, b):
+        if a == 0 or b == 0:
+            return 0
+        return self.exp[self.log[a] + self.log[b]]
+
+    def div(self, a, b):
+        if a == 0:
+            return 0
+        return self.exp[(self.log[a] - self.log[b]) % self.n]
+
+
+class BCH:
+    """
+    Binary BCH code over GF(2^m) correcting up to t bit errors.
+
+    Attributes:
+    generator (str): Generator polynomial as a '0'/'1' string, usable with
+        common.crc.
+    parity_bits (int): Number of check bits appended to each dataword.
+    max_data_bits (int): Longest dataword the unshortened code can carry.
+    """
+
+    def __init__(self, m, t):
+        self.field = GaloisField(m)
+        self.m = m
+        self.t = t
+        self.n = self.field.n
+
+        poly = 1
+        covered = set()
+        for i in range(1, 2 * t + 1):
+            if i % self.n in covered:
+                continue
+            coset = self._coset(i)
+            covered.update(coset)
+            poly = _clmul(poly, self._minimal_poly(coset))
+
+        self.generator = format(poly, 'b')
+        self.parity_bits = len(self.generator) - 1
+        self.max_data_bits = self.n - self.parity_bits
+        if self.max_data_bits <= 0:
+            raise ValueError(f"BCH over GF(2^{m}) cannot correct {t} errors.")
+
+    def _coset(self, i):
+        coset = []
+        j = i % self.n
+        while j not in coset:
+            coset.append(j)
+            j = (2 * j) % self.n
+        return coset
+
+    def _minimal_poly(self, coset):
+        field = self.field
+        coeffs = [1]  # lowest degree first, elements of GF(2^m)
+        for j in coset:
+            root = field.exp[j]
+            shifted = [0] + coeffs
+            for k in range(len(coeffs)):
+                shifted[k] ^= field.mul(coeffs[k], root)
+            coeffs = shifted
+        # Coefficients of a minimal polynomial are all 0 or 1
+        return sum(1 << k for k, c in enumerate(coeffs) if c)
+
+    def encode(self, dataword):
+        """
+        Return the systematic codeword for `dataword` ('0'/'1' string or BitVector).
+        """
+        if len(dataword) > self.max_data_bits:
+            raise ValueError(f"Dataword of {len(dataword)} bits exceeds {self.max_data_bits} bits.")
+        return get_engine(self.generator).encode(dataword)
+
+    def syndromes(self, value, length):
+        """
+        Return [S_1, ..., S_2t] for the `length`-bit codeword `value` (int).
+        """
+        field = self.field
+        exponents = [e for e in range(length) if (value >> e) & 1]
+        result = []
+        for j in range(1, 2 * self.t + 1):
+            syn = 0
+            for e in exponents:
+                syn ^= field.exp[(j * e) % self.n]
+            result.append(syn)
+        return result
+
+    def _berlekamp_massey(self, syndromes):
+        field = self.field
+        locator = [1]
+        previous = [1]
+        degree = 0
+        shift = 1
+        last_discrepancy = 1
+
+        for step, syn in enumerate(syndromes):
+            discrepancy = syn
+            for i in range(1, degree + 1):
+                if i < len(locator):
+                    discrepancy ^= field.mul(locator[i], syndromes[step - i])
+            if discrepancy == 0:
+                shift += 1
+                continue
+
+            scale = field.div(discrepancy, last_discrepancy)
+            updated = locator + [0] * max(0, len(previous) + shift - len(locator))
+            for i, coeff in enumerate(previous):
+                updated[i + shift] ^= field.mul(scale, coeff)
+
+            if 2 * degree <= step:
+                previous = locator
+                degree = step + 1 - degree
+                last_discrepancy = discrepancy
+                shift = 1
+            else:
+                shift += 1
+            locator = updated
+
+        return locator[:degree + 1], degree
+
+    def _chien_search(self, locator, length):
+        """
+        Return the exponents e < length with locator(alpha^-e) == 0.
+        """
+        field = self.field
+        logs = [field.log[c] if c else None for c in locator]
+        roots = []
+        for e in range(length):
+            total = 0
+            for i, log in enumerate(logs):
+                if log is not None:
+                    total ^= field.exp[(log - i * e) % self.n]
+            if total == 0:
+                roots.append(e)
+        return roots
+
+    def decode(self, codeword):
+        """
+        Correct up to t bit errors in `codeword` ('0'/'1' string or BitVector).
+
+        Returns:
+        dict: same layout as common.syndrome.correct(): 'status' is 'ok',
+        'corrected' or 'uncorrectable'; 'codeword' is the corrected codeword
+        (same type as the input) or None; 'positions' are the flipped bit
+        positions (0 = first bit); 'candidates' is always [].
+        """
+        length = len(codeword)
+        if length > self.n:
+            raise ValueError(f"Codeword of {length} bits exceeds n = {self.n}.")
+
+        bits = codeword if isinstance(codeword, BitVector) else BitVector.from_string(codeword)
+        syndromes = self.syndromes(bits.to_int(), length)
+        if not any(syndromes):
+            return {'status': 'ok', 'codeword': codeword, 'positions': [], 'candidates': []}
+
+        locator, degree = self._berlekamp_massey(syndromes)
+        roots = self._chien_search(locator, length) if degree <= self.t else []
+        if not roots or len(roots) != degree:
+            return {'status': 'uncorrectable', 'codeword': None, 'positions': [], 'candidates': []}
+
+        fixed = bits.copy()
+        positions = sorted(length - 1 - e for e in roots)
+        for pos in positions:
+            fixed.flip(pos)
+        if not isinstance(codeword, BitVector):
+            fixed = fixed.to_string()
+        return {'status': 'corrected', 'codeword': fixed, 'positions': positions, 'candidates': []}
+
+
+def _clmul(a, b):
+    """Carry-less (GF(2)) polynomial product of two ints."""
+    product = 0
+    while b:
+        if b & 1:
+            product ^= a
+        a <<= 1
+        b >>= 1
+    return product
+
+
+@lru_cache(maxsize=None)
+def get_code(m, t):
+    """Return the shared BCH(m, t) codec."""
+    return BCH(m, t)
+
+
+def pick_code(data_bits, t):
+    """
+    Return the smallest BCH code correcting t errors that fits a
+    `data_bits`-bit dataword.
+    """
+    for m in sorted(PRIMITIVE_POLYS):
+        try:
+            code = get_code(m, t)
+        except ValueError:
+            continue
+        if data_bits <= code.max_data_bits:
+            return code
+    raise ValueError(f"No BCH code corrects {t} errors in a {data_bits}-bit dataword.")
+
+
+def code_for_codeword(codeword_length, t):
+    """
+    Return the code the sender's pick_code() chose for a codeword of
+    `codeword_length` bits.
+    """
+    for m in sorted(PRIMITIVE_POLYS):
+        try:
+            code = get_code(m, t)
+        except ValueError:
+            continue
+        data_bits = codeword_length - code.parity_bits
+        if data_bits > 0 and pick_code(data_bits, t) is code:
+            return code
+    raise ValueError(f"No BCH code correcting {t} errors has {codeword_length}-bit codewords.")
+
+
+def codec_encode(dataword, codec, generator=None):
+    """
+    Encode `dataword` with the codec selected by the header id `codec`.
+    For CODEC_CRC, `generator` is the CRC generator to use. Raises ValueError
+    if the codeword would not fit the header's length field.
+    """
+    if codec == CODEC_CRC:
+        codeword = get_engine(generator).encode(dataword)
+    else:
+        codeword = pick_code(len(dataword), CODEC_BCH_T[codec]).encode(dataword)
+    if len(codeword) > MAX_CODEWORD_BITS:
+        raise ValueError(f"A {len(dataword)}-bit dataword gives a {len(codeword)}-bit codeword; "
+                         f"the length field holds at most {MAX_CODEWORD_BITS} bits.")
+    return codeword
+
+
+def codec_decode(codeword, codec, generator=None):
+    """
+    Correct `codeword` with the codec selected by the header id `codec` and
+    return the common.syndrome.correct()-style result dict. A BCH codeword
+    whose length no code of that t produces (e.g. a corrupted length field)
+    is 'uncorrectable'.
+    """
+    if codec == CODEC_CRC:
+        return crc_correct(codeword, generator)
+    try:
+        code = code_for_codeword(len(codeword), CODEC_BCH_T[codec])
+    except ValueError:
+        return {'status': 'uncorrectable', 'codeword': None, 'positions': [], 'candidates': []}
+    return code.decode(codeword)
+
+
+def codec_max_errors(codec):
+    """Number of bit errors the codec is guaranteed to correct."""
+    return 2 if codec == CODEC_CRC else CODEC_BCH_T[codec]
@@ -0,0 +1,269 @@
+"""
+Micro-benchmarks for the CRC, error-correction and frame helpers.
+
+Every case is timed for each generator and codeword length from 8 to 4096
+bits and reported as throughput in bits/sec. Results are compared against a
+baseline JSON file; the run fails (exit code 1) if any case is slower than the
+baseline by more than the configured margin, and (exit code 2) if there is no
+baseline to compare against. Baselines depend on the machine, so record one
+with --update on the machine that runs the check.
+
+The legacy string mod2div() and bit_length() CRC() implementations that the
+Lab02 scripts used before common.crc, and the original pair search, are kept
+here as reference points. They are reported but never count as regressions
+(REFERENCE_CASES).
+
+Usage:
+    python -m common.bench                 # compare against the baseline
+    python -m common.bench --update        # record a new baseline
+    python -m common.bench --margin 0.3 --cases crc_table,syndrome_correct
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+from common.crc import get_engine
+from common.crc_batch import check_batch, frames_from_strings
+from common.frame import BitVector
+from common.syndrome import correct
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+
+GENERATORS = ['1011101011101', '101110101111']
+LENGTHS = [8, 64, 512, 4096]
+
+# Syndrome tables hold O(L^2) entries, and the legacy pair search is O(L^3)
+TABLE_MAX_LENGTH = 512
+LEGACY_SEARCH_MAX_LENGTH = 64
+
+BATCH_FRAMES = 1000
+
+# Frozen pre-common.crc implementations: timed for comparison, not gated
+REFERENCE_CASES = {'mod2div', 'crc_int', 'legacy_search'}
+
+
+def legacy_xor(a, b):
+    result = []
+    for i in range(1, len(b)):
+        if a[i] == b[i]:
+            result.append('0')
+        else:
+            result.append('1')
+    return ''.join(result)
+
+
+def legacy_mod2div(dividend, divisor):
+    """String-based modulo-2 division, as in the original Lab02 sender."""
+    pick = len(divisor)
+    tmp = dividend[0:pick]
+
+    while pick < len(dividend):
+        if tmp[0] == '1':
+            tmp = legacy_xor(divisor, tmp) + dividend[pick]
+        else:
+            tmp = legacy_xor('0'*pick, tmp) + dividend[pick]
+        pick += 1
+
+    if tmp[0] == '1':
+        tmp = legacy_xor(divisor, tmp)
+    else:
+        tmp = legacy_xor('0'*pick, tmp)
+    return tmp
+
+
+def legacy_crc(dataword, generator):
+    """Integer CRC() with a bit_length() loop, as in the original Lab02 receiver."""
+    l_gen = len(generator)
+    dividend = int(dataword, 2) << (l_gen - 1)
+    generator = int(generator, 2)
+    while dividend.bit_length() >= l_gen:
+        shift = dividend.bit_length() - l_gen
+        dividend ^= (generator << shift)
+    return dividend
+
+
+def legacy_pair_search(codeword, generator):
+    """Flip every (i, j) pair until the CRC passes, as in the original evaluate()."""
+    for i in range(len(codeword)):
+        for j in range(i, len(codeword)):
+            bits = list(codeword)
+            for pos in {i, j}:
+                bits[pos] = '1' if bits[pos] == '0' else '0'
+            if legacy_crc(''.join(bits), generator) == 0:
+                return [i, j]
+    return None
+
+
+def _random_bits(rng, length):
+    return ''.join(rng.choice('01') for _ in range(length))
+
+
+def _corrupt(codeword, positions):
+    bits = list(codeword)
+    for pos in positions:
+        bits[pos] = '1' if bits[pos] == '0' else '0'
+    return ''.join(bits)
+
+
+# Each case maps (generator, length, rng) to a zero-argument callable that
+# processes `length` bits, or None if the case does not apply at that length.
+
+def _case_mod2div(generator, length, rng):
+    data = _random_bits(rng, length)
+    return lambda: legacy_mod2div(data + '0' * (len(generator) - 1), generator)
+
+
+def _case_crc_int(generator, length, rng):
+    data = _random_bits(rng, length)
+    return lambda: legacy_crc(data, generator)
+
+
+def _case_crc_table(generator, length, rng):
+    data = _random_bits(rng, length)
+    engine = get_engine(generator)
+    return lambda: engine.encode(data)
+
+
+def _case_crc_batch(generator, length, rng):
+    frames = frames_from_strings([_random_bits(rng, length) for _ in range(BATCH_FRAMES)])
+    return lambda: check_batch(frames, generator)
+
+
+def _case_legacy_search(generator, length, rng):
+    # A codeword needs at least one data bit
+    if length > LEGACY_SEARCH_MAX_LENGTH or length < len(generator):
+        return None
+    codeword = get_engine(generator).encode(_random_bits(rng, length - len(generator) + 1))
+    corrupted = _corrupt(codeword, [length // 3, 2 * length // 3])
+    return lambda: legacy_pair_search(corrupted, generator)
+
+
+def _case_syndrome_correct(generator, length, rng):
+    if length > TABLE_MAX_LENGTH or length < len(generator):
+        return None
+    codeword = get_engine(generator).encode(_random_bits(rng, length - len(generator) + 1))
+    corrupted = _corrupt(codeword, [length // 3, 2 * length // 3])
+    return lambda: correct(corrupted, generator)
+
+
+def _case_bitvector(generator, length, rng):
+    bits = BitVector.from_string(_random_bits(rng, length))
+
+    def run():
+        bits.flip(length // 2)
+        BitVector.from_symbols(bits.to_symbols(2), 2, length)
+        return bits[1:length - 1].to_int()
+    return run
+
+
+CASES = {
+    'mod2div': (_case_mod2div, 1),
+    'crc_int': (_case_crc_int, 1),
+    'crc_table': (_case_crc_table, 1),
+    'crc_batch': (_case_crc_batch, BATCH_FRAMES),
+    'legacy_search': (_case_legacy_search, 1),
+    'syndrome_correct': (_case_syndrome_correct, 1),
+    'bitvector': (_case_bitvector, 1),
+}
+
+
+def measure(func, min_time=0.2, repeats=3):
+    """
+    Return calls/sec of `func`: the best of `repeats` rounds, each timing
+    repeated calls for at least `min_time / repeats` seconds.
+
+    One untimed call first builds any cached tables the case relies on.
+    """
+    func()
+    best = 0.0
+    for _ in range(repeats):
+        calls = 0
+        start = time.perf_counter()
+        elapsed = 0.0
+        while elapsed < min_time / repeats:
+            func()
+            calls += 1
+            elapsed = time.perf_counter() - start
+        best = max(best, calls / elapsed)
+    return best
+
+
+def run(cases=None, generators=GENERATORS, lengths=LENGTHS, min_time=0.2, seed=0):
+    """
+    Run the benchmark cases and return {'case/generator/length': bits_per_sec}.
+    """
+    rng = random.Random(seed)
+    results = {}
+    for name in cases or CASES:
+        build, frames_per_call = CASES[name]
+        for generator in generators:
+            for length in lengths:
+                func = build(generator, length, rng)
+                if func is None:
+                    continue
+                results[f"{name}/{generator}/{length}"] = measure(func, min_time) * length * frames_per_call
+    return results
+
+
+def compare(results, baseline, margin):
+    """
+    Return the list of (key, current, baseline) whose throughput fell more
+    than `margin` (a fraction) below the baseline. REFERENCE_CASES are skipped.
+    """
+    regressions = []
+    for key, value in results.items():
+        if key.split('/')[0] in REFERENCE_CASES:
+            continue
+        if key in baseline and value < baseline[key] * (1 - margin):
+            regressions.append((key, value, baseline[key]))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CRC / decoder micro-benchmarks with regression thresholds")
+    parser.add_argument("--cases", default=None, help=f"Comma-separated subset of: {', '.join(CASES)}")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="Baseline JSON file")
+    parser.add_argument("--update", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--margin", type=float, default=0.25, help="Allowed slowdown before failing (fraction)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Seconds to time each case")
+    args = parser.parse_args()
+
+    cases = args.cases.split(',') if args.cases else None
+    results = run(cases, min_time=args.min_time)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+    for key, value in results.items():
+        line = f"{key:<45} {value / 1e6:>12.3f} Mbit/s"
+        if key in baseline:
+            line += f"   ({value / baseline[key]:.2f}x baseline)"
+        if key.split('/')[0] in REFERENCE_CASES:
+            line += "   [reference]"
+        print(line)
+
+    if args.update:
+        baseline.update(results)
+        with open(args.baseline, 'w') as file:
+            json.dump(baseline, file, indent=4, sort_keys=True)
+            file.write('\n')
+        print(f"Baseline written to {args.baseline}")
+        sys.exit(0)
+
+    if not baseline:
+        print(f"\nNo baseline at {args.baseline}; nothing was checked. Record one with --update.")
+        sys.exit(2)
+
+    regressions = compare(results, baseline, args.margin)
+    if regressions:
+        print(f"\n{len(regressions)} case(s) regressed by more than {args.margin:.0%}:")
+        for key, value, base in regressions:
+            print(f"  {key}: {value / 1e6:.3f} Mbit/s (baseline {base / 1e6:.3f} Mbit/s)")
+        sys.exit(1)
+    print(f"\nNo regressions beyond {args.margin:.0%}.")
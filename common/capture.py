@@ -0,0 +1,285 @@
+"""
+Audio capture into a preallocated float32 ring buffer.
+
+Chunks read from the input stream are wrapped with np.frombuffer (no copy)
+and written straight into a fixed NumPy buffer, so memory use stays the same
+however long the receiver runs and no Python float objects are created.
+
+The buffer stores every sample twice, at i and i + capacity. Any window of
+up to `capacity` samples is then one contiguous slice, and window() returns a
+view of it without copying even when it wraps around the end.
+
+Samples are addressed by their absolute index since the capture started
+(RingBuffer.written is the index of the next sample). A view stays valid
+until its samples are overwritten, i.e. for `capacity` samples after they
+were written, so size the buffer for the longest window plus the time
+needed to process it.
+
+CallbackCapture drives capture from PyAudio's callback API. The callback
+only puts the raw buffer on a bounded queue and never blocks. One ingest
+thread drains the queue into the ring buffer, and decode jobs go to a
+WorkerPool with a fixed number of threads and a bounded job queue. When
+either queue is full, the chunk or job is dropped and counted instead of
+stalling capture. Both classes report their queue depths and drop counts
+with stats().
+"""
+
+import queue
+import threading
+import traceback
+
+import numpy as np
+
+from common.audio import paContinue, paFloat32, paInputOverflow
+
+
+class RingBuffer:
+    """
+    Fixed-size float32 ring buffer of audio samples.
+
+    Attributes:
+    capacity (int): Number of most recent samples kept.
+    written (int): Total number of samples written so far.
+    """
+
+    def __init__(self, capacity, dtype=np.float32):
+        if capacity <= 0:
+            raise ValueError("Ring buffer capacity must be positive.")
+        self.capacity = int(capacity)
+        self.written = 0
+        self._buf = np.zeros(2 * self.capacity, dtype=dtype)
+
+    def write(self, samples):
+        """
+        Append samples (array-like, or raw float32 bytes from stream.read()).
+        Only the last `capacity` samples of an oversized write are kept.
+        """
+        if isinstance(samples, (bytes, bytearray, memoryview)):
+            samples = np.frombuffer(samples, dtype=self._buf.dtype)
+        n_samples = len(samples)
+        if n_samples > self.capacity:
+            self.written += n_samples - self.capacity
+            samples = samples[-self.capacity:]
+            n_samples = self.capacity
+
+        cap = self.capacity
+        pos = self.written % cap
+        first = min(n_samples, cap - pos)
+        rest = n_samples - first
+        self._buf[pos:pos + first] = samples[:first]
+        self._buf[pos + cap:pos + cap + first] = samples[:first]
+        if rest:
+            self._buf[:rest] = samples[first:]
+            self._buf[cap:cap + rest] = samples[first:]
+        self.written += n_samples
+
+    def read_from(self, stream, n_samples):
+        """Read `n_samples` from a PyAudio input stream into the buffer."""
+        self.write(stream.read(n_samples, exception_on_overflow=False))
+
+    @property
+    def oldest(self):
+        """Absolute index of the oldest sample still in the buffer."""
+        return max(self.written - self.capacity, 0)
+
+    def window(self, start, stop=None):
+        """
+        Return a read-only view of samples [start, stop) (absolute indices;
+        `stop` defaults to everything written so far).
+        """
+        stop = self.written if stop is None else stop
+        if start < self.oldest or stop > self.written or start > stop:
+            raise ValueError(
+                f"Window [{start}, {stop}) is outside the buffered samples "
+                f"[{self.oldest}, {self.written})."
+            )
+        pos = start % self.capacity
+        view = self._buf[pos:pos + (stop - start)]
+        view.flags.writeable = False
+        return view
+
+    def latest(self, n_samples):
+        """Return a read-only view of the last `n_samples` samples."""
+        n_samples = min(n_samples, self.written - self.oldest)
+        return self.window(self.written - n_samples)
+
+    def clear(self):
+        """Forget all samples (the buffer itself is reused)."""
+        self.written = 0
+
+
+class WorkerPool:
+    """
+    Fixed number of daemon threads running jobs from a bounded queue.
+
+    submit() never blocks: if `queue_size` jobs are already waiting the job
+    is dropped and counted, so slow decoding cannot pile up threads or
+    memory.
+    """
+
+    def __init__(self, workers=2, queue_size=4):
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.submitted = 0
+        self.dropped = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_depth = 0
+        self._lock = threading.Lock()
+        self._threads = [threading.Thread(target=self._run, daemon=True) for _ in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, func, *args):
+        """Queue func(*args). Returns False if the queue was full and the job was dropped."""
+        try:
+            self.jobs.put_nowait((func, args))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.submitted += 1
+            self.max_depth = max(self.max_depth, self.jobs.qsize())
+        return True
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                self.jobs.task_done()
+                return
+            func, args = job
+            try:
+                func(*args)
+            except Exception:
+                traceback.print_exc()
+                with self._lock:
+                    self.failed += 1
+            else:
+                with self._lock:
+                    self.completed += 1
+            finally:
+                self.jobs.task_done()
+
+    def join(self):
+        """Wait until every queued job has finished (the workers keep running)."""
+        self.jobs.join()
+
+    def close(self):
+        """Finish the queued jobs and stop the workers."""
+        for _ in self._threads:
+            self.jobs.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': len(self._threads),
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'dropped': self.dropped,
+                'queue_depth': self.jobs.qsize(),
+                'max_queue_depth': self.max_depth,
+            }
+
+
+class CallbackCapture:
+    """
+    Callback-driven capture (PyAudio or a common.audio backend) into a RingBuffer.
+
+    The PortAudio callback puts each buffer on a bounded queue. A single
+    ingest thread writes the buffers into `ring` in order and then calls
+    `on_chunk(samples)` (a view of the new samples). If the queue is full
+    the buffer is dropped and counted, and the same number of zero samples
+    is written in its place so sample indices keep matching wall time.
+    """
+
+    def __init__(self, pa, sample_rate, chunk, ring, on_chunk=None, queue_size=64):
+        self.pa = pa
+        self.sample_rate = sample_rate
+        self.chunk = chunk
+        self.ring = ring
+        self.on_chunk = on_chunk
+        self.chunks = queue.Queue(maxsize=queue_size)
+        self.captured = 0
+        self.dropped = 0
+        self.input_overflows = 0
+        self.max_depth = 0
+        self._lost = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stream = None
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        try:
+            self.chunks.put_nowait(in_data)
+        except queue.Full:
+            full = True
+        else:
+            full = False
+        # Counters are shared with stats() and the ingest thread
+        with self._lock:
+            if status & paInputOverflow:
+                self.input_overflows += 1
+            if full:
+                self.dropped += 1
+                self._lost += frame_count
+            else:
+                self.captured += 1
+                self.max_depth = max(self.max_depth, self.chunks.qsize())
+        return (None, paContinue)
+
+    def _ingest(self):
+        while not self._stop.is_set():
+            try:
+                data = self.chunks.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            with self._lock:
+                lost, self._lost = self._lost, 0
+            if lost:
+                self._deliver(np.zeros(lost, dtype=np.float32))
+            self._deliver(np.frombuffer(data, dtype=np.float32))
+
+    def _deliver(self, samples):
+        start = self.ring.written
+        self.ring.write(samples)
+        if self.on_chunk is not None:
+            self.on_chunk(self.ring.window(max(start, self.ring.oldest)))
+
+    def start(self):
+        """Open the input stream and start capturing."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._ingest, daemon=True)
+        self._thread.start()
+        self._stream = self.pa.open(format=paFloat32,
+                                    channels=1,
+                                    rate=self.sample_rate,
+                                    input=True,
+                                    frames_per_buffer=self.chunk,
+                                    stream_callback=self._callback)
+        self._stream.start_stream()
+
+    def stop(self):
+        """Stop the stream and the ingest thread (queued buffers are discarded)."""
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+            self._stream = None
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'captured': self.captured,
+                'dropped': self.dropped,
+                'input_overflows': self.input_overflows,
+                'queue_depth': self.chunks.qsize(),
+                'max_queue_depth': self.max_depth,
+            }
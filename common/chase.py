@@ -0,0 +1,157 @@
+"""
+Soft-decision (Chase) decoding from per-symbol band energies.
+
+The demodulators measure the average energy in every FSK band for every
+symbol and pick the strongest. The margin to the runner-up says how sure that
+decision was. bit_reliabilities() turns those energies into a per-bit
+reliability, and chase_decode() tries flipping only the least reliable bits
+before running the normal hard-decision corrector on each trial word. The
+candidate whose total flipped reliability is smallest wins.
+
+A trial word that decodes is not necessarily close to what was received:
+with 4 test bits and a 2-error corrector, a candidate can be 6 flips away,
+and beyond the code's radius almost any word decodes to something. A
+candidate is therefore only accepted if its total flips (test flips plus
+the decoder's corrections) stay within the code's guaranteed radius, or, if
+a `max_cost` is given, if the reliabilities of all its flipped bits add up
+to at most `max_cost`. A word for which no candidate passes stays
+uncorrectable, a word the plain decoder finds ambiguous stays ambiguous
+(its colliding patterns ordered by reliability cost), and acceptable
+candidates that tie on cost (e.g. with flat reliabilities) are reported as
+ambiguous too.
+
+Within the radius the result is what the plain decoder finds, so the gain
+comes from `max_cost`: error patterns beyond the radius are fixed when the
+extra errors fall on weak bits, using 2^test_bits decodes instead of an
+O(n^2) pair search.
+"""
+
+from itertools import combinations
+
+import numpy as np
+
+from common.frame import BitVector
+
+
+def bit_reliabilities(energies, bits_per_symbol):
+    """
+    Convert per-symbol band energies into per-bit reliabilities.
+
+    Parameters:
+    energies (array-like): (n_symbols x M) average energy per band, where band
+        s carries symbol index s and M = 2 ** bits_per_symbol.
+    bits_per_symbol (int): Bits carried by each symbol.
+
+    Returns:
+    numpy.ndarray: (n_symbols * bits_per_symbol,) reliabilities, MSB first
+    within each symbol, matching BitVector.from_symbols(). For each bit it is
+    the strongest band agreeing with the decision minus the strongest band
+    disagreeing with it (>= 0; 0 means a coin toss).
+    """
+    energies = np.asarray(energies, dtype=np.float64)
+    n_symbols, n_bands = energies.shape
+    symbols = np.arange(n_bands)
+    decided = np.argmax(energies, axis=1)
+
+    reliability = np.empty((n_symbols, bits_per_symbol))
+    for b in range(bits_per_symbol):
+        shift = bits_per_symbol - 1 - b
+        band_bit = (symbols >> shift) & 1
+        decided_bit = (decided >> shift) & 1
+        agree = band_bit[None, :] == decided_bit[:, None]
+        best_agree = np.where(agree, energies, -np.inf).max(axis=1)
+        best_other = np.where(~agree, energies, -np.inf).max(axis=1)
+        reliability[:, b] = best_agree - best_other
+    return reliability.reshape(-1)
+
+
+def flip_patterns(reliability, test_bits):
+    """
+    Yield the flip patterns over the `test_bits` least reliable positions,
+    lightest first (the empty pattern comes first).
+    """
+    order = np.argsort(reliability, kind='stable')[:test_bits]
+    weakest = sorted(int(pos) for pos in order)
+    for weight in range(len(weakest) + 1):
+        for pattern in combinations(weakest, weight):
+            yield pattern
+
+
+def chase_decode(codeword, reliability, decoder, max_errors, test_bits=4, max_cost=None):
+    """
+    Chase-II decoding of a hard-decision codeword.
+
+    Parameters:
+    codeword (str or BitVector): Hard-decision codeword.
+    reliability (array-like): Per-bit reliability, same length as codeword.
+    decoder (callable): Hard-decision corrector returning a
+        common.syndrome.correct()-style dict (e.g. a lambda around
+        common.syndrome.correct or common.bch.codec_decode).
+    max_errors (int): Errors the decoder is guaranteed to correct
+        (common.bch.codec_max_errors()); candidates with more flips are
+        rejected unless `max_cost` accepts them.
+    test_bits (int): Number of least reliable bits to try flipping.
+    max_cost (float): Accept candidates with more than `max_errors` flips
+        whose flipped reliabilities sum to at most this (None: never).
+
+    Returns:
+    dict: Same layout as common.syndrome.correct(), plus 'cost' (sum of the
+    reliabilities of all flipped bits) for the chosen candidate. If no trial
+    word gives an acceptable candidate, or decoding the unmodified codeword
+    is ambiguous, that result is returned (with 'cost' None); if several
+    candidates tie for the lowest cost, the status is 'ambiguous' and
+    'candidates' lists their flips.
+    """
+    reliability = np.asarray(reliability, dtype=np.float64)
+    if len(reliability) != len(codeword):
+        raise ValueError("Need one reliability value per codeword bit.")
+
+    def flip_cost(positions):
+        return float(reliability[list(positions)].sum()) if positions else 0.0
+
+    bits = BitVector.of(codeword)
+    accepted = {}  # flipped positions -> cost of every acceptable candidate
+    first = None
+
+    for pattern in flip_patterns(reliability, test_bits):
+        trial = bits.copy()
+        for pos in pattern:
+            trial.flip(pos)
+        result = decoder(trial)
+        if first is None:
+            first = result
+        if result['status'] not in ('ok', 'corrected'):
+            continue
+
+        flipped = set(pattern).symmetric_difference(result['positions'])
+        cost = flip_cost(flipped)
+        if len(flipped) > max_errors and (max_cost is None or cost > max_cost):
+            continue
+        accepted[tuple(sorted(flipped))] = cost
+
+    if first['status'] == 'ambiguous':
+        # Several error patterns explain the syndrome; most likely one first
+        return dict(first, candidates=sorted(first['candidates'], key=flip_cost), cost=None)
+    if not accepted:
+        return dict(first, cost=None)
+
+    ranked = sorted(accepted.items(), key=lambda item: item[1])
+    positions, cost = ranked[0]
+    tied = [list(pattern) for pattern, other in ranked if np.isclose(other, cost)]
+    if len(tied) > 1:
+        # The reliabilities do not single out one codeword
+        return {'status': 'ambiguous', 'codeword': None, 'positions': [], 'candidates': tied, 'cost': None}
+
+    positions = list(positions)
+    fixed = bits.copy()
+    for pos in positions:
+        fixed.flip(pos)
+    if isinstance(codeword, str):
+        fixed = fixed.to_string()
+    return {
+        'status': 'corrected' if positions else 'ok',
+        'codeword': fixed,
+        'positions': positions,
+        'candidates': [],
+        'cost': cost,
+    }
@@ -0,0 +1,307 @@
+"""
+Table-driven CRC engine for arbitrary generator polynomials.
+
+Generators are given the way the labs write them, as '0'/'1' strings with the
+highest power first (e.g. '1011101011101' or '101110101111'). Codewords and
+datawords are '0'/'1' strings or common.frame.BitVector objects of any length.
+
+All remainders here are *augmented*, i.e. ``remainder(m) = m(x) * x^w mod g(x)``
+with ``w = len(generator) - 1``. This matches ``CRC()`` in
+Lab02/receiver-combined.py, so ``remainder(codeword) == 0`` iff the codeword is
+valid (the generators we use all have a non-zero constant term).
+
+StreamingCRC keeps the register between calls so a frame can be checked while
+its symbols are still being demodulated, and combine() joins the CRCs of two
+segments that were checksummed separately.
+"""
+
+from functools import lru_cache
+
+from common.frame import BitVector
+
+
+def _build_table(poly, width, nbits):
+    """
+    Build the lookup table for consuming `nbits` bits in one step.
+
+    Entry i holds (i * x^width) mod g(x), so that for a register `reg` and an
+    input chunk `c`:  reg' = ((reg << nbits) & mask) ^ table[((reg << nbits) >> width) ^ c]
+    """
+    top = 1 << width
+    table = []
+    for i in range(1 << nbits):
+        reg = i << width
+        for shift in range(nbits - 1, -1, -1):
+            if reg & (top << shift):
+                reg ^= poly << shift
+        table.append(reg)
+    return table
+
+
+class CRCEngine:
+    """
+    CRC engine for a single generator with precomputed byte and nibble tables.
+
+    Use get_engine() instead of constructing this directly so the tables are
+    only built once per generator.
+    """
+
+    def __init__(self, generator):
+        generator = generator.lstrip('0')
+        if len(generator) < 2 or set(generator) - {'0', '1'}:
+            raise ValueError(f"Invalid generator polynomial: {generator!r}")
+
+        self.generator = generator
+        self.width = len(generator) - 1
+        self.poly = int(generator, 2)
+        self.mask = (1 << self.width) - 1
+        self.table8 = _build_table(self.poly, self.width, 8)
+        self.table4 = _build_table(self.poly, self.width, 4)
+        # _powers[k] = x^(k + width) mod g(x), grown on demand by power()
+        self._powers = [self.poly ^ (1 << self.width)]
+
+    def feed(self, reg, value, nbits):
+        """
+        Advance the CRC register `reg` over the `nbits`-bit integer `value`
+        (most significant bit first) and return the new register.
+
+        Whole bytes go through the byte table, a trailing nibble through the
+        nibble table and anything left over is shifted in bit by bit.
+        """
+        width, mask, table8, table4 = self.width, self.mask, self.table8, self.table4
+
+        nbytes, rest = divmod(nbits, 8)
+        if nbytes:
+            for byte in (value >> rest).to_bytes(nbytes, 'big'):
+                reg <<= 8
+                reg = (reg & mask) ^ table8[(reg >> width) ^ byte]
+        if rest >= 4:
+            rest -= 4
+            reg <<= 4
+            reg = (reg & mask) ^ table4[(reg >> width) ^ ((value >> rest) & 0xF)]
+        for shift in range(rest - 1, -1, -1):
+            reg <<= 1
+            if (reg >> width) ^ ((value >> shift) & 1):
+                reg ^= self.poly
+            reg &= mask
+        return reg
+
+    def mulmod(self, a, b):
+        """
+        Return a(x) * b(x) mod g(x) for two reduced polynomials given as ints.
+        """
+        product = 0
+        while b:
+            if b & 1:
+                product ^= a
+            b >>= 1
+            a <<= 1
+            if a >> self.width:
+                a ^= self.poly
+        return product
+
+    def power(self, k):
+        """
+        Return x^(k + width) mod g(x), the syndrome of a lone 1 followed by k zeros.
+
+        Values are cached, so repeated calls (e.g. StreamingCRC.flip()) are O(1)
+        once the table has grown past k.
+        """
+        powers = self._powers
+        if k >= len(powers):
+            top = 1 << self.width
+            reg = powers[-1]
+            for _ in range(k - len(powers) + 1):
+                reg <<= 1
+                if reg & top:
+                    reg ^= self.poly
+                powers.append(reg)
+        return powers[k]
+
+    def shift(self, reg, nbits):
+        """
+        Return reg(x) * x^nbits mod g(x), i.e. the register after `nbits`
+        zero bits, in O(width * log(nbits)) time.
+        """
+        factor = 1 % self.poly
+        base = 2 % self.poly
+        while nbits:
+            if nbits & 1:
+                factor = self.mulmod(factor, base)
+            base = self.mulmod(base, base)
+            nbits >>= 1
+        return self.mulmod(reg, factor)
+
+    def remainder(self, bits):
+        """
+        Return the augmented CRC remainder of the bitstring `bits` as an int.
+        """
+        if isinstance(bits, BitVector):
+            return self.feed(0, bits.to_int(), len(bits))
+        if not bits:
+            return 0
+        # Leading zeros do not change the remainder, so the whole string can be
+        # left-padded to a byte boundary and pushed through the byte table.
+        nbytes = (len(bits) + 7) // 8
+        return self.feed(0, int(bits, 2), nbytes * 8)
+
+    def remainder_bits(self, bits):
+        """
+        Return the augmented CRC remainder of `bits` as a `width`-bit string.
+        """
+        return format(self.remainder(bits), f'0{self.width}b')
+
+    def mod(self, bits):
+        """
+        Return bits(x) mod g(x) (no augmentation) as a `width`-bit string.
+
+        This is what the string-based mod2div() used to return.
+        """
+        width = self.width
+        if len(bits) <= width:
+            return bits.zfill(width)[-width:]
+        value = self.remainder(bits[:-width]) ^ int(bits[-width:], 2)
+        return format(value, f'0{width}b')
+
+    def encode(self, dataword):
+        """
+        Append the CRC remainder to `dataword` and return the codeword.
+        """
+        if isinstance(dataword, BitVector):
+            return dataword + BitVector.from_int(self.remainder(dataword), self.width)
+        return dataword + self.remainder_bits(dataword)
+
+    def check(self, codeword):
+        """
+        Return True if `codeword` has a zero remainder, i.e. no detected error.
+        """
+        return self.remainder(codeword) == 0
+
+    def encode_many(self, datawords):
+        """
+        Encode an iterable of datawords and return the list of codewords.
+        """
+        remainder, width = self.remainder, self.width
+        return [d + format(remainder(d), f'0{width}b') for d in datawords]
+
+    def check_many(self, codewords):
+        """
+        Check an iterable of codewords and return a list of booleans.
+        """
+        remainder = self.remainder
+        return [remainder(c) == 0 for c in codewords]
+
+
+class StreamingCRC:
+    """
+    Incremental CRC over a bitstring that arrives in pieces.
+
+    Example:
+        crc = StreamingCRC('1011101011101')
+        crc.update('1011')
+        crc.update('0010110')
+        crc.valid()    # same as check('10110010110', generator)
+    """
+
+    __slots__ = ('engine', 'value', 'length')
+
+    def __init__(self, generator, bits=''):
+        self.engine = get_engine(generator)
+        self.value = 0
+        self.length = 0
+        if bits:
+            self.update(bits)
+
+    def update(self, bits):
+        """
+        Feed the next chunk of bits ('0'/'1' string or BitVector) and return
+        the new remainder.
+        """
+        if isinstance(bits, BitVector):
+            return self.update_int(bits.to_int(), len(bits))
+        if bits:
+            self.value = self.engine.feed(self.value, int(bits, 2), len(bits))
+            self.length += len(bits)
+        return self.value
+
+    def update_int(self, value, nbits):
+        """
+        Feed `nbits` bits given as an int (e.g. one demodulated symbol).
+        """
+        self.value = self.engine.feed(self.value, value, nbits)
+        self.length += nbits
+        return self.value
+
+    def flip(self, pos):
+        """
+        Update the remainder as if bit `pos` (0 = first bit fed) were flipped.
+
+        Flipping the same position twice restores the original remainder, which
+        makes this cheap for trial flips during error correction.
+        """
+        if not 0 <= pos < self.length:
+            raise IndexError(f"Bit position {pos} out of range for {self.length} bits.")
+        self.value ^= self.engine.power(self.length - 1 - pos)
+        return self.value
+
+    def valid(self):
+        """Return True if the bits fed so far form a valid codeword."""
+        return self.value == 0
+
+    def copy(self):
+        """Return an independent StreamingCRC with the same state."""
+        other = StreamingCRC.__new__(StreamingCRC)
+        other.engine, other.value, other.length = self.engine, self.value, self.length
+        return other
+
+
+def combine(crc_a, crc_b, len_b, generator):
+    """
+    Return the remainder of A + B (concatenated) from the remainders of the two
+    segments and the length of B in bits. Lets segments be checksummed on
+    separate cores and joined afterwards.
+    """
+    return get_engine(generator).shift(crc_a, len_b) ^ crc_b
+
+
+@lru_cache(maxsize=None)
+def get_engine(generator):
+    """
+    Return the shared CRCEngine for `generator`, building its tables once.
+    """
+    return CRCEngine(generator)
+
+
+def remainder(bits, generator):
+    """
+    Augmented CRC remainder of `bits` under `generator`, as an int.
+    """
+    return get_engine(generator).remainder(bits)
+
+
+def encode(dataword, generator):
+    """
+    Return `dataword` with its CRC remainder appended.
+    """
+    return get_engine(generator).encode(dataword)
+
+
+def check(codeword, generator):
+    """
+    Return True if `codeword` is a valid codeword for `generator`.
+    """
+    return get_engine(generator).check(codeword)
+
+
+def encode_many(datawords, generator):
+    """
+    Encode several datawords with the same generator.
+    """
+    return get_engine(generator).encode_many(datawords)
+
+
+def check_many(codewords, generator):
+    """
+    Check several codewords with the same generator.
+    """
+    return get_engine(generator).check_many(codewords)
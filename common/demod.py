@@ -0,0 +1,241 @@
+"""
+FSK demodulation with a DFT-bin (Goertzel) filter bank.
+
+Instead of running a bandpass filter over the whole recording for every tone
+and averaging the envelope sample by sample, the recording is reshaped into
+(n_windows x window) blocks and multiplied by a cached (window x M) matrix of
+complex exponentials at the known tone frequencies. Each entry of the product
+is the Goertzel output for one tone over one window, so all tone energies of
+all symbols come out of a single matrix product.
+
+Each window is split into sub-blocks of about 1 / RESOLUTION seconds. The
+tone amplitudes are measured coherently in each sub-block and averaged over
+the window. A single DFT bin over a whole 1 s symbol is only 1 Hz wide, so a
+few hundred ppm of clock offset between the sound cards would move the tone
+into a null. Sub-blocks keep each band RESOLUTION Hz wide, which is far less
+than the tone spacing.
+
+Energies are reported as tone amplitudes (2|X| / length), so a full-scale
+sine at a tone frequency reads about 1.0 whatever the window length.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+# Window used to locate the start of a transmission (seconds)
+ONSET_BLOCK = 0.01
+
+# Approximate bandwidth of each tone detector (Hz)
+RESOLUTION = 50.0
+
+
+@lru_cache(maxsize=64)
+def tone_basis(freqs, sample_rate, length):
+    """
+    Return the cached (length x M) complex64 DFT-bin matrix for a tuple of
+    tone frequencies. The returned array is read-only since it is shared.
+    """
+    t = np.arange(length) / sample_rate
+    basis = np.exp(-2j * np.pi * np.outer(t, freqs)).astype(np.complex64)
+    basis.setflags(write=False)
+    return basis
+
+
+def sub_blocks(window, sample_rate, resolution=RESOLUTION):
+    """
+    Return (n_sub, sub_len): how a `window`-sample window is split into
+    coherent sub-blocks of about 1 / resolution seconds. The last
+    window - n_sub * sub_len samples of each window are not used.
+    """
+    n_sub = max(int(window * resolution // sample_rate), 1)
+    return n_sub, window // n_sub
+
+
+def window_energies(samples, freqs, sample_rate, window, start=0, resolution=RESOLUTION):
+    """
+    Measure the amplitude of every tone in consecutive windows.
+
+    Parameters:
+    samples (array-like): Audio samples.
+    freqs (sequence): Tone frequencies in Hz.
+    sample_rate (int): Sample rate of `samples`.
+    window (int): Window length in samples (one symbol, or a short block).
+    start (int): Index of the first sample of the first window.
+    resolution (float): Detector bandwidth in Hz (see sub_blocks()).
+
+    Returns:
+    numpy.ndarray: (n_windows x M) float32 tone amplitudes. A trailing partial
+    window is dropped.
+    """
+    samples = np.asarray(samples, dtype=np.float32)
+    n_windows = max(len(samples) - start, 0) // window
+    n_sub, sub_len = sub_blocks(window, sample_rate, resolution)
+    blocks = samples[start:start + n_windows * window].reshape(n_windows, window)
+    blocks = blocks[:, :n_sub * sub_len].reshape(n_windows, n_sub, sub_len)
+    spectrum = blocks @ tone_basis(tuple(freqs), sample_rate, sub_len)
+    return (np.abs(spectrum).mean(axis=1) * (2.0 / sub_len)).astype(np.float32)
+
+
+def find_onset(samples, freqs, sample_rate, block=None):
+    """
+    Return the sample index where the tones first rise above the noise floor.
+
+    The strongest tone amplitude is measured over short blocks (ONSET_BLOCK
+    seconds by default) and the first block above the midpoint between the
+    quiet level (5th percentile) and the signal level (95th percentile) is
+    taken as the start. Returns 0 if nothing stands out.
+    """
+    block = block or max(int(sample_rate * ONSET_BLOCK), 1)
+    levels = window_energies(samples, freqs, sample_rate, block).max(axis=1)
+    if not len(levels):
+        return 0
+
+    floor, peak = np.percentile(levels, [5, 95])
+    above = np.flatnonzero(levels > (floor + peak) / 2)
+    return int(above[0]) * block if len(above) else 0
+
+
+def demodulate(samples, freqs, sample_rate, symbol_duration, start=None):
+    """
+    Demodulate a recording of FSK symbols (one tone per symbol).
+
+    Parameters:
+    samples (array-like): Audio samples.
+    freqs (sequence): Tone frequency of each symbol value, e.g. [3300, 4100,
+        4700, 5900] for '00', '01', '10', '11'.
+    sample_rate (int): Sample rate of `samples`.
+    symbol_duration (float): Duration of each symbol in seconds.
+    start (int): Index of the first symbol; found with find_onset() if None.
+
+    Returns:
+    tuple: (symbols, energies, start) where symbols is an int array of the
+    strongest tone per symbol window and energies the (n_symbols x M) tone
+    amplitudes, ready for common.chase.bit_reliabilities().
+    """
+    symbol_len = int(sample_rate * symbol_duration)
+    if start is None:
+        start = find_onset(samples, freqs, sample_rate)
+    energies = window_energies(samples, freqs, sample_rate, symbol_len, start)
+    return energies.argmax(axis=1), energies, start
+
+
+class StreamingDemodulator:
+    """
+    Chunk-by-chunk version of demodulate() for use while recording.
+
+    Before the transmission starts, short-block tone levels are compared with
+    the running noise floor; the first block more than `snr` times above it
+    starts the first symbol. From then on every sample is accumulated into
+    running DFT-bin (Goertzel) sums per sub-block (see sub_blocks()), and a
+    symbol is emitted as soon as its window is complete, so results lag the
+    audio by at most one chunk.
+
+    Attributes:
+    symbols (list): Symbols decoded so far.
+    energies (list): Tone amplitudes (length-M float32 arrays) per symbol.
+    start (int): Sample index of the first symbol, None until detected.
+    position (int): Number of samples fed so far.
+    """
+
+    # Quiet blocks needed before the noise floor estimate is trusted
+    MIN_FLOOR_BLOCKS = 10
+
+    def __init__(self, freqs, sample_rate, symbol_duration, snr=4.0, skip=0, resolution=RESOLUTION):
+        self.freqs = tuple(freqs)
+        self.sample_rate = sample_rate
+        self.symbol_len = int(sample_rate * symbol_duration)
+        self.n_sub, self.sub_len = sub_blocks(self.symbol_len, sample_rate, resolution)
+        self.block = max(int(sample_rate * ONSET_BLOCK), 1)
+        self.snr = snr
+        self.skip = skip
+        self.reset()
+
+    def reset(self):
+        """Forget all state and wait for the next transmission."""
+        self.symbols = []
+        self.energies = []
+        self.start = None
+        self.position = 0
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._floor_sum = 0.0
+        self._floor_blocks = 0
+        self._acc = np.zeros(len(self.freqs), dtype=np.complex128)
+        self._level = np.zeros(len(self.freqs))
+        self._offset = 0
+
+    def feed(self, chunk):
+        """
+        Process the next chunk of samples.
+
+        Returns:
+        list: Symbols completed by this chunk (possibly empty).
+        """
+        chunk = np.asarray(chunk, dtype=np.float32)
+        base = self.position
+        self.position += len(chunk)
+
+        if self.start is None:
+            # Samples before `skip` are discarded (e.g. stream start-up noise)
+            if base < self.skip:
+                chunk = chunk[self.skip - base:]
+                base = self.skip
+            data = np.concatenate([self._pending, chunk]) if len(self._pending) else chunk
+            base -= len(self._pending)
+
+            onset = self._find_onset(data)
+            if onset is None:
+                whole = len(data) // self.block * self.block
+                self._pending = data[whole:].copy()
+                return []
+            self._pending = np.zeros(0, dtype=np.float32)
+            self.start = base + onset
+            chunk = data[onset:]
+
+        return self._accumulate(chunk)
+
+    def _find_onset(self, data):
+        levels = window_energies(data, self.freqs, self.sample_rate, self.block).max(axis=1)
+        for i, level in enumerate(levels):
+            if self._floor_blocks >= self.MIN_FLOOR_BLOCKS:
+                if level > self.snr * self._floor_sum / self._floor_blocks:
+                    return i * self.block
+            self._floor_sum += float(level)
+            self._floor_blocks += 1
+        return None
+
+    def _accumulate(self, samples):
+        basis = tone_basis(self.freqs, self.sample_rate, self.sub_len)
+        used = self.n_sub * self.sub_len
+        completed = []
+        i = 0
+        while i < len(samples):
+            # Step to the next sub-block boundary (or the end of the symbol)
+            if self._offset < used:
+                boundary = (self._offset // self.sub_len + 1) * self.sub_len
+            else:
+                boundary = self.symbol_len
+            take = min(boundary - self._offset, len(samples) - i)
+            if self._offset < used:
+                pos = self._offset % self.sub_len
+                self._acc += samples[i:i + take] @ basis[pos:pos + take]
+            self._offset += take
+            i += take
+
+            if self._offset == boundary and self._offset <= used:
+                self._level += np.abs(self._acc)
+                self._acc[:] = 0
+
+            if self._offset == self.symbol_len:
+                energy = (self._level * (2.0 / (self.n_sub * self.sub_len))).astype(np.float32)
+                symbol = int(energy.argmax())
+                self.energies.append(energy)
+                self.symbols.append(symbol)
+                completed.append(symbol)
+                self._level[:] = 0
+                self._offset = 0
+        return completed
+
+    def energy_matrix(self):
+        """Return the (n_symbols x M) tone amplitudes decoded so far."""
+        return np.array(self.energies, dtype=np.float32).reshape(-1, len(self.freqs))
@@ -0,0 +1,152 @@
+"""
+Monte Carlo error-injection simulator for CRC error correction.
+
+Generates random datawords, encodes them, injects errors and runs the syndrome
+corrector, all in batch (see common.crc_batch), spread over a process pool.
+Reports how often frames are corrected, miscorrected (the corrector "fixed"
+them into the wrong codeword), left undetected, or flagged as uncorrectable,
+along with the frames/sec achieved.
+
+Error models:
+    single  - exactly one flipped bit
+    double  - exactly two distinct flipped bits
+    burst   - a burst of `burst` bits: first and last flipped, interior random
+    ber     - each bit flipped independently with probability `ber`
+
+Usage:
+    python -m common.errorsim --data-bits 32 --trials 1000000 --pattern double
+    python -m common.errorsim --data-bits 45 --pattern ber --ber 0.01
+"""
+
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from common.crc_batch import AMBIGUOUS, CORRECTED, OK, UNCORRECTABLE, correct_batch, encode_batch
+from common.polysearch import pick_generator_for_data
+
+PATTERNS = ('single', 'double', 'burst', 'ber')
+
+# Frames simulated per batch; bounds memory to a few tens of MB per worker
+BATCH_SIZE = 100000
+
+
+def error_patterns(rng, n_frames, length, pattern, ber=0.01, burst=4):
+    """
+    Return an (n_frames x length) uint8 matrix of error patterns.
+    """
+    errors = np.zeros((n_frames, length), dtype=np.uint8)
+    rows = np.arange(n_frames)
+
+    if pattern == 'single':
+        errors[rows, rng.integers(0, length, n_frames)] = 1
+    elif pattern == 'double':
+        first = rng.integers(0, length, n_frames)
+        # Offset in [1, length) guarantees a second, distinct position
+        second = (first + rng.integers(1, length, n_frames)) % length
+        errors[rows, first] = 1
+        errors[rows, second] = 1
+    elif pattern == 'burst':
+        burst = min(burst, length)
+        start = rng.integers(0, length - burst + 1, n_frames)
+        offsets = np.arange(burst)
+        window = rng.integers(0, 2, (n_frames, burst), dtype=np.uint8)
+        window[:, 0] = 1
+        window[:, -1] = 1
+        errors[rows[:, None], start[:, None] + offsets] = window
+    elif pattern == 'ber':
+        errors = (rng.random((n_frames, length)) < ber).astype(np.uint8)
+    else:
+        raise ValueError(f"Unknown error pattern {pattern!r}, expected one of {PATTERNS}.")
+    return errors
+
+
+def simulate_batch(args):
+    """
+    Simulate one batch of frames and return the outcome counts.
+
+    `args` is a tuple (seed, n_frames, data_bits, generator, pattern, ber, burst)
+    so the function can be used with ProcessPoolExecutor.map().
+    """
+    seed, n_frames, data_bits, generator, pattern, ber, burst = args
+    rng = np.random.default_rng(seed)
+
+    datawords = rng.integers(0, 2, (n_frames, data_bits), dtype=np.uint8)
+    codewords = encode_batch(datawords, generator)
+    errors = error_patterns(rng, n_frames, codewords.shape[1], pattern, ber, burst)
+    received = codewords ^ errors
+
+    result = correct_batch(received, generator)
+    status = result['status']
+    has_error = errors.any(axis=1)
+    matches = (result['frames'] == codewords).all(axis=1)
+    accepted = (status == OK) | (status == CORRECTED)
+
+    return {
+        'frames': n_frames,
+        'error_free': int(np.count_nonzero(~has_error)),
+        'corrected': int(np.count_nonzero(has_error & accepted & matches)),
+        'miscorrected': int(np.count_nonzero((status == CORRECTED) & ~matches)),
+        'undetected': int(np.count_nonzero(has_error & (status == OK))),
+        'detected': int(np.count_nonzero((status == AMBIGUOUS) | (status == UNCORRECTABLE))),
+    }
+
+
+def simulate(data_bits, trials, pattern, generator=None, ber=0.01, burst=4, workers=None, seed=None):
+    """
+    Run `trials` frames through encode -> inject -> correct.
+
+    Returns:
+    dict: outcome counts plus 'rates' (fraction of erroneous frames in each
+    outcome), 'generator', 'elapsed' seconds and 'frames_per_sec'.
+    """
+    if generator is None:
+        generator = pick_generator_for_data(data_bits)
+
+    sizes = [BATCH_SIZE] * (trials // BATCH_SIZE)
+    if trials % BATCH_SIZE:
+        sizes.append(trials % BATCH_SIZE)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(s, n, data_bits, generator, pattern, ber, burst) for s, n in zip(seeds, sizes)]
+
+    totals = dict.fromkeys(('frames', 'error_free', 'corrected', 'miscorrected', 'undetected', 'detected'), 0)
+    start = time.time()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for counts in pool.map(simulate_batch, jobs):
+            for key, value in counts.items():
+                totals[key] += value
+    elapsed = time.time() - start
+
+    erroneous = max(totals['frames'] - totals['error_free'], 1)
+    totals['rates'] = {
+        key: totals[key] / erroneous for key in ('corrected', 'miscorrected', 'undetected', 'detected')
+    }
+    totals['generator'] = generator
+    totals['elapsed'] = elapsed
+    totals['frames_per_sec'] = totals['frames'] / elapsed if elapsed else float('inf')
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo simulation of CRC error correction")
+    parser.add_argument("--data-bits", type=int, default=32, help="Dataword length in bits")
+    parser.add_argument("--trials", type=int, default=1000000, help="Number of frames to simulate")
+    parser.add_argument("--pattern", choices=PATTERNS, default='double', help="Error model")
+    parser.add_argument("--ber", type=float, default=0.01, help="Bit error rate for the 'ber' model")
+    parser.add_argument("--burst", type=int, default=4, help="Burst length for the 'burst' model")
+    parser.add_argument("--generator", default=None, help="Generator polynomial (default: picked by length)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+    args = parser.parse_args()
+
+    stats = simulate(args.data_bits, args.trials, args.pattern, args.generator,
+                     args.ber, args.burst, args.workers, args.seed)
+
+    print(f"Generator: \t\t{stats['generator']}")
+    print(f"Frames: \t\t{stats['frames']} ({stats['error_free']} error-free)")
+    for key, rate in stats['rates'].items():
+        print(f"{key.capitalize()}: \t\t{stats[key]} ({rate:.4%})")
+    print(f"Time taken: \t\t{stats['elapsed']:.2f} seconds")
+    print(f"Frames/sec: \t\t{stats['frames_per_sec']:.0f}")
@@ -0,0 +1,96 @@
+"""
+Bandpass filter bank for the receivers' Butterworth demodulation path.
+
+The receivers used to design a Butterworth bandpass filter in (b, a) form
+for every band of every slot and run each band through lfilter() on its own.
+At order 5 with bands only a few hundred Hz wide, the transfer-function
+coefficients lose most of their precision. The filters are designed here as
+second-order sections (SOS) instead, once per (bands, sample rate, order),
+and cached. FilterBank.envelopes() runs every band over the same float
+input into one preallocated (n_bands x n_samples) array, subtracts the
+noise floor from all bands in one vectorized step, and returns float32
+envelopes.
+
+Usage:
+    bank = FilterBank.around([3300, 4100, 4700, 5900], 100, 20000)
+    envelopes = bank.envelopes(audio_data, noise=0.009)   # (4 x n) float32
+"""
+
+from functools import lru_cache
+
+import numpy as np
+from scipy.signal import butter, sosfilt
+
+
+@lru_cache(maxsize=32)
+def design_bank(bands, sample_rate, order=5):
+    """
+    Return the cached SOS coefficients of a Butterworth bandpass filter per
+    band, as a read-only (n_bands x n_sections x 6) float64 array.
+
+    Parameters:
+    bands (tuple): (low, high) cutoff pairs in Hz.
+    sample_rate (int): Sample rate of the signal to filter.
+    order (int): Butterworth order of each bandpass filter.
+    """
+    nyquist = 0.5 * sample_rate
+    sos = np.stack([
+        butter(order, [low / nyquist, high / nyquist], btype='band', output='sos')
+        for low, high in bands
+    ])
+    sos.setflags(write=False)
+    return sos
+
+
+class FilterBank:
+    """
+    Butterworth bandpass filters for a fixed band plan and sample rate.
+
+    Attributes:
+    bands (tuple): (low, high) cutoff pairs in Hz.
+    sample_rate (int): Sample rate of the signals to filter.
+    sos (numpy.ndarray): (n_bands x n_sections x 6) filter coefficients.
+    """
+
+    def __init__(self, bands, sample_rate, order=5):
+        self.bands = tuple((float(low), float(high)) for low, high in bands)
+        self.sample_rate = sample_rate
+        self.sos = design_bank(self.bands, sample_rate, order)
+
+    @classmethod
+    def around(cls, freqs, tolerance, sample_rate, order=5):
+        """Bank with one band of +- `tolerance` Hz around each frequency."""
+        return cls([(freq - tolerance, freq + tolerance) for freq in freqs], sample_rate, order)
+
+    def filter(self, samples):
+        """
+        Bandpass-filter `samples` through every band.
+
+        Returns:
+        numpy.ndarray: (n_bands x n_samples) float64 filtered signals.
+        """
+        samples = np.asarray(samples, dtype=np.float64)
+        out = np.empty((len(self.sos), len(samples)))
+        # sosfilt() applies one cascade per call; each band is a single C
+        # pass over the shared input into its row of the output. It needs
+        # writable coefficients, so each band gets a copy of its few sections
+        for band, sos in enumerate(self.sos):
+            out[band] = sosfilt(sos.copy(), samples)
+        return out
+
+    def envelopes(self, samples, noise=0.0):
+        """
+        Rectified output of every band with the noise floor removed.
+
+        Parameters:
+        samples (array-like): Audio samples.
+        noise (float): Noise floor subtracted from every sample that exceeds
+            it (samples at or below it are kept as they are).
+
+        Returns:
+        numpy.ndarray: (n_bands x n_samples) float32 envelopes.
+        """
+        envelopes = np.abs(self.filter(samples)).astype(np.float32)
+        if noise:
+            np.subtract(envelopes, np.float32(noise), out=envelopes, where=envelopes > noise)
+        return envelopes
@@ -0,0 +1,242 @@
+"""
+Bit-packed frames for the modem, CRC and MAC layers.
+
+BitVector stores bits MSB-first in a bytearray (one bit per bit instead of one
+str character per bit). Single-bit reads and flips are O(1), slices share
+memory with the parent through a memoryview, and conversion to/from symbol
+indices is done on the packed integer value.
+
+Frame adds the Lab03 header layout on top:
+
+    | preamble (6) | length (5) | dest (2) | src (2) | payload ... |
+
+where length counts the dest, src and payload bits.
+"""
+
+
+class BitVector:
+    """
+    Fixed-length, mutable sequence of bits packed into bytes.
+
+    Slicing with a step of 1 returns a view: flipping a bit in the slice flips
+    it in the parent too. Use copy() for an independent vector.
+    """
+
+    __slots__ = ('_buf', '_offset', '_nbits')
+
+    def __init__(self, nbits=0, buf=None, offset=0):
+        if buf is None:
+            buf = bytearray((nbits + 7) // 8)
+        self._buf = buf
+        self._offset = offset
+        self._nbits = nbits
+
+    # -- construction -------------------------------------------------------
+
+    @classmethod
+    def from_int(cls, value, nbits):
+        """Build a vector holding the low `nbits` bits of `value`, MSB first."""
+        nbytes = (nbits + 7) // 8
+        value &= (1 << nbits) - 1
+        return cls(nbits, bytearray((value << (nbytes * 8 - nbits)).to_bytes(nbytes, 'big')))
+
+    @classmethod
+    def from_string(cls, bits):
+        """Build a vector from a '0'/'1' string."""
+        return cls.from_int(int(bits, 2) if bits else 0, len(bits))
+
+    @classmethod
+    def from_bits(cls, bits):
+        """Build a vector from an iterable of 0/1 values."""
+        return cls.from_string(''.join('1' if bit else '0' for bit in bits))
+
+    @classmethod
+    def from_symbols(cls, symbols, bits_per_symbol, nbits=None):
+        """
+        Build a vector from symbol indices of `bits_per_symbol` bits each,
+        optionally truncated to the first `nbits` bits.
+        """
+        value = 0
+        for symbol in symbols:
+            value = (value << bits_per_symbol) | symbol
+        total = len(symbols) * bits_per_symbol
+        if nbits is not None and nbits < total:
+            value >>= total - nbits
+            total = nbits
+        return cls.from_int(value, total)
+
+    @classmethod
+    def of(cls, bits):
+        """Return an independent BitVector copy of a BitVector or '0'/'1' string."""
+        if isinstance(bits, BitVector):
+            return bits.copy()
+        if isinstance(bits, str):
+            return cls.from_string(bits)
+        return cls.from_bits(bits)
+
+    # -- conversion ---------------------------------------------------------
+
+    def to_int(self):
+        """Return the bits as an unsigned integer (first bit most significant)."""
+        if not self._nbits:
+            return 0
+        start = self._offset >> 3
+        end = (self._offset + self._nbits + 7) >> 3
+        value = int.from_bytes(self._buf[start:end], 'big')
+        trailing = (end << 3) - self._offset - self._nbits
+        return (value >> trailing) & ((1 << self._nbits) - 1)
+
+    def to_string(self):
+        """Return the bits as a '0'/'1' string."""
+        return format(self.to_int(), f'0{self._nbits}b') if self._nbits else ''
+
+    def to_symbols(self, bits_per_symbol):
+        """
+        Split the bits into symbol indices of `bits_per_symbol` bits, padding
+        the last symbol with zeros if needed.
+        """
+        pad = -self._nbits % bits_per_symbol
+        value = self.to_int() << pad
+        mask = (1 << bits_per_symbol) - 1
+        top = self._nbits + pad - bits_per_symbol
+        return [(value >> shift) & mask for shift in range(top, -1, -bits_per_symbol)]
+
+    def copy(self):
+        """Return an independent, compact copy."""
+        return type(self).from_int(self.to_int(), self._nbits)
+
+    # -- bit access ---------------------------------------------------------
+
+    def _index(self, pos):
+        if pos < 0:
+            pos += self._nbits
+        if not 0 <= pos < self._nbits:
+            raise IndexError(f"Bit position {pos} out of range for {self._nbits} bits.")
+        pos += self._offset
+        return pos >> 3, 0x80 >> (pos & 7)
+
+    def flip(self, pos):
+        """Flip the bit at `pos` in place."""
+        byte, mask = self._index(pos)
+        self._buf[byte] ^= mask
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._nbits)
+            if step != 1:
+                return BitVector.from_bits(self[i] for i in range(start, stop, step))
+            stop = max(start, stop)
+            first = self._offset + start
+            view = memoryview(self._buf)[first >> 3:(self._offset + stop + 7) >> 3]
+            return BitVector(stop - start, view, first & 7)
+        byte, mask = self._index(key)
+        return 1 if self._buf[byte] & mask else 0
+
+    def __setitem__(self, pos, bit):
+        byte, mask = self._index(pos)
+        if bit and bit != '0':
+            self._buf[byte] |= mask
+        else:
+            self._buf[byte] &= ~mask & 0xFF
+
+    def __len__(self):
+        return self._nbits
+
+    def __iter__(self):
+        return map(int, self.to_string())
+
+    def __add__(self, other):
+        other = other if isinstance(other, BitVector) else BitVector.of(other)
+        return BitVector.from_int((self.to_int() << len(other)) | other.to_int(), self._nbits + len(other))
+
+    def __eq__(self, other):
+        if isinstance(other, str):
+            return self.to_string() == other
+        if isinstance(other, BitVector):
+            return self._nbits == other._nbits and self.to_int() == other.to_int()
+        return NotImplemented
+
+    __hash__ = None
+
+    def __str__(self):
+        return self.to_string()
+
+    def __repr__(self):
+        return f"{type(self).__name__}('{self.to_string()}')"
+
+
+class Frame(BitVector):
+    """
+    A BitVector with accessors for the Lab03 MAC header.
+    """
+
+    __slots__ = ()
+
+    PREAMBLE = '001011'
+    LENGTH_BITS = 5
+    DEST_BITS = 2
+    SRC_BITS = 2
+
+    PREAMBLE_END = len(PREAMBLE)
+    LENGTH_END = PREAMBLE_END + LENGTH_BITS
+    DEST_END = LENGTH_END + DEST_BITS
+    HEADER_BITS = DEST_END + SRC_BITS
+
+    @classmethod
+    def build(cls, payload, dest, src, bits_per_symbol=2):
+        """
+        Build a frame carrying `payload` from `src` to `dest`, zero-padded to a
+        whole number of symbols. Raises ValueError if the payload is too long
+        for the length field or an address does not fit its field.
+        """
+        payload = payload if isinstance(payload, BitVector) else BitVector.of(payload)
+        length = len(payload) + cls.DEST_BITS + cls.SRC_BITS
+        if length >= 1 << cls.LENGTH_BITS:
+            raise ValueError(f"A {len(payload)}-bit payload does not fit the {cls.LENGTH_BITS}-bit length field "
+                             f"(at most {(1 << cls.LENGTH_BITS) - 1 - cls.DEST_BITS - cls.SRC_BITS} bits).")
+        if not 0 <= dest < 1 << cls.DEST_BITS or not 0 <= src < 1 << cls.SRC_BITS:
+            raise ValueError(f"Addresses must fit in {cls.DEST_BITS} bits, got dest={dest}, src={src}.")
+        value = int(cls.PREAMBLE, 2)
+        value = (value << cls.LENGTH_BITS) | length
+        value = (value << cls.DEST_BITS) | dest
+        value = (value << cls.SRC_BITS) | src
+        value = (value << len(payload)) | payload.to_int()
+
+        nbits = cls.HEADER_BITS + len(payload)
+        pad = -nbits % bits_per_symbol
+        return cls.from_int(value << pad, nbits + pad)
+
+    def has_preamble(self):
+        return len(self) >= self.PREAMBLE_END and self.preamble == self.PREAMBLE
+
+    @property
+    def preamble(self):
+        return self[:self.PREAMBLE_END]
+
+    @property
+    def length(self):
+        """Header length field: number of dest + src + payload bits."""
+        return self[self.PREAMBLE_END:self.LENGTH_END].to_int()
+
+    @property
+    def dest(self):
+        return self[self.LENGTH_END:self.DEST_END].to_int()
+
+    @property
+    def src(self):
+        return self[self.DEST_END:self.HEADER_BITS].to_int()
+
+    def frame_bits(self, bits_per_symbol=1):
+        """
+        Total bits the frame occupies according to its length field, padded to
+        whole symbols, or None while the length field is incomplete.
+        """
+        if len(self) < self.LENGTH_END:
+            return None
+        nbits = self.LENGTH_END + self.length
+        return nbits + (-nbits % bits_per_symbol)
+
+    @property
+    def payload(self):
+        """Payload bits as declared by the length field (view, not a copy)."""
+        return self[self.HEADER_BITS:self.LENGTH_END + self.length]
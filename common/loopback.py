@@ -0,0 +1,247 @@
+"""
+End-to-end modem loopback through an offline audio backend and channel model.
+
+Each trial builds frames the way the Lab02 or Lab03 sender does and plays
+them into an audio backend (common.audio) at the sender's sample rate. The
+receiver script itself then records them through a common.channel.Channel
+and decodes them with its own entry points:
+
+    lab02 - receive_data() and decode_frame(), or receive_stream() when a
+            trial sends several back-to-back frames (--frames)
+    lab03 - record_bitstream() for one slot, with its streaming trigger and
+            decoder pool; the frames it prints are read from `received`
+
+So everything from capture to the decoded message is the receivers' code,
+and a receiver bug shows up as failed frames. Runs faster than real time on
+a headless machine, so decode throughput can be regression-tested without
+sound hardware.
+
+Profiles:
+    lab03 - 4-FSK Frame (preamble, length, dest, src, payload), 44.1 -> 20 kHz
+    lab03-multitone - the same Frame on 4 on/off tones plus a pilot (4 bits per symbol)
+    lab02 - 2-FSK CRC codeword after a 4000 Hz lead-in, 44.1 -> 16 kHz
+
+Usage:
+    python -m common.loopback --profile lab03 --trials 20 --snr 5 --ppm 200
+    python -m common.loopback --profile lab02 --symbol-duration 0.1 --echo 0.01:0.3
+    python -m common.loopback --profile lab02 --frames 3 --symbol-duration 0.2
+    python -m common.loopback --symbol-duration 0.05 --ppm 2000 --track
+    python -m common.loopback --backend wav:loopback.wav --trials 1
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import os
+import random
+import time
+from functools import lru_cache
+
+import numpy as np
+
+from common.audio import Air, MemoryBackend, open_backend, paFloat32
+from common.bch import CODEC_BITS, CODEC_CRC, LENGTH_FIELD_BITS, codec_encode
+from common.channel import Channel
+from common.frame import BitVector, Frame
+from common.mfsk import MFSK
+from common.polysearch import pick_generator_for_data
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Receiver script of each lab, relative to the repository root
+RECEIVERS = {
+    'lab02': 'Lab02/receiver-combined.py',
+    'lab03': 'Lab03/receiver.py',
+}
+
+PROFILES = {
+    'lab03': {'lab': 'lab03', 'tx_rate': 44100, 'symbol_mode': 'mfsk', 'bits_per_symbol': 2, 'symbol_duration': 1.0},
+    'lab03-multitone': {
+        'lab': 'lab03', 'tx_rate': 44100, 'symbol_mode': 'multitone', 'bits_per_symbol': 4, 'symbol_duration': 1.0,
+    },
+    'lab02': {'lab': 'lab02', 'tx_rate': 44100, 'bits_per_symbol': 1, 'symbol_duration': 1.0},
+}
+
+LEAD_IN = 1.0  # seconds of silence before the first frame
+TAIL = 1.0  # seconds recorded after the end of the last frame
+
+
+@lru_cache(maxsize=None)
+def load_receiver(lab):
+    """
+    Import a lab's receiver script as a module (once per process). Its
+    import-time stream, if any, opens on the in-process memory backend.
+    """
+    path = os.path.join(ROOT, RECEIVERS[lab])
+    spec = importlib.util.spec_from_file_location(f"{lab}_receiver", path)
+    module = importlib.util.module_from_spec(spec)
+    previous = os.environ.get('AUDIO_BACKEND')
+    os.environ['AUDIO_BACKEND'] = 'memory'
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        if previous is None:
+            del os.environ['AUDIO_BACKEND']
+        else:
+            os.environ['AUDIO_BACKEND'] = previous
+    return module
+
+
+def play(backend, wave, sample_rate):
+    out = backend.open(format=paFloat32, channels=1, rate=sample_rate, output=True)
+    out.write(wave.tobytes())
+    out.close()
+
+
+def build_lab02(rng):
+    data = BitVector.from_bits([rng.randint(0, 1) for _ in range(rng.randint(8, 40))])
+    codeword = codec_encode(data, CODEC_CRC, pick_generator_for_data(len(data)))
+    header = BitVector.from_int(len(codeword), LENGTH_FIELD_BITS) + BitVector.from_int(CODEC_CRC, CODEC_BITS)
+    return header + codeword, codeword
+
+
+def trial_lab02(backend, rng, profile, duration, frames, track):
+    """
+    Send `frames` back-to-back Lab02 frames and decode them with the Lab02
+    receiver. Returns (frames decoded correctly, seconds of audio).
+    """
+    rx = load_receiver('lab02')
+    rx.bit_duration = duration
+    rx.modem = MFSK.for_lab('lab02', profile['bits_per_symbol'], duration)
+    rx.archive = None
+    if track is not None:
+        rx.timing_recovery = track
+
+    waves, expected = [], []
+    for _ in range(frames):
+        bits, codeword = build_lab02(rng)
+        waves.append(rx.modem.modulate(bits, profile['tx_rate'], preamble=((rx.lead_freq,), rx.lead_duration),
+                                       ramp=0.01 * duration))
+        expected.append(codeword)
+    wave = np.concatenate(waves)
+    play(backend, wave, profile['tx_rate'])
+    seconds = LEAD_IN + len(wave) / profile['tx_rate'] + TAIL
+
+    if frames == 1:
+        rx.duration = seconds
+        received, reliability = rx.receive_data(backend)
+        results = [rx.decode_frame(received, reliability)]
+    else:
+        rx.stream_duration = seconds
+        results = rx.receive_stream(backend)
+
+    decoded = [str(result['codeword']) for result in results if result['status'] in ('ok', 'corrected')]
+    ok = 0
+    for codeword in expected:
+        if str(codeword) in decoded:
+            decoded.remove(str(codeword))
+            ok += 1
+    return ok, seconds
+
+
+def trial_lab03(backend, rng, profile, duration, frames, track):
+    """
+    Send one Lab03 frame to the receiver's device and record one slot with
+    the Lab03 receiver. Returns (frames decoded correctly, seconds of audio).
+    """
+    if frames != 1:
+        raise ValueError("Lab03 receives one frame per slot; use --frames 1.")
+    rx = load_receiver('lab03')
+    rx.configure(profile['symbol_mode'], profile['bits_per_symbol'], duration)
+    if track is not None:
+        rx.TIMING_RECOVERY = track
+
+    payload = BitVector.from_bits([rng.randint(0, 1) for _ in range(rng.randint(4, 20))])
+    frame = Frame.build(payload, rx.DEVICE_ID, rng.randint(0, 3), profile['bits_per_symbol'])
+    wave = rx.MODEM.modulate(frame, profile['tx_rate'], ramp=0.01 * duration)
+    play(backend, wave, profile['tx_rate'])
+    seconds = LEAD_IN + len(wave) / profile['tx_rate'] + TAIL
+    if seconds > rx.DURATION:
+        # The slot must hold the whole frame
+        rx.configure(profile['symbol_mode'], profile['bits_per_symbol'], duration, seconds)
+
+    rx.stream = backend.open(format=paFloat32, channels=1, rate=rx.SAMPLE_RATE, input=True,
+                             frames_per_buffer=rx.CHUNK)
+    del rx.received[:]
+    rx.record_bitstream(1)
+    rx.decode_pool.join()
+    rx.stream.close()
+    got = [(source, message) for _, source, message in rx.received]
+    return int(got == [(frame.src, str(payload))]), max(seconds, rx.DURATION)
+
+
+TRIALS = {'lab02': trial_lab02, 'lab03': trial_lab03}
+
+
+def loopback(profile_name, trials, channel=None, duration=None, backend_spec='memory', seed=None, track=None,
+             frames=1, verbose=False):
+    """
+    Run `trials` trials of `frames` frames each end to end and return a
+    stats dict: 'ok' (frames decoded correctly), 'frames', 'trials',
+    'audio_seconds', 'elapsed', 'receive_seconds', 'realtime_factor'.
+    `track` turns symbol timing recovery (common.timing) in the receiver on
+    or off (None: the receiver's default). The receiver's printout is only
+    shown if `verbose`.
+    """
+    profile = PROFILES[profile_name]
+    duration = duration or profile['symbol_duration']
+    trial = TRIALS[profile['lab']]
+    rng = random.Random(seed)
+
+    stats = {'trials': trials, 'frames': trials * frames, 'ok': 0, 'audio_seconds': 0.0, 'receive_seconds': 0.0}
+    start = time.perf_counter()
+    for _ in range(trials):
+        if backend_spec == 'memory':
+            backend = MemoryBackend(Air(lead_in=LEAD_IN), channel)
+        else:
+            backend = open_backend(backend_spec, channel)
+
+        receive_start = time.perf_counter()
+        output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        with output:
+            ok, seconds = trial(backend, rng, profile, duration, frames, track)
+        stats['receive_seconds'] += time.perf_counter() - receive_start
+        backend.terminate()
+
+        stats['audio_seconds'] += seconds
+        stats['ok'] += ok
+
+    stats['elapsed'] = time.perf_counter() - start
+    stats['realtime_factor'] = stats['audio_seconds'] / stats['elapsed'] if stats['elapsed'] else float('inf')
+    return stats
+
+
+def _parse_echo(text):
+    delay, gain = text.split(':')
+    return float(delay), float(gain)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline end-to-end modem loopback")
+    parser.add_argument("--profile", choices=PROFILES, default='lab03', help="Sender/receiver pair to simulate")
+    parser.add_argument("--trials", type=int, default=10, help="Number of frames")
+    parser.add_argument("--backend", default='memory', help="'memory', 'wav:PATH' or 'raw:PATH'")
+    parser.add_argument("--symbol-duration", type=float, default=None, help="Seconds per symbol (default: lab value)")
+    parser.add_argument("--gain", type=float, default=0.5, help="Channel attenuation (amplitude factor)")
+    parser.add_argument("--snr", type=float, default=10.0, help="SNR of white noise in dB")
+    parser.add_argument("--noise", type=float, default=0.001, help="Signal-independent noise std")
+    parser.add_argument("--ppm", type=float, default=0.0, help="Receiver clock offset in ppm")
+    parser.add_argument("--echo", type=_parse_echo, action='append', default=[], help="Echo DELAY:GAIN (repeatable)")
+    parser.add_argument("--ambient", type=float, default=0.0, help="RMS of ambient (brown) noise")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+    parser.add_argument("--track", action=argparse.BooleanOptionalAction, default=None,
+                        help="Recover symbol timing instead of fixed steps (default: as the receiver is set)")
+    parser.add_argument("--frames", type=int, default=1, help="Back-to-back frames per trial (lab02)")
+    parser.add_argument("--verbose", action='store_true', help="Show the receiver's output")
+    args = parser.parse_args()
+
+    channel = Channel(gain=args.gain, snr_db=args.snr, noise_std=args.noise, clock_ppm=args.ppm,
+                      echoes=args.echo, ambient_level=args.ambient, seed=args.seed)
+    stats = loopback(args.profile, args.trials, channel, args.symbol_duration, args.backend, args.seed, args.track,
+                     args.frames, args.verbose)
+
+    print(f"Frames decoded: \t{stats['ok']}/{stats['frames']}")
+    print(f"Audio simulated: \t{stats['audio_seconds']:.1f} seconds")
+    print(f"Time taken: \t\t{stats['elapsed']:.2f} seconds ({stats['realtime_factor']:.0f}x real time)")
+    print(f"Receiver time/trial: \t{stats['receive_seconds'] / max(stats['trials'], 1) * 1e3:.2f} ms")
@@ -0,0 +1,149 @@
+"""
+Generalized M-FSK modem configuration.
+
+An MFSK modem sends bits_per_symbol bits per symbol as one of
+M = 2 ** bits_per_symbol tones. Symbol value s (the next bits_per_symbol
+bits, MSB first) is sent on freqs[s]. Packing and unpacking between bits and
+symbols are NumPy reshapes, and the receiver side is an M-band
+common.demod detector, so the same code serves 2-, 4-, 8- or 16-FSK.
+
+PLANS holds the frequency plans the labs have always used. band_plan()
+spreads M tones evenly over a band for other symbol sizes:
+
+    modem = MFSK.for_lab('lab03', bits_per_symbol=4)   # 16 tones, 3300-5900 Hz
+    wave = modem.modulate(frame, 44100)
+    bits, energies, start = modem.demodulate(samples, 20000)
+"""
+
+import numpy as np
+
+from common.chase import bit_reliabilities
+from common.demod import RESOLUTION, demodulate
+from common.frame import BitVector
+from common.modulator import modulate
+from common.timing import tracked_energies
+
+# Frequency plans used by the lab scripts, keyed by lab and bits per symbol
+PLANS = {
+    'lab02': {1: (5000, 7000)},
+    'lab03': {2: (3300, 4100, 4700, 5900), 3: (5000, 5500, 6000, 6500, 7000, 7500, 8000, 8500)},
+}
+
+# Band spanned by generated plans, per lab (Hz)
+BANDS = {
+    'lab02': (4500, 7500),
+    'lab03': (3300, 5900),
+}
+
+
+def band_plan(bits_per_symbol, low, high):
+    """Return 2 ** bits_per_symbol tones evenly spaced from `low` to `high` Hz."""
+    n_tones = 1 << bits_per_symbol
+    return tuple(np.linspace(low, high, n_tones).round().astype(int).tolist())
+
+
+def pack(bits, bits_per_symbol):
+    """
+    Pack a bit sequence (str, BitVector or array of 0/1) into symbol values,
+    MSB first, zero-padding the last symbol.
+
+    Returns:
+    numpy.ndarray: int64 symbols.
+    """
+    if isinstance(bits, (str, BitVector)):
+        bits = [int(bit) for bit in BitVector.of(bits)]
+    bits = np.asarray(bits, dtype=np.int64)
+    pad = -len(bits) % bits_per_symbol
+    if pad:
+        bits = np.concatenate([bits, np.zeros(pad, dtype=np.int64)])
+    weights = 1 << np.arange(bits_per_symbol - 1, -1, -1)
+    return bits.reshape(-1, bits_per_symbol) @ weights
+
+
+def unpack(symbols, bits_per_symbol, nbits=None):
+    """
+    Unpack symbol values into bits, MSB first.
+
+    Returns:
+    numpy.ndarray: uint8 bits (truncated to `nbits` if given).
+    """
+    symbols = np.asarray(symbols, dtype=np.int64)
+    shifts = np.arange(bits_per_symbol - 1, -1, -1)
+    bits = ((symbols[:, None] >> shifts) & 1).astype(np.uint8).reshape(-1)
+    return bits if nbits is None else bits[:nbits]
+
+
+class MFSK:
+    """
+    M-FSK modem: bits per symbol, frequency plan and symbol duration.
+
+    Attributes:
+    bits_per_symbol (int): Bits carried by each symbol.
+    freqs (tuple): Tone of each symbol value (length 2 ** bits_per_symbol).
+    symbol_duration (float): Seconds per symbol.
+    """
+
+    def __init__(self, bits_per_symbol, freqs=None, symbol_duration=1.0, band=(3300, 5900)):
+        freqs = tuple(freqs) if freqs is not None else band_plan(bits_per_symbol, *band)
+        if len(freqs) != 1 << bits_per_symbol:
+            raise ValueError(f"{bits_per_symbol} bits per symbol needs {1 << bits_per_symbol} tones, got {len(freqs)}.")
+        spacing = np.diff(sorted(freqs)).min() if len(freqs) > 1 else np.inf
+        if spacing < 2 * RESOLUTION:
+            raise ValueError(f"Tones {spacing:.0f} Hz apart cannot be separated (need {2 * RESOLUTION:.0f} Hz).")
+        self.bits_per_symbol = bits_per_symbol
+        self.freqs = freqs
+        self.symbol_duration = symbol_duration
+
+    @classmethod
+    def for_lab(cls, lab, bits_per_symbol, symbol_duration=1.0):
+        """Return the lab's historical plan for this symbol size, else an evenly spaced one in its band."""
+        freqs = PLANS[lab].get(bits_per_symbol)
+        return cls(bits_per_symbol, freqs, symbol_duration, BANDS[lab])
+
+    @property
+    def tones(self):
+        return len(self.freqs)
+
+    def pack(self, bits):
+        return pack(bits, self.bits_per_symbol)
+
+    def unpack(self, symbols, nbits=None):
+        return unpack(symbols, self.bits_per_symbol, nbits)
+
+    def symbol_freqs(self, bits):
+        """Per-symbol frequency tuples for common.modulator."""
+        freqs = np.asarray(self.freqs)[self.pack(bits)]
+        return [(int(freq),) for freq in freqs]
+
+    def modulate(self, bits, sample_rate, preamble=None, modulation='cpfsk', ramp=0.0):
+        """Waveform for `bits` (see common.modulator.modulate())."""
+        return modulate(self.symbol_freqs(bits), self.symbol_duration, sample_rate,
+                        preamble=preamble, modulation=modulation, ramp=ramp)
+
+    def decide(self, energies):
+        """Symbol values from (n_symbols x M) tone amplitudes: the strongest tone."""
+        return np.asarray(energies).reshape(-1, self.tones).argmax(axis=1)
+
+    def demodulate(self, samples, sample_rate, start=None, vector=BitVector, track=False):
+        """
+        Detect the symbols in a recording with an M-band filter bank.
+
+        Returns:
+        tuple: (bits, energies, start): all detected bits as a `vector`
+        (BitVector or a subclass such as Frame), the (n_symbols x M) tone
+        amplitudes and the first symbol's sample index. With `track`, every
+        symbol window is re-aligned by common.timing instead of following
+        fixed steps from `start`.
+        """
+        if track:
+            energies, starts = tracked_energies(samples, self.freqs, sample_rate, self.symbol_duration, start)
+            symbols = self.decide(energies)
+            start = int(starts[0]) if len(starts) else start
+        else:
+            symbols, energies, start = demodulate(samples, self.freqs, sample_rate, self.symbol_duration, start)
+        bits = vector.from_symbols(symbols.tolist(), self.bits_per_symbol)
+        return bits, energies, start
+
+    def reliabilities(self, energies):
+        """Per-bit reliabilities for soft-decision decoding (common.chase)."""
+        return bit_reliabilities(energies, self.bits_per_symbol)
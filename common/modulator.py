@@ -0,0 +1,129 @@
+"""
+FSK waveform synthesis for the senders.
+
+Tones are generated once per (frequency set, duration, sample rate) and kept
+in a cache, and a whole frame (lead-in tone, symbols, optional guard gaps) is
+assembled into one preallocated float32 buffer so it can be played with a
+single stream.write() call.
+
+cpfsk_frame() is a phase-continuous alternative for single-tone (M-FSK)
+symbols: the phase of the whole frame is one cumulative sum over the
+instantaneous frequency, so there is no phase jump (and no spectral splatter
+into the neighbouring bands) at symbol boundaries. Optionally the frequency
+transitions are smoothed with a raised-cosine pulse. modulate() selects
+between the two with MODULATIONS.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+
+@lru_cache(maxsize=256)
+def tone(frequencies, duration, sample_rate):
+    """
+    Return the cached float32 tone for a tuple of frequencies played together.
+
+    Same waveform as generate_combined_tone() in Lab03/xtras: a sum of sines
+    starting at phase 0, divided by the number of frequencies. The returned
+    array is read-only since it is shared.
+    """
+    t = np.linspace(0, duration, int(sample_rate * duration), False)
+    combined = np.zeros_like(t)
+    for freq in frequencies:
+        combined += np.sin(2 * np.pi * freq * t)
+    combined /= max(len(frequencies), 1)
+
+    combined = combined.astype(np.float32)
+    combined.setflags(write=False)
+    return combined
+
+
+def synthesize_frame(symbol_freqs, duration, sample_rate, preamble=None, guard=0.0):
+    """
+    Assemble a complete frame waveform into one float32 buffer.
+
+    Parameters:
+    symbol_freqs (list): For each symbol, a tuple of the frequencies to play.
+    duration (float): Duration of each symbol in seconds.
+    sample_rate (int): Output sample rate.
+    preamble (tuple): Optional (frequencies, duration) lead-in tone played
+        before the symbols, e.g. ((4000,), 2) for Lab02.
+    guard (float): Optional silence in seconds after every symbol.
+
+    Returns:
+    numpy.ndarray: float32 samples for the whole frame.
+    """
+    symbol_len = int(sample_rate * duration)
+    guard_len = int(sample_rate * guard)
+    preamble_tone = tone(tuple(preamble[0]), preamble[1], sample_rate) if preamble else None
+    start = len(preamble_tone) if preamble_tone is not None else 0
+
+    frame = np.zeros(start + len(symbol_freqs) * (symbol_len + guard_len), dtype=np.float32)
+    if preamble_tone is not None:
+        frame[:start] = preamble_tone
+
+    pos = start
+    for freqs in symbol_freqs:
+        frame[pos:pos + symbol_len] = tone(tuple(freqs), duration, sample_rate)
+        pos += symbol_len + guard_len
+    return frame
+
+
+MODULATIONS = ('fsk', 'cpfsk')
+
+
+def cpfsk_frame(symbol_freqs, duration, sample_rate, preamble=None, ramp=0.0):
+    """
+    Continuous-phase FSK waveform for a frame of single-tone symbols.
+
+    Parameters:
+    symbol_freqs (list): Frequency of each symbol (a number or a 1-tuple).
+    duration (float): Duration of each symbol in seconds.
+    sample_rate (int): Output sample rate.
+    preamble (tuple): Optional (frequencies, duration) lead-in tone; it is
+        part of the same continuous phase.
+    ramp (float): Length in seconds of the raised-cosine frequency transition
+        between symbols (0 switches frequency abruptly, still phase-continuous).
+
+    Returns:
+    numpy.ndarray: float32 samples for the whole frame.
+    """
+    freqs = np.array([f[0] if isinstance(f, (tuple, list)) else f for f in symbol_freqs], dtype=np.float64)
+    symbol_len = int(sample_rate * duration)
+    inst_freq = np.repeat(freqs, symbol_len)
+
+    if preamble:
+        lead = np.full(int(sample_rate * preamble[1]), float(preamble[0][0]))
+        inst_freq = np.concatenate([lead, inst_freq])
+
+    ramp_len = int(sample_rate * ramp)
+    if ramp_len > 1 and len(inst_freq) > ramp_len:
+        # Raised-cosine (Hann) smoothing of the frequency trajectory; edges are
+        # padded with the first/last frequency so the ends are unchanged
+        kernel = np.hanning(ramp_len + 2)[1:-1]
+        kernel /= kernel.sum()
+        half = ramp_len // 2
+        padded = np.pad(inst_freq, (half, ramp_len - 1 - half), mode='edge')
+        inst_freq = np.convolve(padded, kernel, mode='valid')
+
+    phase = 2 * np.pi * np.cumsum(inst_freq) / sample_rate
+    # cumsum gives the phase at the end of each sample; start the frame at 0
+    phase -= phase[0] if len(phase) else 0
+    return np.sin(phase).astype(np.float32)
+
+
+def modulate(symbol_freqs, duration, sample_rate, preamble=None, modulation='fsk', guard=0.0, ramp=0.0):
+    """
+    Build a frame waveform with the chosen modulation ('fsk' or 'cpfsk').
+
+    'fsk' uses synthesize_frame() (supports multi-tone symbols and guard gaps);
+    'cpfsk' uses cpfsk_frame() and requires one frequency per symbol.
+    """
+    if modulation == 'fsk':
+        return synthesize_frame(symbol_freqs, duration, sample_rate, preamble, guard)
+    if modulation == 'cpfsk':
+        if guard:
+            raise ValueError("Guard intervals would break phase continuity; use 'fsk'.")
+        return cpfsk_frame(symbol_freqs, duration, sample_rate, preamble, ramp)
+    raise ValueError(f"Unknown modulation {modulation!r}, expected one of {MODULATIONS}.")
@@ -0,0 +1,244 @@
+"""
+Parallel multi-tone (on/off keyed) symbols.
+
+Every data tone carries one bit per symbol: it sounds when the bit is 1 and
+is silent when it is 0, so N tones carry N bits per symbol period instead of
+the log2(M) bits of M-FSK. A pilot tone sounds during every symbol. It marks
+where the transmission starts (a symbol of all-zero bits would otherwise be
+silence) and gives each symbol a reference level to compare the data tones
+against.
+
+The receiver measures every tone's amplitude per symbol with the same
+DFT-bin filter bank as common.demod, divides by the pilot's amplitude (so
+fading and volume changes over the frame cancel out) and decides each tone
+against its own threshold. A tone's threshold starts halfway between off (0)
+and on (1) and is then moved to the midpoint of that tone's "on" and "off"
+clusters, which absorbs the speaker and microphone response at that
+frequency.
+
+MultiTone has the same interface as common.mfsk.MFSK, so the lab scripts can
+switch between the two:
+
+    modem = MultiTone.for_lab('lab03', bits_per_symbol=4)   # 4 data tones + pilot
+    wave = modem.modulate(frame, 44100)
+    bits, energies, start = modem.demodulate(samples, 20000)
+"""
+
+import numpy as np
+
+from common.demod import RESOLUTION, find_onset, window_energies
+from common.frame import BitVector
+from common.mfsk import BANDS, pack, unpack
+from common.modulator import tone
+from common.timing import tracked_energies
+
+# A symbol whose pilot is weaker than this fraction of the strongest pilot is
+# taken as no transmission (all bits 0, zero reliability)
+PILOT_FRACTION = 0.25
+
+# Minimum ratio between the mean "on" and "off" levels of a tone for its own
+# threshold to be trusted; otherwise the default threshold is kept
+MIN_CONTRAST = 2.0
+
+# Pilot-relative level below which a tone is never taken as present, however
+# it clusters
+MIN_LEVEL = 0.15
+
+# Pilot-relative level halfway between an absent and a present tone
+DEFAULT_THRESHOLD = 0.5
+
+
+def tone_gates(symbols, bits_per_symbol):
+    """Return the (n_symbols x bits_per_symbol) 0/1 on/off pattern of the data tones."""
+    return unpack(symbols, bits_per_symbol).reshape(-1, bits_per_symbol)
+
+
+def adaptive_thresholds(levels, iterations=10):
+    """
+    Per-tone decision thresholds for pilot-relative tone levels.
+
+    Each tone starts from the midpoint of its weakest and strongest level
+    and moves to the midpoint of the means of its "on" and "off" clusters
+    (iterative two-cluster thresholding).
+
+    Parameters:
+    levels (numpy.ndarray): (n_symbols x N) data tone amplitudes divided by
+        the pilot amplitude of the same symbol.
+    iterations (int): Maximum number of refinements.
+
+    Returns:
+    numpy.ndarray: (N,) thresholds. A tone whose levels do not split into two
+    clusters (always on or always off) keeps DEFAULT_THRESHOLD.
+    """
+    thresholds = np.full(levels.shape[1], DEFAULT_THRESHOLD)
+    for i, column in enumerate(levels.T):
+        if not len(column):
+            continue
+        threshold = (column.min() + column.max()) / 2
+        for _ in range(iterations):
+            on = column > threshold
+            if on.all() or not on.any():
+                break
+            high, low = column[on].mean(), column[~on].mean()
+            if high < MIN_LEVEL or high < MIN_CONTRAST * max(low, 1e-12):
+                break
+            threshold = (high + low) / 2
+            thresholds[i] = threshold
+    return thresholds
+
+
+class MultiTone:
+    """
+    Parallel on/off-keyed tones plus a pilot.
+
+    Attributes:
+    bits_per_symbol (int): Bits (data tones) per symbol.
+    freqs (tuple): Pilot tone followed by the data tone of each bit, MSB first.
+        These are all the tones a receiver listens to.
+    symbol_duration (float): Seconds per symbol.
+    """
+
+    def __init__(self, bits_per_symbol, freqs=None, symbol_duration=1.0, band=(3300, 5900)):
+        if freqs is None:
+            freqs = np.linspace(band[0], band[1], bits_per_symbol + 1).round().astype(int).tolist()
+        freqs = tuple(freqs)
+        if len(freqs) != bits_per_symbol + 1:
+            raise ValueError(f"{bits_per_symbol} bits per symbol needs a pilot and {bits_per_symbol} data tones, "
+                             f"got {len(freqs)} tones.")
+        spacing = np.diff(sorted(freqs)).min()
+        if spacing < 2 * RESOLUTION:
+            raise ValueError(f"Tones {spacing:.0f} Hz apart cannot be separated (need {2 * RESOLUTION:.0f} Hz).")
+        self.bits_per_symbol = bits_per_symbol
+        self.freqs = freqs
+        self.symbol_duration = symbol_duration
+
+    @classmethod
+    def for_lab(cls, lab, bits_per_symbol, symbol_duration=1.0):
+        """Pilot and data tones evenly spaced over the lab's band (common.mfsk.BANDS)."""
+        return cls(bits_per_symbol, None, symbol_duration, BANDS[lab])
+
+    @property
+    def pilot(self):
+        return self.freqs[0]
+
+    @property
+    def tones(self):
+        return len(self.freqs)
+
+    def pack(self, bits):
+        return pack(bits, self.bits_per_symbol)
+
+    def unpack(self, symbols, nbits=None):
+        return unpack(symbols, self.bits_per_symbol, nbits)
+
+    def symbol_freqs(self, bits):
+        """Per-symbol tuples of the tones that sound (pilot first)."""
+        data = np.asarray(self.freqs[1:])
+        return [(self.pilot,) + tuple(int(freq) for freq in data[gates == 1])
+                for gates in tone_gates(self.pack(bits), self.bits_per_symbol)]
+
+    def modulate(self, bits, sample_rate, preamble=None, modulation='cpfsk', ramp=0.0):
+        """
+        Waveform for `bits`, every tone at 1 / (bits_per_symbol + 1) amplitude.
+
+        Parameters:
+        bits (str or BitVector): Bits to send, zero-padded to whole symbols.
+        sample_rate (int): Output sample rate.
+        preamble (tuple): Optional (frequencies, duration) lead-in tone.
+        modulation (str): 'cpfsk' keeps each tone's phase running across
+            symbols; 'fsk' restarts every tone at phase 0 in each symbol.
+        ramp (float): Raised-cosine rise/fall time in seconds of each tone
+            when it is switched on or off.
+
+        Returns:
+        numpy.ndarray: float32 samples for the whole frame.
+        """
+        symbol_len = int(sample_rate * self.symbol_duration)
+        gates = tone_gates(self.pack(bits), self.bits_per_symbol).astype(np.float64)
+        gates = np.hstack([np.ones((len(gates), 1)), gates])
+        n_samples = len(gates) * symbol_len
+
+        if modulation == 'fsk':
+            t = np.tile(np.arange(symbol_len), len(gates)) / sample_rate
+        else:
+            t = np.arange(n_samples) / sample_rate
+
+        ramp_len = int(sample_rate * ramp)
+        kernel = None
+        if ramp_len > 1 and n_samples > ramp_len:
+            kernel = np.hanning(ramp_len + 2)[1:-1]
+            kernel /= kernel.sum()
+
+        wave = np.zeros(n_samples)
+        for freq, gate in zip(self.freqs, gates.T):
+            envelope = np.repeat(gate, symbol_len)
+            if kernel is not None:
+                half = ramp_len // 2
+                padded = np.pad(envelope, (half, ramp_len - 1 - half), mode='edge')
+                envelope = np.convolve(padded, kernel, mode='valid')
+            wave += envelope * np.sin(2 * np.pi * freq * t)
+        wave /= self.tones
+
+        if preamble:
+            wave = np.concatenate([tone(tuple(preamble[0]), preamble[1], sample_rate), wave])
+        return wave.astype(np.float32)
+
+    def _levels(self, energies):
+        """Pilot-relative data tone levels and the mask of symbols with a pilot."""
+        energies = np.asarray(energies, dtype=np.float64).reshape(-1, self.tones)
+        pilot = energies[:, 0]
+        present = pilot >= PILOT_FRACTION * pilot.max() if len(pilot) else np.zeros(0, dtype=bool)
+        levels = energies[:, 1:] / np.maximum(pilot, 1e-12)[:, None]
+        return levels, present
+
+    def thresholds(self, energies):
+        """Per-data-tone thresholds (see adaptive_thresholds()) from the symbols with a pilot."""
+        levels, present = self._levels(energies)
+        if not present.any():
+            return np.full(self.bits_per_symbol, DEFAULT_THRESHOLD)
+        return adaptive_thresholds(levels[present])
+
+    def decide(self, energies):
+        """
+        Symbol values from (n_symbols x tones) amplitudes, pilot column first.
+
+        Returns:
+        numpy.ndarray: int64 symbols (0 where no pilot was heard).
+        """
+        levels, present = self._levels(energies)
+        bits = (levels > self.thresholds(energies)) & present[:, None]
+        weights = 1 << np.arange(self.bits_per_symbol - 1, -1, -1)
+        return bits.astype(np.int64) @ weights
+
+    def demodulate(self, samples, sample_rate, start=None, vector=BitVector, track=False):
+        """
+        Detect the symbols in a recording.
+
+        Returns:
+        tuple: (bits, energies, start): all detected bits as a `vector`
+        (BitVector or a subclass such as Frame), the (n_symbols x tones)
+        amplitudes (pilot first) and the first symbol's sample index. With
+        `track`, every symbol window is re-aligned by common.timing instead
+        of following fixed steps from `start`.
+        """
+        if track:
+            energies, starts = tracked_energies(samples, self.freqs, sample_rate, self.symbol_duration, start)
+            start = int(starts[0]) if len(starts) else start
+        else:
+            symbol_len = int(sample_rate * self.symbol_duration)
+            if start is None:
+                start = find_onset(samples, self.freqs, sample_rate)
+            energies = window_energies(samples, self.freqs, sample_rate, symbol_len, start)
+        symbols = self.decide(energies)
+        bits = vector.from_symbols(symbols.tolist(), self.bits_per_symbol)
+        return bits, energies, start
+
+    def reliabilities(self, energies):
+        """
+        Per-bit reliabilities for soft-decision decoding (common.chase): the
+        distance of each pilot-relative tone level from its threshold, MSB
+        first; 0 for symbols without a pilot.
+        """
+        levels, present = self._levels(energies)
+        margin = np.abs(levels - self.thresholds(energies)) * present[:, None]
+        return margin.reshape(-1)
@@ -0,0 +1,164 @@
+"""
+Search for CRC generators that can correct every 1- and 2-bit error.
+
+A generator can correct all error patterns of weight <= 2 in an n-bit codeword
+iff every such pattern has a distinct, non-zero syndrome. For each candidate
+generator of a given degree we find the longest codeword length for which that
+holds, spreading the candidates over a process pool. The best generator per
+degree is cached in generators.json next to this file, and pick_generator()
+lets senders/receivers choose the lowest-overhead generator for a frame.
+
+Usage:
+    python -m common.polysearch --min-degree 4 --max-degree 12 --max-length 128
+    python -m common.polysearch --length 45
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from common.crc import get_engine
+
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'generators.json')
+
+# Generator used by the Lab02 scripts before generators were picked by length
+DEFAULT_GENERATOR = '1011101011101'
+
+
+def max_correctable_length(generator, limit, max_errors=2):
+    """
+    Return the longest codeword length (<= limit) for which all error patterns
+    of weight <= max_errors have distinct, non-zero syndromes.
+
+    Positions are added one at a time from the end of the codeword, so the
+    search stops at the first collision instead of building the full table.
+    """
+    power = get_engine(generator).power
+    singles = []
+    seen = {0}
+
+    for k in range(limit):
+        syn = power(k)
+        if syn in seen:
+            return k
+        new = [syn]
+        if max_errors == 2:
+            for other in singles:
+                pair = syn ^ other
+                if pair in seen:
+                    return k
+                new.append(pair)
+        seen.update(new)
+        singles.append(syn)
+    return limit
+
+
+def candidates(degree):
+    """
+    Yield every generator of the given degree (>= 2) with a non-zero constant term.
+    """
+    for middle in range(1 << (degree - 1)):
+        yield '1' + format(middle, f'0{degree - 1}b') + '1'
+
+
+def _evaluate(args):
+    generator, limit, max_errors = args
+    return generator, max_correctable_length(generator, limit, max_errors)
+
+
+def search(min_degree, max_degree, limit, max_errors=2, workers=None):
+    """
+    Find the best generator of each degree in [min_degree, max_degree].
+
+    Returns:
+    dict: degree -> {'generator': str, 'max_length': int}, where max_length is
+    the longest correctable codeword length (capped at `limit`). Ties go to the
+    numerically smallest generator.
+    """
+    best = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for degree in range(min_degree, max_degree + 1):
+            jobs = [(g, limit, max_errors) for g in candidates(degree)]
+            chunksize = max(1, len(jobs) // (4 * (workers or os.cpu_count() or 1)))
+            for generator, length in pool.map(_evaluate, jobs, chunksize=chunksize):
+                if degree not in best or length > best[degree]['max_length']:
+                    best[degree] = {'generator': generator, 'max_length': length}
+    return best
+
+
+def save_cache(best, limit, max_errors, path=CACHE_FILE):
+    """Write search() results to the generator cache file."""
+    data = {
+        'max_errors': max_errors,
+        'limit': limit,
+        'generators': {str(degree): entry for degree, entry in sorted(best.items())},
+    }
+    with open(path, 'w') as file:
+        json.dump(data, file, indent=4)
+        file.write('\n')
+
+
+@lru_cache(maxsize=None)
+def load_cache(path=CACHE_FILE):
+    """
+    Read the generator cache as a list of (degree, generator, max_length),
+    lowest degree first. Returns [] if no cache has been written yet.
+    """
+    try:
+        with open(path) as file:
+            data = json.load(file)
+    except FileNotFoundError:
+        return []
+    entries = [(int(d), e['generator'], e['max_length']) for d, e in data['generators'].items()]
+    return sorted(entries)
+
+
+def pick_generator(codeword_length, default=DEFAULT_GENERATOR):
+    """
+    Return the lowest-degree cached generator that corrects all 1/2-bit errors
+    in a codeword of `codeword_length` bits (used by the receiver, which only
+    knows the codeword length from the frame header).
+    """
+    for degree, generator, max_length in load_cache():
+        if max_length >= codeword_length:
+            return generator
+    return default
+
+
+def pick_generator_for_data(data_length, default=DEFAULT_GENERATOR):
+    """
+    Return the lowest-degree cached generator for a `data_length`-bit dataword
+    (used by the sender). Always agrees with pick_generator() on the resulting
+    codeword length.
+    """
+    for degree, generator, max_length in load_cache():
+        if max_length >= data_length + degree:
+            return generator
+    return default
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search CRC generators for guaranteed 1/2-bit error correction")
+    parser.add_argument("--min-degree", type=int, default=4, help="Smallest generator degree to try")
+    parser.add_argument("--max-degree", type=int, default=12, help="Largest generator degree to try")
+    parser.add_argument("--max-length", type=int, default=128, help="Longest codeword length to test")
+    parser.add_argument("--max-errors", type=int, default=2, choices=[1, 2], help="Number of bit errors to correct")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--length", type=int, default=None, help="Only report the generator for this codeword length")
+    args = parser.parse_args()
+
+    if args.length is not None:
+        print(f"Generator for {args.length}-bit codewords: {pick_generator(args.length, default=None)}")
+    else:
+        start = time.time()
+        best = search(args.min_degree, args.max_degree, args.max_length, args.max_errors, args.workers)
+        save_cache(best, args.max_length, args.max_errors)
+        load_cache.cache_clear()
+
+        for degree, entry in sorted(best.items()):
+            print(f"Degree {degree}: \t{entry['generator']} \tcorrects up to {entry['max_length']} bits")
+        print(f"Results written to {CACHE_FILE}")
+        print(f"Elapsed Time: {time.time() - start:.2f} seconds")
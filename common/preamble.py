@@ -0,0 +1,151 @@
+"""
+Frame-start detection by matching the known preamble.
+
+A preamble is described as a list of (frequency, duration) segments, e.g. the
+Lab03 '001011' preamble is three 1 s symbols at 3300, 4700 and 5900 Hz and
+the Lab02 lead-in is one 2 s tone at 4000 Hz. For every tone, the amplitude
+over a sliding window of the segment length is computed for *every* sample
+offset at once from a cumulative sum of the mixed-down signal (a sliding DFT
+bin), which is O(N) per tone. As in common.demod the detection is
+non-coherent: amplitudes are measured over sub-blocks of about
+1 / RESOLUTION seconds and averaged across the segment, so a few Hz of
+clock offset does not cancel a long segment. The matched-filter score at offset n adds, for
+each segment, how much its tone stands out from the strongest other tone at
+n plus the segment's offset. The score peaks where the preamble starts, since
+the overlap with each segment (and so its amplitude) falls off linearly on
+both sides. The detector does not depend on the carrier phase, so it also
+works with the cached-tone FSK senders, whose tones restart at phase 0.
+
+step_onset() is the cumulative-sum form of the old receivers'
+moving-average start search, kept for the Butterworth demodulators.
+"""
+
+import numpy as np
+from scipy.signal import find_peaks
+
+from common.demod import RESOLUTION, sub_blocks
+
+
+def preamble_segments(bits, freqs, duration, bits_per_symbol):
+    """
+    Return the (frequency, duration) segments of a preamble bit string sent
+    with one tone per `bits_per_symbol` bits (freqs[s] for symbol value s).
+    A trailing partial symbol shares its tone with the bits that follow the
+    preamble, so it is left out.
+    """
+    whole = len(bits) - len(bits) % bits_per_symbol
+    return [
+        (freqs[int(bits[i:i + bits_per_symbol], 2)], duration)
+        for i in range(0, whole, bits_per_symbol)
+    ]
+
+
+def sliding_amplitude(samples, freq, sample_rate, window, resolution=RESOLUTION):
+    """
+    Amplitude of `freq` over every `window`-sample window of `samples`: the
+    mean coherent amplitude of all sub-blocks inside the window.
+
+    Returns:
+    numpy.ndarray: len(samples) - window + 1 amplitudes; entry n covers
+    samples[n:n + window].
+    """
+    samples = np.asarray(samples, dtype=np.float64)
+    _, sub_len = sub_blocks(window, sample_rate, resolution)
+    phase = np.exp(-2j * np.pi * freq / sample_rate * np.arange(len(samples)))
+    sums = np.concatenate([[0], np.cumsum(samples * phase)])
+    coherent = np.abs(sums[sub_len:] - sums[:-sub_len]) * (2.0 / sub_len)
+
+    span = window - sub_len + 1
+    if span == 1:
+        return coherent
+    totals = np.concatenate([[0], np.cumsum(coherent)])
+    return (totals[span:] - totals[:-span]) / span
+
+
+def preamble_score(samples, segments, sample_rate, others=()):
+    """
+    Matched-filter score for a preamble starting at every sample offset.
+
+    Parameters:
+    samples (array-like): Audio samples.
+    segments (list): (frequency, duration) pairs of the preamble.
+    sample_rate (int): Sample rate of `samples`.
+    others (sequence): Further tones in use (e.g. the data tones) that
+        should *not* be present during each segment.
+
+    Returns:
+    numpy.ndarray: Score per start offset (length N - preamble length + 1),
+    in units of tone amplitude.
+    """
+    return _score(samples, segments, sample_rate, others)[0]
+
+
+def _score(samples, segments, sample_rate, others):
+    """Return (score, level): the matched-filter score and the total tone level."""
+    lengths = [int(sample_rate * duration) for _, duration in segments]
+    n_offsets = len(samples) - sum(lengths) + 1
+    if n_offsets <= 0:
+        return np.zeros(0), np.zeros(0)
+
+    tones = sorted(set(freq for freq, _ in segments) | set(others))
+    amplitudes = {}
+    score = np.zeros(n_offsets)
+    level = np.zeros(n_offsets)
+    offset = 0
+    for (freq, _), length in zip(segments, lengths):
+        for tone in tones:
+            if (tone, length) not in amplitudes:
+                amplitudes[tone, length] = sliding_amplitude(samples, tone, sample_rate, length)
+
+        window = slice(offset, offset + n_offsets)
+        target = amplitudes[freq, length][window]
+        rivals = [amplitudes[tone, length][window] for tone in tones if tone != freq]
+        rival = np.max(rivals, axis=0) if rivals else 0
+        score += target - rival
+        level += target + rival
+        offset += length
+    return score / len(segments), level / len(segments)
+
+
+def find_preambles(samples, segments, sample_rate, others=(), threshold=0.5, min_contrast=0.5):
+    """
+    Find the start of every preamble in a recording.
+
+    A start is reported at each local maximum of preamble_score() that is at
+    least one preamble length from a stronger one, reaches `threshold` times
+    the best score, and where the preamble tones dominate the other tones:
+    score / (preamble tone + strongest other tone level) >= `min_contrast`. The last
+    test is independent of the signal level and rejects pure noise (whose
+    contrast is near 0; a clean preamble gives close to 1).
+
+    Returns:
+    list: Sample indices where a preamble starts, in order.
+    """
+    score, level = _score(samples, segments, sample_rate, others)
+    if not len(score) or score.max() <= 0:
+        return []
+
+    total = sum(int(sample_rate * duration) for _, duration in segments)
+    peaks, _ = find_peaks(score, height=threshold * score.max(), distance=max(total, 1))
+    contrast = score[peaks] / np.maximum(level[peaks], np.finfo(float).tiny)
+    return peaks[contrast >= min_contrast].tolist()
+
+
+def step_onset(signal, threshold, window=100, begin=1000, norm=None):
+    """
+    First index i >= begin where the mean of signal[i:i+window] differs from
+    the mean of signal[i-window:i] by more than `threshold`, or 0.
+
+    Same result as the receivers' original sample-by-sample loop, computed
+    from one cumulative sum. `norm` is the divisor of each window sum
+    (default `window`).
+    """
+    norm = norm or window
+    sums = np.concatenate([[0], np.cumsum(np.asarray(signal, dtype=np.float64))])
+    idx = np.arange(begin, len(signal) - window)
+    if not len(idx):
+        return 0
+    after = sums[idx + window] - sums[idx]
+    before = sums[idx] - sums[idx - window]
+    hits = np.flatnonzero(np.abs(after - before) / norm > threshold)
+    return int(idx[hits[0]]) if len(hits) else 0
@@ -0,0 +1,189 @@
+"""
+Syndrome lookup tables for CRC-based error correction.
+
+Instead of flipping every (i, j) pair and re-running the CRC, we precompute the
+syndrome of every 1- and 2-bit error pattern for a given (generator, codeword
+length) once. Correcting a frame is then one remainder computation and one dict
+lookup.
+
+Syndromes are the augmented remainders produced by common.crc, so the syndrome
+of a received word is simply ``get_engine(generator).remainder(word)``.
+"""
+
+import os
+import pickle
+from functools import lru_cache
+
+from common.crc import get_engine
+from common.frame import BitVector
+
+
+def position_syndromes(generator, length):
+    """
+    Return the syndrome of a single-bit error at each position of a codeword.
+
+    Parameters:
+    generator (str): Generator polynomial as a '0'/'1' string.
+    length (int): Codeword length in bits.
+
+    Returns:
+    list: syndromes[i] is the remainder of a codeword that is all zeros except
+    for bit i (bit 0 is the first, most significant, bit).
+    """
+    power = get_engine(generator).power
+    # Bit i is followed by (length - 1 - i) bits, so its syndrome is x^(length-1-i+w) mod g
+    syndromes = [power(length - 1 - i) for i in range(length)]
+    return syndromes
+
+
+class SyndromeTable:
+    """
+    Syndrome -> error-position index for one (generator, length) pair.
+
+    Attributes:
+    table (dict): syndrome -> tuple of error positions, for uniquely decodable
+        syndromes only.
+    ambiguous (dict): syndrome -> list of colliding position tuples. A pattern
+        whose syndrome is 0 is listed under 0, since it cannot be told apart
+        from an error-free codeword.
+    """
+
+    def __init__(self, generator, length, max_errors=2, table=None, ambiguous=None):
+        self.generator = generator
+        self.length = length
+        self.max_errors = max_errors
+
+        if table is None:
+            table, ambiguous = self._build()
+        self.table = table
+        self.ambiguous = ambiguous
+
+    def _build(self):
+        if self.max_errors not in (1, 2):
+            raise ValueError("Syndrome tables support up to 2 bit errors.")
+
+        syndromes = position_syndromes(self.generator, self.length)
+        table = {}
+        ambiguous = {}
+
+        def add(syn, positions):
+            if syn == 0:
+                ambiguous.setdefault(0, [()]).append(positions)
+            elif syn in ambiguous:
+                ambiguous[syn].append(positions)
+            elif syn in table:
+                ambiguous[syn] = [table.pop(syn), positions]
+            else:
+                table[syn] = positions
+
+        for i, syn in enumerate(syndromes):
+            add(syn, (i,))
+        if self.max_errors == 2:
+            for i in range(self.length):
+                syn_i = syndromes[i]
+                for j in range(i + 1, self.length):
+                    add(syn_i ^ syndromes[j], (i, j))
+
+        return table, ambiguous
+
+    def lookup(self, syndrome):
+        """
+        Look up the error pattern for a syndrome.
+
+        Returns:
+        tuple: (positions, candidates) where positions is the tuple of bit
+        positions to flip (None if not uniquely decodable) and candidates is
+        the list of colliding patterns for an ambiguous syndrome (else []).
+        """
+        if syndrome == 0:
+            return (), []
+        if syndrome in self.table:
+            return self.table[syndrome], []
+        return None, self.ambiguous.get(syndrome, [])
+
+    def correct(self, codeword):
+        """
+        Correct up to `max_errors` bit errors in `codeword` ('0'/'1' string or
+        BitVector; the corrected codeword has the same type).
+
+        Returns:
+        dict: 'status' is one of 'ok', 'corrected', 'ambiguous' or
+        'uncorrectable'; 'codeword' is the corrected codeword (None unless the
+        status is 'ok' or 'corrected'); 'positions' are the flipped positions;
+        'candidates' lists the colliding patterns for an ambiguous syndrome.
+        """
+        if len(codeword) != self.length:
+            raise ValueError(f"Expected a {self.length}-bit codeword, got {len(codeword)} bits.")
+
+        syndrome = get_engine(self.generator).remainder(codeword)
+        positions, candidates = self.lookup(syndrome)
+
+        if positions is None:
+            return {
+                'status': 'ambiguous' if candidates else 'uncorrectable',
+                'codeword': None,
+                'positions': [],
+                'candidates': candidates,
+            }
+        if not positions:
+            return {'status': 'ok', 'codeword': codeword, 'positions': [], 'candidates': []}
+
+        if isinstance(codeword, BitVector):
+            fixed = codeword.copy()
+            for pos in positions:
+                fixed.flip(pos)
+        else:
+            bits = list(codeword)
+            for pos in positions:
+                bits[pos] = '1' if bits[pos] == '0' else '0'
+            fixed = ''.join(bits)
+        return {
+            'status': 'corrected',
+            'codeword': fixed,
+            'positions': list(positions),
+            'candidates': [],
+        }
+
+    def save(self, path):
+        """Write the table to `path` so later runs can skip the build."""
+        with open(path, 'wb') as file:
+            pickle.dump((self.generator, self.length, self.max_errors, self.table, self.ambiguous), file)
+
+    @classmethod
+    def load(cls, path):
+        """Read a table written by save()."""
+        with open(path, 'rb') as file:
+            generator, length, max_errors, table, ambiguous = pickle.load(file)
+        return cls(generator, length, max_errors, table=table, ambiguous=ambiguous)
+
+
+def _cache_path(cache_dir, generator, length, max_errors):
+    return os.path.join(cache_dir, f"syndromes_{generator}_{length}_{max_errors}.pkl")
+
+
+@lru_cache(maxsize=32)
+def get_table(generator, length, max_errors=2, cache_dir=None):
+    """
+    Return the SyndromeTable for (generator, length), building it at most once.
+
+    Tables are kept in an in-process LRU cache. If `cache_dir` is given they
+    are also loaded from / saved to that directory.
+    """
+    if cache_dir is not None:
+        path = _cache_path(cache_dir, generator, length, max_errors)
+        if os.path.exists(path):
+            return SyndromeTable.load(path)
+
+    table = SyndromeTable(generator, length, max_errors)
+
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        table.save(path)
+    return table
+
+
+def correct(codeword, generator, max_errors=2, cache_dir=None):
+    """
+    Correct up to `max_errors` bit errors in `codeword`. See SyndromeTable.correct().
+    """
+    return get_table(generator, len(codeword), max_errors, cache_dir).correct(codeword)
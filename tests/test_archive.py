@@ -0,0 +1,55 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.archive import CaptureArchive
+
+
+def test_append_segment_window_round_trip(tmp_path):
+    path = str(tmp_path / 'captures')
+    rng = np.random.default_rng(1)
+    first = rng.normal(size=16000).astype(np.float32)
+    second = rng.normal(size=5000).astype(np.float32)
+
+    archive = CaptureArchive(path)
+    assert len(archive) == 0
+    assert archive.append(first, 16000, slot=0, node=1, timestamp=100.0) == 0
+    # A read-only view (e.g. of the capture buffer) is written as is
+    view = second[::1]
+    view.flags.writeable = False
+    assert archive.append(view, 20000, slot=1, node=2) == 1
+
+    np.testing.assert_array_equal(archive.segment(0), first)
+    np.testing.assert_array_equal(archive.segment(-1), second)
+    np.testing.assert_array_equal(archive.window(0, 0.25, 0.5), first[4000:8000])
+    np.testing.assert_array_equal(archive.window(1, 0.1), second[2000:])
+    assert not archive.segment(0).flags.writeable
+    assert archive.find(node=2) == [1] and archive.find(slot=0) == [0]
+
+    # Reopening the archive sees both segments, and appends after them
+    reopened = CaptureArchive(path)
+    assert len(reopened) == 2
+    record = reopened.index[0]
+    assert (record['length'], record['slot'], record['node'], record['sample_rate']) == (16000, 0, 1, 16000)
+    assert record['timestamp'] == 100.0
+    np.testing.assert_array_equal(reopened.segment(1), second)
+    third = np.arange(300, dtype=np.float32)
+    assert reopened.append(third, 16000, slot=2) == 2
+    np.testing.assert_array_equal(reopened.segment(2), third)
+    np.testing.assert_array_equal(reopened.segment(0), first)
+    # The first handle's (stale) memory map is grown to read the new segment
+    np.testing.assert_array_equal(archive.segment(2), third)
+
+
+def test_unindexed_samples_are_skipped(tmp_path):
+    path = str(tmp_path / 'captures')
+    archive = CaptureArchive(path)
+    archive.append(np.ones(100, dtype=np.float32), 16000)
+    # Samples of an append interrupted before its index record
+    with open(path + '.f32', 'ab') as data:
+        np.full(50, 7, dtype=np.float32).tofile(data)
+    assert archive.append(np.zeros(20, dtype=np.float32), 16000) == 1
+    assert len(archive) == 2
+    np.testing.assert_array_equal(archive.segment(1), np.zeros(20))
@@ -0,0 +1,49 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.bch import CODEC_BCH_T, CODEC_CRC, MAX_CODEWORD_BITS, codec_decode, codec_encode
+from common.polysearch import pick_generator_for_data
+
+
+def test_round_trip_corrects_t_errors():
+    for codec, t in CODEC_BCH_T.items():
+        codeword = codec_encode('1011001110001011', codec)
+        corrupted = list(codeword)
+        for pos in range(t):
+            corrupted[pos * 3] = '1' if corrupted[pos * 3] == '0' else '0'
+        result = codec_decode(''.join(corrupted), codec)
+        assert result['status'] == 'corrected'
+        assert result['codeword'] == codeword
+
+
+def test_off_grid_length_is_uncorrectable():
+    # No BCH code with t = 2 has 16- or 33-bit codewords: a noisy length
+    # field must not raise
+    for length in (0, 1, 9, 16, 17, 32, 33):
+        result = codec_decode('1' * length, 1)
+        assert result['status'] == 'uncorrectable'
+        assert result['codeword'] is None
+
+
+def test_codeword_must_fit_the_length_field():
+    for codec in (CODEC_CRC, *CODEC_BCH_T):
+        fits = []
+        for data_length in range(1, MAX_CODEWORD_BITS + 1):
+            try:
+                fits.append(len(codec_encode('1' * data_length, codec, pick_generator_for_data(data_length))))
+            except ValueError:
+                break
+        # Every longer dataword is refused, never framed with a wrapped length
+        assert fits and max(fits) <= MAX_CODEWORD_BITS
+        for data_length in range(len(fits) + 1, MAX_CODEWORD_BITS + 1):
+            with pytest.raises(ValueError):
+                codec_encode('1' * data_length, codec, pick_generator_for_data(data_length))
+
+    # A degree-12 CRC on 51 data bits just fits; 52 data bits give 64 (CRC) or 66 (BCH, t = 2) bits
+    assert len(codec_encode('1' * 51, CODEC_CRC, pick_generator_for_data(51))) == MAX_CODEWORD_BITS
+    for codec in (CODEC_CRC, 1):
+        with pytest.raises(ValueError):
+            codec_encode('1' * 52, codec, pick_generator_for_data(52))
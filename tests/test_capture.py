@@ -0,0 +1,71 @@
+import os
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.audio import paInputOverflow
+from common.capture import CallbackCapture, RingBuffer
+
+
+def test_window_across_the_wrap_is_the_last_samples_written():
+    capacity = 1000
+    ring = RingBuffer(capacity)
+    stream = np.arange(5321, dtype=np.float32)
+    position = 0
+    rng = np.random.default_rng(1)
+    while position < len(stream):
+        # Chunks of varying size, so writes start and end at every offset of the buffer
+        chunk = stream[position:position + rng.integers(1, 400)]
+        ring.write(chunk.tobytes() if position % 2 else chunk)
+        position += len(chunk)
+        assert ring.written == position
+
+        window = ring.window(ring.oldest)
+        assert window.base is not None and not window.flags.writeable
+        # Contiguous view of the last `capacity` samples, wherever the wrap falls
+        assert window.flags.c_contiguous
+        np.testing.assert_array_equal(window, stream[max(position - capacity, 0):position])
+        np.testing.assert_array_equal(ring.latest(300), stream[max(position - 300, 0):position])
+
+    start = ring.written - capacity + 123
+    np.testing.assert_array_equal(ring.window(start, start + 500), stream[start:start + 500])
+
+
+def test_oversized_write_keeps_the_last_capacity_samples():
+    ring = RingBuffer(100)
+    ring.write(np.arange(30, dtype=np.float32))
+    ring.write(np.arange(30, 280, dtype=np.float32))
+    assert (ring.written, ring.oldest) == (280, 180)
+    np.testing.assert_array_equal(ring.window(180), np.arange(180, 280))
+
+
+def test_window_outside_the_buffer_is_refused():
+    ring = RingBuffer(100)
+    ring.write(np.zeros(250, dtype=np.float32))
+    for start, stop in ((149, 200), (200, 251), (220, 210)):
+        with pytest.raises(ValueError):
+            ring.window(start, stop)
+
+
+def test_callback_counters_add_up_across_threads():
+    ring = RingBuffer(1 << 16)
+    recorder = CallbackCapture(None, 16000, 64, ring, queue_size=8)
+    chunk = np.zeros(64, dtype=np.float32).tobytes()
+
+    def callbacks():
+        for n in range(2000):
+            recorder._callback(chunk, 64, None, paInputOverflow if n % 10 == 0 else 0)
+
+    threads = [threading.Thread(target=callbacks) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = recorder.stats()
+    # Nothing is drained: the first queue_size buffers are queued, every other one is dropped
+    assert stats['captured'] == stats['queue_depth'] == stats['max_queue_depth'] == 8
+    assert stats['captured'] + stats['dropped'] == 8000
+    assert stats['input_overflows'] == 800
@@ -0,0 +1,53 @@
+import os
+import random
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.bch import codec_decode, codec_encode
+from common.chase import chase_decode
+from common.syndrome import correct
+
+
+def _corrupt(codeword, positions):
+    bits = list(codeword)
+    for pos in positions:
+        bits[pos] = '1' if bits[pos] == '0' else '0'
+    return ''.join(bits)
+
+
+def test_flat_reliabilities_match_plain_decoding():
+    # Beyond the radius, Chase must not accept far-away candidates
+    rng = random.Random(1)
+    for _ in range(100):
+        codeword = codec_encode(''.join(rng.choice('01') for _ in range(20)), 1)
+        received = _corrupt(codeword, rng.sample(range(len(codeword)), 3))
+        decoder = lambda word: codec_decode(word, 1)
+        plain = decoder(received)
+        chase = chase_decode(received, np.ones(len(codeword)), decoder, 2)
+        assert chase['status'] == plain['status']
+        assert str(chase['codeword']) == str(plain['codeword'])
+
+
+def test_weak_errors_beyond_radius_need_max_cost():
+    rng = random.Random(2)
+    codeword = codec_encode(''.join(rng.choice('01') for _ in range(20)), 1)
+    positions = rng.sample(range(len(codeword)), 4)
+    received = _corrupt(codeword, positions)
+    reliability = np.ones(len(codeword))
+    reliability[positions] = 0.1
+    decoder = lambda word: codec_decode(word, 1)
+
+    result = chase_decode(received, reliability, decoder, 2, max_cost=0.5)
+    assert result['status'] == 'corrected'
+    assert result['codeword'] == codeword
+    assert chase_decode(received, reliability, decoder, 2)['codeword'] != codeword
+
+
+def test_ambiguous_syndrome_stays_ambiguous():
+    # A Hamming generator cannot tell 2-bit patterns apart
+    decoder = lambda word: correct(word, '1011')
+    received = '110100101101'
+    assert decoder(received)['status'] == 'ambiguous'
+    assert chase_decode(received, np.ones(12), decoder, 2)['status'] == 'ambiguous'
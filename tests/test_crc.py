@@ -0,0 +1,134 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.crc import StreamingCRC, check, check_many, combine, encode, encode_many, get_engine
+from common.frame import BitVector
+
+# Width 1 (parity), the labs' generators and the degree-14 polysearch generator
+GENERATORS = ['11', '101', '101110101111', '1011101011101', '100000011100001']
+
+
+def legacy_mod2div(dividend, divisor):
+    # mod2div() of the original Lab02/sender-combined.py
+    def xor(a, b):
+        return ''.join('0' if a[i] == b[i] else '1' for i in range(1, len(b)))
+
+    pick = len(divisor)
+    tmp = dividend[0:pick]
+    while pick < len(dividend):
+        if tmp[0] == '1':
+            tmp = xor(divisor, tmp) + dividend[pick]
+        else:
+            tmp = xor('0' * pick, tmp) + dividend[pick]
+        pick += 1
+    if tmp[0] == '1':
+        tmp = xor(divisor, tmp)
+    else:
+        tmp = xor('0' * pick, tmp)
+    return tmp
+
+
+def legacy_crc(dataword, generator):
+    # CRC() of the original Lab02/receiver-combined.py
+    dividend = int(dataword, 2) << (len(generator) - 1)
+    poly = int(generator, 2)
+    while dividend.bit_length() >= len(generator):
+        dividend ^= poly << (dividend.bit_length() - len(generator))
+    return dividend
+
+
+def random_words(rng, count=200, max_length=80):
+    return [''.join(rng.choice('01') for _ in range(rng.randint(1, max_length))) for _ in range(count)]
+
+
+def test_encode_matches_legacy_mod2div():
+    rng = random.Random(1)
+    for generator in GENERATORS:
+        width = len(generator) - 1
+        for dataword in random_words(rng):
+            expected = dataword + legacy_mod2div(dataword + '0' * width, generator)
+            assert encode(dataword, generator) == expected
+            assert str(encode(BitVector.of(dataword), generator)) == expected
+
+
+def test_remainder_matches_legacy_crc():
+    rng = random.Random(2)
+    for generator in GENERATORS:
+        engine = get_engine(generator)
+        for word in random_words(rng):
+            assert engine.remainder(word) == legacy_crc(word, generator)
+            assert engine.remainder(BitVector.of(word)) == legacy_crc(word, generator)
+
+
+def test_check_accepts_codewords_and_rejects_single_errors():
+    rng = random.Random(3)
+    for generator in GENERATORS:
+        for dataword in random_words(rng, count=50):
+            codeword = encode(dataword, generator)
+            assert check(codeword, generator)
+            pos = rng.randrange(len(codeword))
+            corrupted = codeword[:pos] + ('1' if codeword[pos] == '0' else '0') + codeword[pos + 1:]
+            # Every generator here has a non-zero constant term: single errors are always detected
+            assert not check(corrupted, generator)
+            assert check(corrupted, generator) == (legacy_crc(corrupted, generator) == 0)
+
+
+def test_many_matches_one_at_a_time():
+    rng = random.Random(4)
+    for generator in GENERATORS:
+        datawords = random_words(rng, count=100)
+        codewords = encode_many(datawords, generator)
+        assert codewords == [encode(dataword, generator) for dataword in datawords]
+        noisy = [word if rng.random() < 0.5 else word[:-1] + ('1' if word[-1] == '0' else '0') for word in codewords]
+        assert check_many(noisy, generator) == [legacy_crc(word, generator) == 0 for word in noisy]
+
+
+def test_streaming_update_matches_whole_message():
+    rng = random.Random(5)
+    for generator in GENERATORS:
+        engine = get_engine(generator)
+        for message in random_words(rng, count=50, max_length=150):
+            crc = StreamingCRC(generator)
+            cut = 0
+            while cut < len(message):
+                step = rng.randint(1, 13)
+                piece = message[cut:cut + step]
+                # Strings, BitVectors and ints (as demodulated symbols) may be mixed
+                kind = rng.randrange(3)
+                if kind == 0:
+                    crc.update(piece)
+                elif kind == 1:
+                    crc.update(BitVector.of(piece))
+                else:
+                    crc.update_int(int(piece, 2), len(piece))
+                cut += step
+                assert crc.value == engine.remainder(message[:cut])
+            assert crc.length == len(message)
+            assert crc.valid() == check(message, generator)
+
+
+def test_streaming_flip_matches_whole_message():
+    rng = random.Random(6)
+    for generator in GENERATORS:
+        engine = get_engine(generator)
+        codeword = encode(random_words(rng, count=1, max_length=60)[0], generator)
+        crc = StreamingCRC(generator, codeword)
+        assert crc.valid()
+        for pos in range(len(codeword)):
+            flipped = codeword[:pos] + ('1' if codeword[pos] == '0' else '0') + codeword[pos + 1:]
+            trial = crc.copy()
+            assert trial.flip(pos) == engine.remainder(flipped)
+            # Flipping back restores the codeword, and the original is untouched
+            assert trial.flip(pos) == 0
+            assert crc.valid()
+
+
+def test_combine_matches_whole_message():
+    rng = random.Random(7)
+    for generator in GENERATORS:
+        engine = get_engine(generator)
+        for first, second in zip(random_words(rng, count=50), random_words(rng, count=50, max_length=300)):
+            joined = combine(engine.remainder(first), engine.remainder(second), len(second), generator)
+            assert joined == engine.remainder(first + second)
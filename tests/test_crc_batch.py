@@ -0,0 +1,62 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.crc import encode, get_engine
+from common.crc_batch import STATUS_NAMES, correct_batch, frames_from_strings, frames_to_strings, syndromes
+from common.polysearch import DEFAULT_GENERATOR
+from common.syndrome import correct
+
+DEGREE_14 = '100000011100001'
+
+
+def noisy_frames(generator, length, count, seed):
+    # Codewords with 0 to 3 random bit errors each
+    rng = np.random.default_rng(seed)
+    width = len(generator) - 1
+    frames = []
+    for _ in range(count):
+        data = ''.join(rng.choice(['0', '1'], length - width))
+        bits = list(encode(data, generator))
+        for pos in rng.choice(length, rng.integers(0, 4), replace=False):
+            bits[pos] = '1' if bits[pos] == '0' else '0'
+        frames.append(''.join(bits))
+    return frames
+
+
+def assert_matches_scalar(frames, generator, packed):
+    length = len(frames[0])
+    matrix = frames_from_strings(frames)
+    if packed:
+        result = correct_batch(np.packbits(matrix, axis=1), generator, packed=True, length=length)
+    else:
+        result = correct_batch(matrix, generator)
+    corrected = frames_to_strings(result['frames'])
+    for row, frame in enumerate(frames):
+        expected = correct(frame, generator)
+        assert STATUS_NAMES[result['status'][row]] == expected['status']
+        if expected['codeword'] is not None:
+            assert corrected[row] == expected['codeword']
+            assert [pos for pos in result['positions'][row] if pos >= 0] == expected['positions']
+        else:
+            assert corrected[row] == frame
+
+
+def test_batch_matches_scalar_correct():
+    # 40 bits is within the default generator's guaranteed length, 80 is past it
+    for length in (40, 80):
+        frames = noisy_frames(DEFAULT_GENERATOR, length, 300, seed=length)
+        assert_matches_scalar(frames, DEFAULT_GENERATOR, packed=False)
+        assert_matches_scalar(frames, DEFAULT_GENERATOR, packed=True)
+
+
+def test_frames_longer_than_255_bits():
+    # Column sums above 255 must not wrap before the mod-2 reduction
+    frames = noisy_frames(DEGREE_14, 300, 100, seed=3)
+    frames.append('1' * 300)
+    engine = get_engine(DEGREE_14)
+    assert syndromes(frames_from_strings(frames), DEGREE_14).tolist() == [engine.remainder(frame) for frame in frames]
+    assert_matches_scalar(frames, DEGREE_14, packed=False)
+    assert_matches_scalar(frames, DEGREE_14, packed=True)
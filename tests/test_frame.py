@@ -0,0 +1,85 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.frame import BitVector, Frame
+
+
+def test_int_and_string_round_trip():
+    for nbits in (0, 1, 7, 8, 9, 16, 33):
+        mask = (1 << nbits) - 1
+        for value in (0, 1 & mask, mask, 0x5A5A5A5A5 & mask):
+            vector = BitVector.from_int(value, nbits)
+            assert len(vector) == nbits
+            assert vector.to_int() == value
+            assert vector.to_string() == (format(value, f'0{nbits}b') if nbits else '')
+            assert BitVector.from_string(vector.to_string()) == vector
+    # Only the low nbits bits are kept
+    assert BitVector.from_int(0b10110, 3).to_string() == '110'
+
+
+def test_flip_and_item_access():
+    vector = BitVector.from_string('1011001110')
+    vector.flip(0)
+    vector.flip(-1)
+    assert vector == '0011001111'
+    vector[1] = 1
+    vector[2] = '0'
+    assert vector == '0101001111'
+    assert [vector[i] for i in range(len(vector))] == [0, 1, 0, 1, 0, 0, 1, 1, 1, 1]
+    with pytest.raises(IndexError):
+        vector.flip(10)
+
+
+def test_slices_are_views():
+    vector = BitVector.from_string('110010111010011101')
+    view = vector[3:14]
+    assert view == '01011101001'
+    assert view[2:7] == '01110'
+    # Flipping a bit in a view (at an odd offset, across a byte boundary) flips the parent
+    view.flip(6)
+    assert vector == '110010111110011101'
+    view[2:7].flip(0)
+    assert vector == '110011111110011101'
+    # copy() is independent
+    copy = view.copy()
+    copy.flip(0)
+    assert vector[3] == 0 and copy[0] == 1
+    assert vector[::2] == '101111010'
+
+
+def test_symbol_packing():
+    vector = BitVector.from_string('1101100011')
+    assert vector.to_symbols(2) == [0b11, 0b01, 0b10, 0b00, 0b11]
+    # The last symbol is padded with zeros
+    assert vector.to_symbols(4) == [0b1101, 0b1000, 0b1100]
+    assert BitVector.from_symbols([0b1101, 0b1000, 0b1100], 4, nbits=10) == vector
+    assert BitVector.from_symbols(vector.to_symbols(2), 2) == vector
+    assert vector[1:9].to_symbols(3) == [0b101, 0b100, 0b010]
+
+
+def test_frame_build_and_parse():
+    for bits_per_symbol in (1, 2, 4):
+        for payload in ('', '1', '1011001', '1' * 27):
+            frame = Frame.build(payload, 2, 3, bits_per_symbol)
+            assert len(frame) % bits_per_symbol == 0
+            assert frame.has_preamble()
+            assert frame.length == len(payload) + Frame.DEST_BITS + Frame.SRC_BITS
+            assert (frame.dest, frame.src) == (2, 3)
+            assert frame.payload == payload
+            assert frame.frame_bits(bits_per_symbol) == len(frame)
+            # A received bit stream with trailing bits parses the same
+            received = Frame.from_string(frame.to_string() + '0110')
+            assert received.payload == payload and received.src == 3
+    assert Frame.from_string('0010110').frame_bits() is None
+
+
+def test_frame_build_rejects_overflowing_fields():
+    # 27 payload bits + dest + src is the largest value of the 5-bit length field
+    with pytest.raises(ValueError):
+        Frame.build('1' * 28, 1, 0)
+    for dest, src in ((4, 0), (0, 4), (-1, 0)):
+        with pytest.raises(ValueError):
+            Frame.build('1', dest, src)
@@ -0,0 +1,19 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.channel import Channel
+from common.loopback import loopback
+
+
+def test_stream_decodes_back_to_back_frames():
+    # No gap between frames: each lead-in starts where the last frame ends
+    stats = loopback('lab02', 2, duration=0.2, seed=1, frames=3)
+    assert stats['ok'] == stats['frames'] == 6
+
+
+def test_stream_decodes_back_to_back_frames_with_clock_drift():
+    # A fast or slow sender moves each lead-in before or after the expected frame end
+    for ppm in (-3000, 3000):
+        stats = loopback('lab02', 1, Channel(clock_ppm=ppm, seed=1), duration=0.2, seed=1, frames=3)
+        assert stats['ok'] == stats['frames'] == 3
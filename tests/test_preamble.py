@@ -0,0 +1,43 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.frame import Frame
+from common.mfsk import MFSK
+from common.preamble import find_preambles, preamble_segments
+
+SAMPLE_RATE = 20000
+SYMBOL_DURATION = 0.2
+MODEM = MFSK.for_lab('lab03', 2, SYMBOL_DURATION)
+SEGMENTS = preamble_segments(Frame.PREAMBLE, MODEM.freqs, SYMBOL_DURATION, 2)
+
+
+def recording(offsets, modulation, seed=1):
+    # Frames starting at `offsets` (samples) in white noise at about 10 dB SNR
+    rng = np.random.default_rng(seed)
+    samples = rng.normal(0, 0.2, offsets[-1] + 3 * SAMPLE_RATE) if offsets else rng.normal(0, 0.2, 5 * SAMPLE_RATE)
+    for offset in offsets:
+        # Header and payload symbols (01 00 01 10 11 10 10) never repeat the preamble's 00 10 11
+        frame = Frame.build('1101', 3, 1, 2)
+        wave = MODEM.modulate(frame, SAMPLE_RATE, modulation=modulation, ramp=0.01 * SYMBOL_DURATION)
+        samples[offset:offset + len(wave)] += wave
+    return samples
+
+
+def test_starts_are_found_within_a_few_samples():
+    offsets = [3217, 64321]
+    for modulation in ('fsk', 'cpfsk'):
+        starts = find_preambles(recording(offsets, modulation), SEGMENTS, SAMPLE_RATE, others=MODEM.freqs)
+        assert len(starts) == len(offsets)
+        for start, offset in zip(starts, offsets):
+            assert abs(start - offset) <= 5, (modulation, start, offset)
+
+
+def test_no_preamble_gives_no_peaks():
+    rng = np.random.default_rng(2)
+    # Noise alone, and data tones without the preamble's tone sequence
+    data = MODEM.modulate('11100100', SAMPLE_RATE) + rng.normal(0, 0.2, int(4 * SYMBOL_DURATION * SAMPLE_RATE))
+    for samples in (recording([], 'fsk'), np.concatenate([rng.normal(0, 0.2, 5000), data])):
+        assert find_preambles(samples, SEGMENTS, SAMPLE_RATE, others=MODEM.freqs) == []
@@ -0,0 +1,78 @@
+import itertools
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.crc import encode
+from common.frame import BitVector
+from common.polysearch import DEFAULT_GENERATOR, max_correctable_length
+from common.syndrome import SyndromeTable, correct, get_table
+
+
+def flipped(codeword, positions):
+    bits = list(codeword)
+    for pos in positions:
+        bits[pos] = '1' if bits[pos] == '0' else '0'
+    return ''.join(bits)
+
+
+def codeword_of_length(length, generator=DEFAULT_GENERATOR):
+    data_length = length - (len(generator) - 1)
+    return encode(('1101' * length)[:data_length], generator)
+
+
+def test_every_single_and_double_error_is_corrected():
+    limit = max_correctable_length(DEFAULT_GENERATOR, 256)
+    for length in (13, 24, 40, limit):
+        codeword = codeword_of_length(length)
+        table = get_table(DEFAULT_GENERATOR, length)
+        assert not table.ambiguous
+        for errors in (1, 2):
+            for positions in itertools.combinations(range(length), errors):
+                result = table.correct(flipped(codeword, positions))
+                assert result['status'] == 'corrected'
+                assert result['codeword'] == codeword
+                assert result['positions'] == list(positions)
+
+
+def test_single_error_table_and_bitvector_input():
+    codeword = codeword_of_length(30)
+    table = SyndromeTable(DEFAULT_GENERATOR, 30, max_errors=1)
+    assert len(table.table) == 30
+    assert table.correct(codeword)['status'] == 'ok'
+    for pos in range(30):
+        result = table.correct(BitVector.of(flipped(codeword, [pos])))
+        assert result['status'] == 'corrected'
+        assert str(result['codeword']) == codeword
+
+
+def test_past_guaranteed_radius_is_ambiguous():
+    # One bit longer than the generator's guaranteed length: some patterns
+    # share a syndrome and must be reported, not resolved to one of them
+    length = max_correctable_length(DEFAULT_GENERATOR, 256) + 1
+    table = get_table(DEFAULT_GENERATOR, length)
+    codeword = codeword_of_length(length)
+    patterns = next(patterns for syn, patterns in table.ambiguous.items() if syn)
+    result = table.correct(flipped(codeword, patterns[0]))
+    assert result['status'] == 'ambiguous'
+    assert result['codeword'] is None
+    assert sorted(result['candidates']) == sorted(patterns)
+    assert not set(table.table) & set(table.ambiguous)
+
+
+def test_cache_dir_round_trip(tmp_path):
+    length = 35
+    built = SyndromeTable(DEFAULT_GENERATOR, length)
+    path = tmp_path / 'table.pkl'
+    built.save(path)
+    loaded = SyndromeTable.load(path)
+    assert (loaded.generator, loaded.length, loaded.max_errors) == (DEFAULT_GENERATOR, length, 2)
+    assert loaded.table == built.table and loaded.ambiguous == built.ambiguous
+
+    cache_dir = str(tmp_path / 'cache')
+    codeword = codeword_of_length(length)
+    assert correct(flipped(codeword, [3, 20]), DEFAULT_GENERATOR, cache_dir=cache_dir)['codeword'] == codeword
+    assert len(os.listdir(cache_dir)) == 1
+    get_table.cache_clear()
+    # Read back from the file this time
+    assert correct(flipped(codeword, [3, 20]), DEFAULT_GENERATOR, cache_dir=cache_dir)['codeword'] == codeword